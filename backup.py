@@ -0,0 +1,151 @@
+import os
+import re
+import sqlite3
+import threading
+from datetime import datetime
+from database import (database_path, insert_into_error_log, close_thread_connection)
+from enums import (ErrorType)
+from settings import (IS_TEST_MODE, APP_ROOT_FOLDER_TEST_MODE, APP_ROOT_FOLDER, DATABASE_FILE_NAME, DATABASE_FILE_TYPE,
+                      BACKUP_COMPRESSION, BACKUP_PAGES_PER_STEP, BACKUP_KEEP_LAST, BACKUP_KEEP_DAILY,
+                      BACKUP_KEEP_WEEKLY)
+
+# e.g. echo_library_20250201_093000.db, echo_library_20250201_093000.db.gz
+_BACKUP_FILE_PATTERN = re.compile(re.escape(DATABASE_FILE_NAME) + r"_(\d{8}_\d{6})" + re.escape(DATABASE_FILE_TYPE) +
+                                  r"(\.gz|\.zst)?$")
+
+
+def backup_directory():
+    # Folder used by the automatic backups - created if it does not exist
+    root_directory = os.path.expanduser("~")  # e.g. '/Users/nicholaspackham'
+
+    # Using two different directories for testing and prod
+    if IS_TEST_MODE:
+        backup_folder = os.path.join(root_directory, APP_ROOT_FOLDER_TEST_MODE)
+    else:
+        backup_folder = os.path.join(root_directory, APP_ROOT_FOLDER)
+
+    # Append 'Database Backups' on to APP_ROOT_FOLDER*
+    backup_folder = os.path.join(backup_folder, "Database Backups")
+    os.makedirs(backup_folder, exist_ok=True)
+
+    return backup_folder
+
+
+def create_backup(folder_path, compression=BACKUP_COMPRESSION):
+    # Back up the live database using SQLite's online backup API, rather than copying the file
+    #   -Copies BACKUP_PAGES_PER_STEP pages at a time, so the database stays usable while the backup runs, and the
+    #    backup is always a consistent snapshot (never a file torn by a write in progress)
+    #   -compression - "gzip", "zstd" (requires the optional zstandard package, falls back to gzip) or None
+    # Returns the path of the backup file.
+    import gzip  # imported when a backup runs, not at startup
+    import shutil
+
+    current_datetime = datetime.now().strftime("%Y%m%d_%H%M%S")
+    file_path = os.path.join(folder_path, DATABASE_FILE_NAME + "_" + current_datetime + DATABASE_FILE_TYPE)
+    partial_path = file_path + ".partial"  # renamed once complete - a half-written backup is never left behind
+
+    if compression == "zstd" and not _is_zstd_available():
+        compression = "gzip"
+
+    try:
+        # Dedicated connections - the backup may still be running after the shared connections are closed on exit
+        source = sqlite3.connect(database_path())
+        target = sqlite3.connect(partial_path)
+        try:
+            source.backup(target, pages=BACKUP_PAGES_PER_STEP)
+        finally:
+            target.close()
+            source.close()
+
+        if compression == "gzip":
+            file_path += ".gz"
+            with open(partial_path, "rb") as source_file, gzip.open(file_path + ".partial", "wb") as target_file:
+                shutil.copyfileobj(source_file, target_file)
+            os.remove(partial_path)
+            partial_path = file_path + ".partial"
+
+        elif compression == "zstd":
+            import zstandard
+
+            file_path += ".zst"
+            with open(partial_path, "rb") as source_file, open(file_path + ".partial", "wb") as target_file:
+                zstandard.ZstdCompressor().copy_stream(source_file, target_file)
+            os.remove(partial_path)
+            partial_path = file_path + ".partial"
+
+        os.replace(partial_path, file_path)
+    finally:
+        if os.path.exists(partial_path):
+            os.remove(partial_path)
+
+    return file_path
+
+
+def prune_backups(folder_path, keep_last=BACKUP_KEEP_LAST, keep_daily=BACKUP_KEEP_DAILY,
+                  keep_weekly=BACKUP_KEEP_WEEKLY):
+    # Retention policy - keep the newest keep_last backups, plus the newest backup of each of the last keep_daily days
+    # and of each of the last keep_weekly weeks. Everything older is deleted.
+    #   -Only files named like a backup (see _BACKUP_FILE_PATTERN) are ever deleted
+    backups = []
+    for file_name in os.listdir(folder_path):
+        match = _BACKUP_FILE_PATTERN.match(file_name)
+        if match:
+            backups.append((datetime.strptime(match.group(1), "%Y%m%d_%H%M%S"), file_name))
+    backups.sort(reverse=True)  # newest first
+
+    keep = {file_name for _, file_name in backups[:keep_last]}
+
+    days_kept = {}
+    weeks_kept = {}
+    for backup_datetime, file_name in backups:
+        day = backup_datetime.date()
+        week = backup_datetime.isocalendar()[:2]  # (year, week number)
+
+        if day not in days_kept and len(days_kept) < keep_daily:
+            days_kept[day] = file_name
+        if week not in weeks_kept and len(weeks_kept) < keep_weekly:
+            weeks_kept[week] = file_name
+
+    keep.update(days_kept.values())
+    keep.update(weeks_kept.values())
+
+    deleted = []
+    for _, file_name in backups:
+        if file_name not in keep:
+            os.remove(os.path.join(folder_path, file_name))
+            deleted.append(file_name)
+
+    return deleted
+
+
+def start_backup(folder_path, apply_retention=False, on_done=None):
+    # Run the backup on a background thread, so it never blocks the GUI (or closing the app)
+    #   -Not a daemon thread - if the app is closed mid-backup, Python waits for the backup to finish before exiting
+    #   -on_done(file_path, error) - called on the background thread once the backup has finished
+    def run():
+        try:
+            file_path = create_backup(folder_path)
+            if apply_retention:
+                prune_backups(folder_path)
+            error = None
+        except Exception as e:
+            file_path = None
+            error = e
+            insert_into_error_log(ErrorType.DATABASE_ERROR, f"Database backup failed: {e}")
+        finally:
+            close_thread_connection()  # in case the error log was written to from this thread
+
+        if on_done:
+            on_done(file_path, error)
+
+    backup_thread = threading.Thread(target=run, name="database-backup", daemon=False)
+    backup_thread.start()
+    return backup_thread
+
+
+def _is_zstd_available():
+    try:
+        import zstandard  # noqa: F401 - optional dependency
+        return True
+    except ImportError:
+        return False
@@ -0,0 +1,25 @@
+import os
+import tempfile
+import time
+
+
+def use_temporary_home():
+    # Point the home directory at a throwaway folder, so database_path() (and the export/backup folders) resolve
+    # inside it rather than touching the real Echo Library database. Must run before the first database call.
+    home = tempfile.mkdtemp(prefix="echo-library-bench-")
+    os.environ["HOME"] = home
+    return home
+
+
+def time_per_call(func, iterations):
+    # Run func the given number of times and return the average cost of a single call in microseconds
+    start = time.perf_counter()
+    for _ in range(iterations):
+        func()
+    elapsed = time.perf_counter() - start
+    return elapsed / iterations * 1_000_000
+
+
+def print_result(label, value, unit):
+    print(f"{label:<45} {value:>12.2f} {unit}")
+
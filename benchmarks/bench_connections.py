@@ -0,0 +1,42 @@
+# Per-call cost of a database query - a fresh connection per call (previous behaviour) vs the shared connection
+# Run from the repository root: python -m benchmarks.bench_connections
+import sqlite3
+from benchmarks._common import (use_temporary_home, time_per_call, print_result)
+
+ITERATIONS = 5000
+
+
+def main():
+    use_temporary_home()
+
+    # Imported after the home directory has been redirected
+    from database import (setup_database, database_path, check_song_exists, shutdown_database)
+
+    setup_database()
+    db_path = database_path()
+
+    def check_song_exists_fresh_connection():
+        # The previous implementation - connect, query and close on every call
+        conn = sqlite3.connect(db_path)
+        cursor = conn.cursor()
+        cursor.execute('''SELECT 1 
+                          FROM songs s 
+                          JOIN albums al ON al.album_id = s.album_id 
+                          JOIN artists ar ON ar.artist_id = al.artist_id 
+                          WHERE s.song=? AND al.name=? AND ar.name=?''',
+                       ("Song", "Album", "Artist"))
+        cursor.fetchone()
+        conn.close()
+
+    before = time_per_call(check_song_exists_fresh_connection, ITERATIONS)
+    after = time_per_call(lambda: check_song_exists("Song", "Album", "Artist"), ITERATIONS)
+
+    print_result("check_song_exists - fresh connection (before)", before, "us/call")
+    print_result("check_song_exists - shared connection (after)", after, "us/call")
+    print_result("speed-up", before / after, "x")
+
+    shutdown_database()
+
+
+if __name__ == "__main__":
+    main()
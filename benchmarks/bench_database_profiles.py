@@ -0,0 +1,70 @@
+# Import and query cost under each database performance profile (see DATABASE_PERFORMANCE_PROFILES in settings.py)
+# Run from the repository root: python -m benchmarks.bench_database_profiles
+#   -Each profile runs in its own process, against its own fresh database
+import subprocess
+import sys
+import time
+from benchmarks._common import (use_temporary_home, time_per_call, print_result)
+
+LIBRARY_SIZE = 50_000
+IMPORT_CHUNK_SIZE = 100  # small transactions, as an import of a few folders at a time commits - shows the sync cost
+SINGLE_INSERTS = 1000
+QUERY_ITERATIONS = 200
+
+
+def run_profile(profile_name):
+    use_temporary_home()
+
+    # Imported after the home directory has been redirected
+    from connection_manager import set_performance_profile
+    from database import (setup_database, insert_songs_batch, insert_into_error_log, search_songs, get_songs_page,
+                          check_song_exists, checkpoint_database, shutdown_database)
+    from enums import ErrorType
+
+    set_performance_profile(profile_name)
+    setup_database()
+
+    records = [{'song': f"Song {i}", 'album': f"Album {i // 12}", 'artist': f"Artist {i // 120}",
+                'approx_release_date': "2020-01-01", 'duration_ms': 210000, 'file_size_bytes': 7864320,
+                'created_date': f"2024-01-01 00:{i // 1000 % 60:02d}:{i % 60:02d}"} for i in range(LIBRARY_SIZE)]
+
+    start = time.perf_counter()
+    insert_songs_batch(records, chunk_size=IMPORT_CHUNK_SIZE)
+    import_seconds = time.perf_counter() - start
+
+    single_insert = time_per_call(lambda: insert_into_error_log(ErrorType.PROCESSING_ERROR, "benchmark"),
+                                  SINGLE_INSERTS)
+
+    start = time.perf_counter()
+    checkpoint_database("TRUNCATE")
+    checkpoint_seconds = time.perf_counter() - start
+
+    search = time_per_call(lambda: search_songs("ong 4242"), QUERY_ITERATIONS)
+    first_page = time_per_call(lambda: get_songs_page(), QUERY_ITERATIONS)
+    exists = time_per_call(lambda: check_song_exists("Song 4242", "Album 353", "Artist 35"), QUERY_ITERATIONS * 10)
+
+    print(f"-- {profile_name} --")
+    print_result(f"import {LIBRARY_SIZE} songs ({IMPORT_CHUNK_SIZE} per commit)", LIBRARY_SIZE / import_seconds,
+                 "songs/s")
+    print_result("single insert + commit (error log)", single_insert, "us/call")
+    print_result("WAL checkpoint after import", checkpoint_seconds * 1000, "ms")
+    print_result("search_songs", search, "us/call")
+    print_result("get_songs_page (first page)", first_page, "us/call")
+    print_result("check_song_exists", exists, "us/call")
+
+    shutdown_database()
+
+
+def main():
+    if len(sys.argv) > 1:
+        run_profile(sys.argv[1])
+        return
+
+    from settings import DATABASE_PERFORMANCE_PROFILES
+
+    for profile_name in DATABASE_PERFORMANCE_PROFILES:
+        subprocess.run([sys.executable, "-m", "benchmarks.bench_database_profiles", profile_name], check=True)
+
+
+if __name__ == "__main__":
+    main()
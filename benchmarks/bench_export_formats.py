@@ -0,0 +1,38 @@
+# Export throughput and output size for each export format, streamed from the songs table
+# Run from the repository root: python -m benchmarks.bench_export_formats
+import os
+import time
+from benchmarks._common import (use_temporary_home, print_result)
+
+LIBRARY_SIZE = 50_000
+SONG_HEADERS = ["Song", "Album", "Artist", "Approx. Release Date", "Time", "File Size", "Created Date"]
+
+
+def main():
+    use_temporary_home()
+
+    # Imported after the home directory has been redirected
+    from database import (setup_database, insert_songs_batch, iter_all_songs, shutdown_database)
+    from exporters import (EXPORT_FORMATS, available_export_formats, export_file_path)
+
+    setup_database()
+    insert_songs_batch([{'song': f"Song {i}", 'album': f"Album {i // 12}", 'artist': f"Artist {i // 120}",
+                         'approx_release_date': "2020-01-01", 'duration_ms': 210000, 'file_size_bytes': 7864320,
+                         'created_date': "2024-01-01 00:00:00"} for i in range(LIBRARY_SIZE)])
+
+    for export_format in available_export_formats():
+        file_extension, write_rows = EXPORT_FORMATS[export_format]
+        file_path = export_file_path(f"bench-{file_extension[1:]}", file_extension)
+
+        start = time.perf_counter()
+        row_count = write_rows(file_path, SONG_HEADERS, iter_all_songs(), True)
+        elapsed = time.perf_counter() - start
+
+        print_result(f"{export_format} - throughput", row_count / elapsed, "rows/s")
+        print_result(f"{export_format} - output size", os.path.getsize(file_path) / 1024 ** 2, "MB")
+
+    shutdown_database()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+# Library sync of an unchanged music folder (library_sync.sync_library) against walking every song file of it, as
+# dropping the whole folder in again does
+# Run from the repository root: python -m benchmarks.bench_library_sync
+#   -The snapshot is saved straight from a scan, so no songs need to be parsed to set the benchmark up
+import os
+import time
+from benchmarks._common import (use_temporary_home, print_result)
+from benchmarks.synthetic_library import (generate_library)
+
+ARTISTS = 420
+ALBUMS_PER_ARTIST = 10
+SONGS_PER_ALBUM = 12  # ~50k songs
+REPEATS = 3
+
+
+def best_of(func):
+    best = float("inf")
+    for _ in range(REPEATS):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    use_temporary_home()
+
+    # Imported after the home directory has been redirected
+    from database import (setup_database, check_song_exists, save_library_snapshot, shutdown_database)
+    from library_sync import (library_root, scan_library_changes, sync_library)
+    from library_walker import (iter_song_files)
+    from metadata_extractor import (derive_song_identity)
+
+    setup_database()
+    root_folder = library_root()
+    song_count = generate_library(root_folder, ARTISTS * ALBUMS_PER_ARTIST * SONGS_PER_ALBUM, media="empty",
+                                  songs_per_album=SONGS_PER_ALBUM, albums_per_artist=ALBUMS_PER_ARTIST)
+    print(f"{song_count} songs in {ARTISTS * ALBUMS_PER_ARTIST} album folders")
+
+    def walk_every_file():
+        for song_file in iter_song_files(root_folder):
+            identity = derive_song_identity(song_file)
+            check_song_exists(identity['song'], identity['album'], identity['artist'])
+
+    cold_scan = best_of(lambda: scan_library_changes(root_folder, {}))
+    _, folder_states = scan_library_changes(root_folder, {})
+    save_library_snapshot([(folder_path, mtime_ns, subfolders)
+                           for folder_path, (mtime_ns, subfolders) in folder_states.items()])
+    snapshot = folder_states
+
+    print_result("walk + duplicate check of every file", best_of(walk_every_file) * 1000, "ms")
+    print_result("scan, no snapshot (first sync)", cold_scan * 1000, "ms")
+    print_result("scan, unchanged library", best_of(lambda: scan_library_changes(root_folder, snapshot)) * 1000, "ms")
+    print_result("sync_library, unchanged library", best_of(sync_library) * 1000, "ms")
+
+    new_album = os.path.join(root_folder, sorted(os.listdir(root_folder))[7], "New Album")
+    os.makedirs(new_album)
+    changed_folders, _ = scan_library_changes(root_folder, snapshot)
+    print_result(f"scan, one new album ({len(changed_folders)} folders changed)",
+                 best_of(lambda: scan_library_changes(root_folder, snapshot)) * 1000, "ms")
+
+    shutdown_database()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+# Finding the song files of a folder - the streaming os.scandir walker (library_walker.iter_song_files) against the
+# os.walk listing imports used before it
+# Run from the repository root: python -m benchmarks.bench_library_walker
+#   -Time to first file is how long an import waits before it can start parsing
+import os
+import tempfile
+import time
+from benchmarks._common import (print_result)
+from benchmarks.synthetic_library import (generate_library)
+from library_walker import (iter_song_files)
+
+ARTISTS = 400
+ALBUMS_PER_ARTIST = 5
+SONGS_PER_ALBUM = 12
+REPEATS = 5
+
+
+def os_walk_song_files(folder_path):
+    # The previous approach - the whole tree is listed before the first file is returned
+    return [os.path.join(root, file) for root, _, files in os.walk(folder_path) for file in files if
+            file.endswith('.m4p')]
+
+
+def time_walk(walk, folder_path):
+    # Returns (seconds to the first file, seconds for every file, files found) - best of REPEATS
+    best_first = best_total = float("inf")
+    found = 0
+    for _ in range(REPEATS):
+        start = time.perf_counter()
+        first = None
+        found = 0
+        for _ in walk(folder_path):
+            if first is None:
+                first = time.perf_counter() - start
+            found += 1
+        best_first = min(best_first, first)
+        best_total = min(best_total, time.perf_counter() - start)
+    return best_first, best_total, found
+
+
+def main():
+    with tempfile.TemporaryDirectory(prefix="echo-library-bench-") as folder_path:
+        song_count = generate_library(folder_path, ARTISTS * ALBUMS_PER_ARTIST * SONGS_PER_ALBUM, media="empty",
+                                      songs_per_album=SONGS_PER_ALBUM, albums_per_artist=ALBUMS_PER_ARTIST)
+        print(f"{song_count} songs in {ARTISTS * ALBUMS_PER_ARTIST} album folders")
+
+        walks = {"os.walk (list)": os_walk_song_files, "iter_song_files (os.scandir)": iter_song_files}
+        for name, walk in walks.items():
+            first, total, found = time_walk(walk, folder_path)
+            print(f"-- {name} --")
+            print_result("time to first file", first * 1000, "ms")
+            print_result(f"every file ({found} found)", total * 1000, "ms")
+            print_result("throughput", found / total, "files/s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,39 @@
+# Per-file cost of reading an MP4 song's metadata from its movie header (metadata_extractor.parse_mp4_media_fields)
+# against a full MediaInfo parse (parse_media_fields_with_mediainfo)
+# Run from the repository root: python -m benchmarks.bench_mp4_parser
+#   -Synthetic .m4a files, with the movie header after the audio data as iTunes writes them
+#   -To check both give the same result on real songs, see check_mp4_parity
+import os
+import tempfile
+from benchmarks._common import (time_per_call, print_result)
+from benchmarks.synthetic_library import (write_mp4_file)
+from metadata_extractor import (parse_mp4_media_fields, parse_media_fields_with_mediainfo)
+
+FILE_COUNT = 200
+ITERATIONS = 5  # passes over every file - the files stay in the OS page cache, so this measures parsing, not the disk
+CREATION_TIME = 3_670_754_400  # 2020-04-26 (seconds since 1904-01-01)
+
+
+def main():
+    with tempfile.TemporaryDirectory(prefix="echo-library-bench-") as folder_path:
+        file_paths = []
+        for i in range(FILE_COUNT):
+            file_path = os.path.join(folder_path, f"{i:03d} Song {i}.m4a")
+            write_mp4_file(file_path, CREATION_TIME + i, 44100 * (180 + i))
+            file_paths.append(file_path)
+
+        parsers = {"movie header (mp4_atoms)": parse_mp4_media_fields,
+                   "MediaInfo": parse_media_fields_with_mediainfo}
+        for name, parse in parsers.items():
+            try:
+                parse(file_paths[0])
+            except Exception as e:
+                print(f"{name:<45} skipped - {e}")
+                continue
+
+            per_pass = time_per_call(lambda: [parse(file_path) for file_path in file_paths], ITERATIONS)
+            print_result(name, per_pass / FILE_COUNT, "us/file")
+
+
+if __name__ == "__main__":
+    main()
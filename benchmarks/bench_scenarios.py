@@ -0,0 +1,229 @@
+# End-to-end scenarios against a synthetic library (see benchmarks.synthetic_library) - import, duplicate re-import,
+# database viewer load, search, delete and export - at each library size, written to a JSON file runs can be compared
+# with (see benchmarks.compare_results)
+# Run from the repository root: python -m benchmarks.bench_scenarios [--sizes 1000,10000,100000] [--output FILE]
+#   -Each size runs in its own process, with its own fresh home directory, database and library folder
+#   -MediaInfo is replaced by benchmarks.stub_mediainfo, so no real audio or libmediainfo is needed. With --media empty
+#    every song is parsed by the stub rather than the MP4 fast path; --parse-ms gives each parse a realistic cost.
+#   -Results go to benchmarks/results/ by default, named after the time and commit they were run at
+import argparse
+import json
+import os
+import platform
+import shutil
+import sqlite3
+import subprocess
+import sys
+import time
+from datetime import datetime
+from benchmarks._common import (use_temporary_home, print_result)
+from benchmarks.bench_export_formats import (SONG_HEADERS)
+from benchmarks.stub_mediainfo import (install_stub_mediainfo)
+from benchmarks.synthetic_library import (generate_library, LIBRARY_MEDIA)
+
+DEFAULT_SIZES = "1000,10000,100000"
+RESULTS_FOLDER = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results")
+RESULTS_FORMAT_VERSION = 1  # bumped when the layout of the results file changes
+VIEWER_FIRST_PAGE_REPEATS = 50
+SEARCH_TERMS = ("Midnight", "Band 1", "Vol. 3", "ey", "No Such Song")  # common, artist, album, short (LIKE), no match
+SEARCH_REPEATS = 10
+DELETE_COUNT = 100  # songs deleted, spread across the library (fewer for a small library)
+RECORDED_SETTINGS = ("IMPORT_BATCH_SIZE", "METADATA_EXTRACTION_WORKERS", "MP4_FAST_PATH_ENABLED", "VIEWER_PAGE_SIZE",
+                     "SEARCH_RESULT_LIMIT", "EXPORT_CHUNK_SIZE", "DATABASE_PERFORMANCE_PROFILE")
+
+
+def run_scenarios(song_count, media, parse_seconds):
+    # Runs in the child process - returns {'scenarios': {scenario: result (see _scenario_result)}, ...}
+    home = use_temporary_home()
+    install_stub_mediainfo(parse_seconds)
+
+    # Imported after the home directory has been redirected
+    from database import (setup_database, database_path, get_songs_page, iter_all_songs, search_songs, delete_song,
+                          shutdown_database)
+    from exporters import (EXPORT_FORMATS, available_export_formats, export_file_path)
+    from gui_components import (format_song_row)
+    from importer import (import_folders)
+    from library_sync import (library_root)
+    from settings import (VIEWER_PAGE_SIZE)
+
+    results = {}
+    try:
+        setup_database()
+
+        start = time.perf_counter()
+        generate_library(library_root(), song_count, media=media)
+        generate_seconds = time.perf_counter() - start  # setup, not a scenario
+
+        # Import - every song is new
+        start = time.perf_counter()
+        stats = import_folders([library_root()])
+        results['import'] = _scenario_result(time.perf_counter() - start, stats['scanned'],
+                                             inserted=stats['inserted'], failed=stats['failed'],
+                                             database_mb=round(os.path.getsize(database_path()) / 1024 ** 2, 2))
+
+        # Re-import - every song is a duplicate, recognised from its path without being parsed
+        start = time.perf_counter()
+        stats = import_folders([library_root()])
+        results['reimport_duplicates'] = _scenario_result(time.perf_counter() - start, stats['scanned'],
+                                                          duplicates=stats['duplicates'])
+
+        # Database viewer - opening it (the first page), then scrolling through every song a page at a time
+        start = time.perf_counter()
+        for _ in range(VIEWER_FIRST_PAGE_REPEATS):
+            [format_song_row(row[1:]) for row in get_songs_page()]
+        results['viewer_first_page'] = _scenario_result(time.perf_counter() - start, VIEWER_FIRST_PAGE_REPEATS)
+
+        start = time.perf_counter()
+        pages = 0
+        rows = get_songs_page()
+        while rows:
+            pages += 1
+            [format_song_row(row[1:]) for row in rows]
+            rows = get_songs_page(after=(rows[-1][-1], rows[-1][0])) if len(rows) == VIEWER_PAGE_SIZE else []
+        results['viewer_scroll_all'] = _scenario_result(time.perf_counter() - start, pages)
+
+        # Search - uncached (search_songs_cached would only measure the cache after the first repeat)
+        matches = {}
+        start = time.perf_counter()
+        for _ in range(SEARCH_REPEATS):
+            for search_text in SEARCH_TERMS:
+                matches[search_text] = len(search_songs(search_text))
+        results['search'] = _scenario_result(time.perf_counter() - start, SEARCH_REPEATS * len(SEARCH_TERMS),
+                                             matches=matches)
+
+        # Delete - songs spread across the library, one at a time (as from the database viewer)
+        every = max(song_count // DELETE_COUNT, 1)
+        songs_to_delete = [row[:3] for index, row in enumerate(iter_all_songs()) if index % every == 0][:DELETE_COUNT]
+        start = time.perf_counter()
+        for song, album, artist in songs_to_delete:
+            delete_song(song, album, artist)
+        results['delete'] = _scenario_result(time.perf_counter() - start, len(songs_to_delete))
+
+        # Export - every song, streamed from the database as the database viewer's export does
+        for export_format in available_export_formats():
+            file_extension, write_rows = EXPORT_FORMATS[export_format]
+            file_path = export_file_path(f"bench-{file_extension[1:]}", file_extension)
+
+            start = time.perf_counter()
+            row_count = write_rows(file_path, SONG_HEADERS, map(format_song_row, iter_all_songs()), True)
+            results[f"export_{file_extension[1:]}"] = _scenario_result(
+                time.perf_counter() - start, row_count, output_mb=round(os.path.getsize(file_path) / 1024 ** 2, 2))
+
+        shutdown_database()
+    finally:
+        shutil.rmtree(home, ignore_errors=True)  # the library can be hundreds of thousands of files
+
+    return {'scenarios': results, 'generate_library_seconds': round(generate_seconds, 4), 'peak_rss_mb': _peak_rss_mb()}
+
+
+def _scenario_result(seconds, operations, **details):
+    # operations - what the scenario does once per unit of work (files, pages, searches, rows...) - compare runs on
+    # ms_per_operation, which doesn't depend on the library size
+    return dict(seconds=round(seconds, 4), operations=operations,
+                ms_per_operation=round(seconds * 1000 / operations, 4) if operations else None, **details)
+
+
+def _peak_rss_mb():
+    try:
+        import resource
+    except ImportError:
+        return None  # Windows
+
+    peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(peak_rss / (1024 ** 2 if sys.platform == "darwin" else 1024), 1)  # bytes on macOS, KiB on Linux
+
+
+def run_size(song_count, args):
+    # Returns the results of run_scenarios for a library of song_count songs, run in a fresh process
+    command = [sys.executable, "-m", "benchmarks.bench_scenarios", "--child", str(song_count), "--media", args.media,
+               "--parse-ms", str(args.parse_ms)]
+    result = subprocess.run(command, capture_output=True, text=True)
+    if result.returncode != 0:
+        raise RuntimeError(f"{song_count} songs - benchmark failed:\n{result.stderr}")
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def describe_run(args):
+    # What the results depend on besides the code - recorded alongside them, so differences can be explained
+    import settings
+
+    return {
+        'format_version': RESULTS_FORMAT_VERSION,
+        'created': datetime.now().isoformat(timespec="seconds"),
+        'label': args.label,
+        'git_commit': _git_output("rev-parse", "HEAD"),
+        'git_dirty': bool(_git_output("status", "--porcelain", "--untracked-files=no")),
+        'python': platform.python_version(),
+        'sqlite': sqlite3.sqlite_version,
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'options': {'media': args.media, 'parse_ms': args.parse_ms},
+        'settings': {name: getattr(settings, name) for name in RECORDED_SETTINGS}
+    }
+
+
+def _git_output(*git_args):
+    try:
+        result = subprocess.run(["git", *git_args], capture_output=True, text=True, check=True,
+                                cwd=os.path.dirname(RESULTS_FOLDER))
+        return result.stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None  # not a git checkout, or git isn't installed
+
+
+def print_size_results(song_count, size_results):
+    print(f"-- {song_count} songs (library generated in {size_results['generate_library_seconds']:.1f}s) --")
+    for scenario, result in size_results['scenarios'].items():
+        print_result(f"{scenario} ({result['operations']} operations)", result['seconds'] * 1000, "ms")
+    if size_results['peak_rss_mb'] is not None:
+        print_result("peak memory", size_results['peak_rss_mb'], "MB")
+
+
+def default_output_path(run):
+    commit = (run['git_commit'] or "nogit")[:10]
+    return os.path.join(RESULTS_FOLDER, f"{datetime.now():%Y%m%d-%H%M%S}-{commit}.json")
+
+
+def _song_counts(value):
+    try:
+        song_counts = [int(size) for size in value.split(",")]
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"expected comma separated song counts, got {value}") from None
+    if not song_counts or min(song_counts) < 1:
+        raise argparse.ArgumentTypeError(f"song counts must be at least 1, got {value}")
+    return song_counts
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", type=_song_counts, default=_song_counts(DEFAULT_SIZES),
+                        help=f"library sizes to run, in songs (default {DEFAULT_SIZES})")
+    parser.add_argument("--media", choices=LIBRARY_MEDIA, default="mp4",
+                        help="song files - minimal MP4 files (MP4 fast path) or empty files (parsed by the MediaInfo "
+                             "stub)")
+    parser.add_argument("--parse-ms", type=float, default=0.0, help="simulated MediaInfo parse time per file")
+    parser.add_argument("--label", help="note stored with the results, e.g. what changed")
+    parser.add_argument("--output", help="results file (default benchmarks/results/<time>-<commit>.json)")
+    parser.add_argument("--child", type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child is not None:
+        print(json.dumps(run_scenarios(args.child, args.media, args.parse_ms / 1000)))
+        return
+
+    run = describe_run(args)
+    run['results'] = {}
+    for song_count in args.sizes:
+        size_results = run_size(song_count, args)
+        run['results'][str(song_count)] = size_results
+        print_size_results(song_count, size_results)
+
+    output_path = args.output or default_output_path(run)
+    os.makedirs(os.path.dirname(os.path.abspath(output_path)), exist_ok=True)
+    with open(output_path, "w", encoding="utf-8") as file:
+        json.dump(run, file, indent=2)
+    print(f"Results written to {output_path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,52 @@
+# Duplicate check cost - the in-memory known songs cache vs the per-file SELECT it replaces
+#   -A new song (cache miss) is answered from memory; a known song (cache hit) is still confirmed with the SELECT
+# Run from the repository root: python -m benchmarks.bench_song_key_cache
+from benchmarks._common import (use_temporary_home, time_per_call, print_result)
+
+LIBRARY_SIZE = 100_000
+ITERATIONS = 20_000
+
+
+def main():
+    use_temporary_home()
+
+    # Imported after the home directory has been redirected
+    from database import (setup_database, database_path, insert_songs_batch, check_song_exists, shutdown_database)
+    from connection_manager import get_connection
+    from song_key_cache import song_key_cache_stats
+
+    setup_database()
+    insert_songs_batch([{'song': f"Song {i}", 'album': f"Album {i // 12}", 'artist': f"Artist {i // 120}",
+                         'approx_release_date': "2020-01-01", 'duration_ms': 210000, 'file_size_bytes': 7864320,
+                         'created_date': "2024-01-01 00:00:00"} for i in range(LIBRARY_SIZE)])
+    check_song_exists("Song 0", "Album 0", "Artist 0")  # the first check loads the cache - not part of the timings
+
+    cursor = get_connection(database_path()).cursor()
+
+    def check_song_exists_select():
+        # The per-file SELECT (unique index lookup) used before the cache
+        cursor.execute('''SELECT 1 
+                          FROM songs s 
+                          JOIN albums al ON al.album_id = s.album_id 
+                          JOIN artists ar ON ar.artist_id = al.artist_id 
+                          WHERE s.song=? AND al.name=? AND ar.name=?''',
+                       ("Song 5000", "Album 416", "Artist 41"))
+        cursor.fetchone()
+
+    before = time_per_call(check_song_exists_select, ITERATIONS)
+    after_new = time_per_call(lambda: check_song_exists("New Song", "Album 416", "Artist 41"), ITERATIONS)
+    after_known = time_per_call(lambda: check_song_exists("Song 5000", "Album 416", "Artist 41"), ITERATIONS)
+    stats = song_key_cache_stats()
+
+    print_result("duplicate check - SELECT (before)", before, "us/call")
+    print_result("duplicate check - new song, cache (after)", after_new, "us/call")
+    print_result("duplicate check - known song, confirmed (after)", after_known, "us/call")
+    print_result("speed-up (new songs)", before / after_new, "x")
+    print_result(f"cache memory ({stats['entries']} songs)", stats['bytes'] / 1024 ** 2, "MB")
+    print_result("cache memory per song", stats['bytes'] / max(stats['entries'], 1), "bytes")
+
+    shutdown_database()
+
+
+if __name__ == "__main__":
+    main()
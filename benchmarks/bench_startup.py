@@ -0,0 +1,115 @@
+# Application startup - what is imported before the window appears, and the time until it does
+# Run from the repository root: python -m benchmarks.bench_startup [--budget-ms 1000]
+#   -Exits with status 1 if the time to the first window (or, without a display, to the end of setup) is over budget
+#   -Each run is a fresh interpreter, as when the app is launched. Measured for a new database (created at startup)
+#    and for an existing one (the usual case - no schema work).
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+from benchmarks._common import (use_temporary_home, print_result)
+
+DEFAULT_BUDGET_MS = 1000
+IMPORT_TIME_TOP = 15  # slowest imports listed (cumulative, including what they import)
+ICON_PATH = os.path.join("images", "echo-library-icon.png")
+
+
+def run_startup():
+    # Runs in the child process - the same steps as main.py, stopping once the window has been drawn
+    started = float(os.environ["ECHO_BENCH_STARTED"])  # wall clock time the parent launched this process
+    timings = {}
+
+    start = time.perf_counter()
+    from database import (setup_database, shutdown_database)
+    try:
+        from gui import setup_gui
+    except ImportError as e:
+        setup_gui = None
+        timings['window_skipped'] = f"gui could not be imported ({e})"
+    timings['imports_ms'] = (time.perf_counter() - start) * 1000
+
+    start = time.perf_counter()
+    setup_database()
+    timings['setup_database_ms'] = (time.perf_counter() - start) * 1000
+
+    if setup_gui is not None:
+        import tkinter as tk
+
+        try:
+            start = time.perf_counter()
+            root = setup_gui(ICON_PATH)
+            root.update()  # draw the window
+            timings['setup_gui_ms'] = (time.perf_counter() - start) * 1000
+            timings['time_to_window_ms'] = (time.time() - started) * 1000
+            root.destroy()
+        except tk.TclError as e:
+            timings['window_skipped'] = f"no display ({e})"
+
+    timings['time_to_setup_ms'] = timings.get('time_to_window_ms', (time.time() - started) * 1000)
+    shutdown_database()
+    print(json.dumps(timings))
+
+
+def measure_startup():
+    environment = dict(os.environ, ECHO_BENCH_STARTED=repr(time.time()))
+    result = subprocess.run([sys.executable, "-m", "benchmarks.bench_startup", "--child"], env=environment,
+                            capture_output=True, text=True, check=True)
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def print_import_times():
+    # python -X importtime breakdown of importing the GUI (stderr lines: "import time: self | cumulative | module")
+    for module in ("gui", "gui_components"):
+        result = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"], capture_output=True,
+                                text=True)
+        if result.returncode == 0:
+            break
+
+    imports = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        imports.append((int(cumulative_us), int(self_us), name.rstrip()))
+
+    print(f"-- slowest imports (import {module}) --")
+    for cumulative_us, self_us, name in sorted(imports, reverse=True)[:IMPORT_TIME_TOP]:
+        print(f"{name:<45} {cumulative_us / 1000:>9.2f} ms ({self_us / 1000:.2f} ms self)")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--budget-ms", type=float, default=DEFAULT_BUDGET_MS)
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        run_startup()
+        return
+
+    use_temporary_home()  # inherited by the child processes
+    print_import_times()
+
+    over_budget = False
+    for label in ("new database", "existing database"):
+        timings = measure_startup()
+        print(f"-- startup, {label} --")
+        print_result("imports", timings['imports_ms'], "ms")
+        print_result("setup_database", timings['setup_database_ms'], "ms")
+        if 'time_to_window_ms' in timings:
+            print_result("setup_gui (window drawn)", timings['setup_gui_ms'], "ms")
+            print_result("time to first window (from launch)", timings['time_to_window_ms'], "ms")
+        else:
+            print(f"window skipped - {timings['window_skipped']}")
+            print_result("time to end of setup (from launch)", timings['time_to_setup_ms'], "ms")
+        over_budget |= timings['time_to_setup_ms'] > args.budget_ms
+
+    if over_budget:
+        print(f"Startup is over the {args.budget_ms:.0f} ms budget")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
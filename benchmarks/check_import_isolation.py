@@ -0,0 +1,49 @@
+# Import isolation check - a song that can't be saved must not affect the rest of its batch
+# Run from the repository root: python -m benchmarks.check_import_isolation (exits with status 1 if a check fails)
+#   -The batch insert fails part way through, so the songs are retried one at a time (see
+#    importer._insert_songs_isolated). The songs written before the failure were rolled back with it, so the retry
+#    must report them as new - not as duplicates of themselves - and only the failing song as failed.
+import sys
+from benchmarks._common import use_temporary_home
+
+BATCH_SIZE = 10
+BAD_SONG_INDEX = 6  # part way through the batch - songs before it were inserted when the batch failed
+
+
+def main():
+    use_temporary_home()
+
+    # Imported after the home directory has been redirected
+    from database import (setup_database, iter_all_songs, check_song_exists, shutdown_database)
+    from importer import (_insert_songs_isolated)
+
+    setup_database()
+    song_files = [f"/library/Artist/Album/{i + 1:02d} Song {i}.m4p" for i in range(BATCH_SIZE)]
+    records = [{'song': f"Song {i}", 'album': "Album", 'artist': "Artist", 'approx_release_date': "2020-01-01",
+                'duration_ms': 210000, 'file_size_bytes': 7864320, 'created_date': "2024-01-01 00:00:00"}
+               for i in range(BATCH_SIZE)]
+    records[BAD_SONG_INDEX]['approx_release_date'] = None  # NOT NULL - fails the batch insert
+
+    failures = {}
+    duplicate_flags = _insert_songs_isolated(song_files, records, failures)
+
+    expected_flags = [None if i == BAD_SONG_INDEX else False for i in range(BATCH_SIZE)]
+    checks = {
+        "songs reported as new (the failing song as None)": duplicate_flags == expected_flags,
+        "only the failing song recorded as failed": list(failures) == [song_files[BAD_SONG_INDEX]],
+        "every other song written once": len(list(iter_all_songs())) == BATCH_SIZE - 1,
+        "failing song not known": not check_song_exists(f"Song {BAD_SONG_INDEX}", "Album", "Artist"),
+        "songs before the failure known": all(check_song_exists(f"Song {i}", "Album", "Artist")
+                                              for i in range(BAD_SONG_INDEX))
+    }
+    shutdown_database()
+
+    for name, passed in checks.items():
+        print(f"{'ok' if passed else 'FAILED':<7} {name}")
+    if not all(checks.values()):
+        print(f"duplicate flags: {duplicate_flags}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
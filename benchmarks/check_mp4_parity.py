@@ -0,0 +1,37 @@
+# Check the MP4 fast path gives exactly the same metadata as MediaInfo for real songs
+# Run from the repository root: python -m benchmarks.check_mp4_parity FOLDER (exits with status 1 if any file differs)
+#   -e.g. FOLDER = "$HOME/Music/Music/Media.localized/Apple Music" - every .m4a/.m4p file within it is compared
+#   -Files the fast path can't read are listed, but aren't failures - they are parsed with MediaInfo anyway
+import sys
+from library_walker import (iter_song_files)
+from metadata_extractor import (parse_mp4_media_fields, parse_media_fields_with_mediainfo)
+from mp4_atoms import (MP4_FILE_EXTENSIONS)
+
+
+def main():
+    if len(sys.argv) != 2:
+        print("Usage: python -m benchmarks.check_mp4_parity FOLDER")
+        sys.exit(2)
+
+    compared = fallbacks = mismatches = 0
+    for file_path in iter_song_files(sys.argv[1], MP4_FILE_EXTENSIONS):
+        try:
+            fast_fields = parse_mp4_media_fields(file_path)
+        except (OSError, ValueError) as e:
+            print(f"fallback  {file_path} - {e}")
+            fallbacks += 1
+            continue
+
+        mediainfo_fields = parse_media_fields_with_mediainfo(file_path)
+        compared += 1
+        if fast_fields != mediainfo_fields:
+            print(f"DIFFERS   {file_path}\n  mp4_atoms {fast_fields}\n  MediaInfo {mediainfo_fields}")
+            mismatches += 1
+
+    print(f"{compared} files compared, {mismatches} differ, {fallbacks} read with MediaInfo")
+    if mismatches:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
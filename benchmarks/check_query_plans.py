@@ -0,0 +1,71 @@
+# Query plan regression check - every created_date-ordered query must walk an index, never sort the whole table
+# Run from the repository root: python -m benchmarks.check_query_plans (exits with status 1 if a check fails)
+#   -The SQL checked is captured from the real database functions as they run, so it can't drift from the code
+import sys
+from benchmarks._common import use_temporary_home
+
+FULL_SORT = "USE TEMP B-TREE FOR ORDER BY"  # plan detail when the rows are sorted rather than read in index order
+
+
+def main():
+    use_temporary_home()
+
+    # Imported after the home directory has been redirected
+    from connection_manager import get_connection
+    from database import (setup_database, database_path, insert_songs_batch, insert_into_error_log, iter_all_songs,
+                          get_songs_page, iter_error_logs, get_error_logs_page, shutdown_database)
+    from enums import ErrorType
+
+    setup_database()
+    insert_songs_batch([{'song': f"Song {i}", 'album': f"Album {i // 12}", 'artist': f"Artist {i // 120}",
+                         'approx_release_date': "2020-01-01", 'duration_ms': 210000, 'file_size_bytes': 7864320,
+                         'created_date': "2024-01-01 00:00:00"} for i in range(1000)])
+    for i in range(100):
+        insert_into_error_log(ErrorType.PROCESSING_ERROR if i % 2 else ErrorType.DATABASE_ERROR, f"Error {i}")
+
+    key = ("2024-01-01 00:00:00", 500)
+    checks = {
+        "iter_all_songs": lambda: list(iter_all_songs()),
+        "get_songs_page": get_songs_page,
+        "get_songs_page (after)": lambda: get_songs_page(after=key),
+        "get_songs_page (before)": lambda: get_songs_page(before=key),
+        "iter_error_logs": lambda: list(iter_error_logs()),
+        "iter_error_logs (processing)": lambda: list(iter_error_logs(processing_only=True)),
+        "get_error_logs_page": get_error_logs_page,
+        "get_error_logs_page (after)": lambda: get_error_logs_page(after=key),
+        "get_error_logs_page (before)": lambda: get_error_logs_page(before=key),
+        "get_error_logs_page (processing, after)": lambda: get_error_logs_page(after=key, processing_only=True),
+        "get_error_logs_page (processing, before)": lambda: get_error_logs_page(before=key, processing_only=True)
+    }
+
+    conn = get_connection(database_path())
+    failures = 0
+    for name, run_query in checks.items():
+        statements = []
+        conn.set_trace_callback(statements.append)
+        try:
+            run_query()
+        finally:
+            conn.set_trace_callback(None)
+
+        for statement in statements:
+            if not statement.lstrip().upper().startswith("SELECT"):
+                continue
+
+            plan = [row[3] for row in conn.execute("EXPLAIN QUERY PLAN " + statement)]
+            # A sort, or a scan of a table that isn't in index order
+            problems = [detail for detail in plan
+                        if FULL_SORT in detail or (detail.startswith("SCAN ") and "USING" not in detail)]
+
+            print(f"{'FAIL' if problems else 'ok':<5} {name:<45} {' | '.join(plan)}")
+            failures += bool(problems)
+
+    shutdown_database()
+
+    if failures:
+        print(f"{failures} queries sort or scan the whole table")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
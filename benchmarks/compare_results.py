@@ -0,0 +1,80 @@
+# Compare two results files written by benchmarks.bench_scenarios - e.g. before and after a change
+# Run from the repository root: python -m benchmarks.compare_results BASELINE.json CANDIDATE.json [--threshold 10]
+#   -Scenarios are compared on their time per operation. Changes within the threshold are treated as noise.
+#   -Exits with status 1 if any scenario is slower by more than the threshold
+import argparse
+import json
+import sys
+
+DEFAULT_THRESHOLD_PERCENT = 10.0
+
+
+def load_results(file_path):
+    with open(file_path, encoding="utf-8") as file:
+        return json.load(file)
+
+
+def compare_runs(baseline, candidate, threshold_percent):
+    # Returns [(song_count, scenario, baseline ms, candidate ms, change %, verdict), ...] for the scenarios in both
+    comparisons = []
+    for song_count, baseline_size in baseline['results'].items():
+        candidate_size = candidate['results'].get(song_count)
+        if candidate_size is None:
+            continue
+
+        for scenario, baseline_result in baseline_size['scenarios'].items():
+            candidate_result = candidate_size['scenarios'].get(scenario)
+            if candidate_result is None or not baseline_result['ms_per_operation']:
+                continue
+
+            before = baseline_result['ms_per_operation']
+            after = candidate_result['ms_per_operation']
+            change_percent = (after - before) / before * 100
+            if change_percent > threshold_percent:
+                verdict = "slower"
+            elif change_percent < -threshold_percent:
+                verdict = "faster"
+            else:
+                verdict = ""
+            comparisons.append((song_count, scenario, before, after, change_percent, verdict))
+
+    return comparisons
+
+
+def describe_differences(baseline, candidate):
+    # Differences between the runs other than the code - worth knowing before reading anything into the numbers
+    differences = []
+    for key in ("python", "sqlite", "platform", "cpu_count", "options", "settings"):
+        if baseline.get(key) != candidate.get(key):
+            differences.append(f"{key}: {baseline.get(key)} -> {candidate.get(key)}")
+    return differences
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("baseline")
+    parser.add_argument("candidate")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD_PERCENT,
+                        help=f"percentage change treated as noise (default {DEFAULT_THRESHOLD_PERCENT:.0f})")
+    args = parser.parse_args()
+
+    baseline = load_results(args.baseline)
+    candidate = load_results(args.candidate)
+
+    for run, label in ((baseline, "baseline"), (candidate, "candidate")):
+        print(f"{label:<10} {run['created']}  {run['git_commit'] or 'no commit'}" +
+              (" (uncommitted changes)" if run['git_dirty'] else "") + (f"  - {run['label']}" if run['label'] else ""))
+    for difference in describe_differences(baseline, candidate):
+        print(f"  differs - {difference}")
+
+    print(f"{'songs':>8} {'scenario':<22} {'baseline ms/op':>15} {'candidate ms/op':>16} {'change':>9}")
+    comparisons = compare_runs(baseline, candidate, args.threshold)
+    for song_count, scenario, before, after, change_percent, verdict in comparisons:
+        print(f"{song_count:>8} {scenario:<22} {before:>15.4f} {after:>16.4f} {change_percent:>+8.1f}% {verdict}")
+
+    if any(verdict == "slower" for *_, verdict in comparisons):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,45 @@
+# Stand-in for pymediainfo, so the benchmarks run without libmediainfo or real audio files
+#   -Reports a General track with an encoded date, duration and file size worked out from the file's path - the same
+#    file always gives the same metadata, so imports of a synthetic library (see benchmarks.synthetic_library) are
+#    reproducible
+#   -Only ever installed by a benchmark process (install_stub_mediainfo) - the app itself always uses pymediainfo
+import os
+import sys
+import time
+import types
+import zlib
+
+STUB_FILE_SIZE_BYTES = 4 * 1024 * 1024  # reported for empty files, as a real song would have a size
+
+
+class _StubTrack:
+    def __init__(self, file_path):
+        checksum = zlib.crc32(os.path.basename(file_path).encode("utf-8"))
+        self.track_type = "General"
+        self.encoded_date = f"{2000 + checksum % 25}-{1 + checksum % 12:02d}-{1 + checksum % 28:02d} 12:00:00 UTC"
+        self.duration = float(150_000 + checksum % 150_000)
+        self.file_size = os.path.getsize(file_path) or STUB_FILE_SIZE_BYTES
+
+
+class StubMediaInfo:
+    parse_seconds = 0.0  # simulated parse cost per file (see install_stub_mediainfo)
+
+    def __init__(self, file_path):
+        self.tracks = [_StubTrack(file_path)]
+
+    @classmethod
+    def parse(cls, file_path):
+        if cls.parse_seconds:
+            time.sleep(cls.parse_seconds)
+        return cls(file_path)
+
+
+def install_stub_mediainfo(parse_seconds=0.0):
+    # Make 'from pymediainfo import MediaInfo' return StubMediaInfo for the rest of this process. Must run before the
+    # first file is parsed (metadata_extractor imports pymediainfo on the first parse).
+    #   -parse_seconds - time each parse takes, e.g. to model libmediainfo's cost when comparing worker counts
+    #    (sleeps release the GIL, as libmediainfo does)
+    StubMediaInfo.parse_seconds = parse_seconds
+    module = types.ModuleType("pymediainfo")
+    module.MediaInfo = StubMediaInfo
+    sys.modules["pymediainfo"] = module
@@ -0,0 +1,110 @@
+# Synthetic Apple Music library - an Artist > Album > "NN Song.m4p" folder tree of any size, built in seconds without
+# any real audio. Used by the benchmarks, and handy for trying the app against a large library:
+#   python -m benchmarks.synthetic_library "/tmp/Apple Music" --songs 10000
+#   -Deterministic - the same arguments always build the same tree (names, dates and durations), so runs compare
+#   -Song files are either minimal MP4 files (read by the MP4 fast path, see mp4_atoms) or empty files (no readable
+#    movie header, so parsed by MediaInfo - see benchmarks.stub_mediainfo)
+import argparse
+import os
+import random
+import struct
+
+SONGS_PER_ALBUM = 12
+ALBUMS_PER_ARTIST = 8
+LIBRARY_MEDIA = ("mp4", "empty")  # song file contents - see generate_library
+MP4_AUDIO_BYTES = 4 * 1024 * 1024  # size of each song's (sparse) audio data - roughly a 4 minute AAC track
+MP4_FIRST_CREATION_TIME = 3_500_000_000  # 2014-11-27, in seconds since 1904-01-01 (see mp4_atoms)
+MP4_TIMESCALE = 44100
+
+# Words song, album and artist names are made from - common enough that searches find a realistic number of matches
+_NAME_WORDS = ("Love", "Night", "Heart", "Summer", "Blue", "Fire", "Dream", "Light", "River", "Home", "Gold", "Rain",
+               "Midnight", "City", "Wild", "Echo", "Stone", "Ocean", "Silver", "Road", "Shadow", "Morning", "Star",
+               "Dance", "Garden", "Thunder", "Velvet", "Paper", "Electric", "Honey")
+
+
+def generate_library(root, song_count, media="mp4", songs_per_album=SONGS_PER_ALBUM,
+                     albums_per_artist=ALBUMS_PER_ARTIST, seed=0):
+    # Build a library of song_count songs within root - songs_per_album songs per album (the last album may be shorter)
+    # and albums_per_artist albums per artist, plus the artwork and hidden files a real library folder collects. The one
+    # builder every benchmark uses, whatever it measures - shape the library with the arguments.
+    #   -media - 'mp4' for minimal MP4 files with a movie header (sparse, so they take no disk space), 'empty' for empty
+    #    song files (enough when only the folder walk is measured, e.g. bench_library_walker)
+    #   -seed - picks the names, so different seeds give different libraries of the same shape
+    # Returns the number of songs written.
+    if media not in LIBRARY_MEDIA:
+        raise ValueError(f"Unknown library media '{media}' - expected one of {', '.join(LIBRARY_MEDIA)}")
+
+    names = random.Random(seed)
+    album_count = -(-song_count // songs_per_album)
+
+    for album_index in range(album_count):
+        artist_index = album_index // albums_per_artist
+        album_folder = os.path.join(root, _artist_name(artist_index, seed), _album_name(album_index, names))
+        os.makedirs(album_folder, exist_ok=True)
+
+        first_song = album_index * songs_per_album
+        for track in range(min(songs_per_album, song_count - first_song)):
+            song_index = first_song + track
+            # The song index keeps names unique within the album, as a song's identity is its path (see
+            # metadata_extractor.derive_song_identity)
+            song_name = f"{track + 1:02d} {names.choice(_NAME_WORDS)} {names.choice(_NAME_WORDS)} {song_index}.m4p"
+            song_path = os.path.join(album_folder, song_name)
+
+            if media == "mp4":
+                write_mp4_file(song_path, MP4_FIRST_CREATION_TIME + song_index * 3600,
+                               MP4_TIMESCALE * (150 + song_index % 150), audio_bytes=MP4_AUDIO_BYTES)
+            else:
+                open(song_path, "wb").close()
+
+        open(os.path.join(album_folder, "cover.jpg"), "wb").close()
+        open(os.path.join(album_folder, ".DS_Store"), "wb").close()
+
+    return song_count
+
+
+def _artist_name(artist_index, seed):
+    word = random.Random(seed * 1_000_003 + artist_index).choice(_NAME_WORDS)
+    return f"The {word} Band {artist_index}"
+
+
+def _album_name(album_index, names):
+    return f"{names.choice(_NAME_WORDS)} {names.choice(_NAME_WORDS)} (Vol. {album_index})"
+
+
+def write_mp4_file(file_path, creation_time, duration, timescale=MP4_TIMESCALE, audio_bytes=MP4_AUDIO_BYTES,
+                   moov_first=False):
+    # Minimal MP4 audio file - ftyp, mdat (sparse, so large files cost no disk space) and moov/mvhd. iTunes puts moov
+    # after the audio data unless the file was optimised for streaming (moov_first).
+    #   -creation_time - seconds since 1904-01-01, duration - in timescale units
+    def box(box_type, content):
+        return struct.pack(">I4s", 8 + len(content), box_type) + content
+
+    movie_header = box(b"mvhd", bytes(4) + struct.pack(">IIII", creation_time, creation_time, timescale, duration) +
+                       bytes(80))
+    movie = box(b"moov", movie_header)
+
+    with open(file_path, "wb") as file:
+        file.write(box(b"ftyp", b"M4A " + bytes(4) + b"M4A mp42isom"))
+        if moov_first:
+            file.write(movie)
+        file.write(struct.pack(">I4s", 8 + audio_bytes, b"mdat"))
+        file.seek(audio_bytes, os.SEEK_CUR)
+        if not moov_first:
+            file.write(movie)
+        file.truncate()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build a synthetic Apple Music library folder")
+    parser.add_argument("root", help="folder to build the library in (created if missing)")
+    parser.add_argument("--songs", type=int, default=1000)
+    parser.add_argument("--media", choices=LIBRARY_MEDIA, default="mp4")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    song_count = generate_library(args.root, args.songs, media=args.media, seed=args.seed)
+    print(f"Wrote {song_count} songs to {args.root}")
+
+
+if __name__ == "__main__":
+    main()
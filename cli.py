@@ -0,0 +1,216 @@
+# Headless entry point - imports music folders without the GUI (no display needed), e.g. as a nightly job:
+#   python cli.py import "$HOME/Music/Music/Media.localized/Apple Music" --workers 8
+#   python cli.py resume  (continue the last import that didn't complete)
+#   python cli.py sync --watch  (import new songs whenever the Apple Music folder changes)
+# Exits with one of the EXIT_* status codes below.
+import argparse
+import os
+import sys
+import threading
+import time
+from database import (setup_database, shutdown_database, insert_into_error_log, close_thread_connection)
+from enums import (ErrorType)
+from importer import (import_folders, resume_import, format_import_progress, save_import_timings)
+from library_sync import (sync_library, start_library_watch, library_root)
+from metadata_extractor import (is_valid_folder, metadata_cache_stats)
+from perf import (new_import_timings, format_timings_summary)
+from settings import (APPROVED_MUSIC_FOLDER, IMPORT_BATCH_SIZE, METADATA_EXTRACTION_WORKERS)
+
+EXIT_OK = 0
+EXIT_IMPORT_FAILED = 1  # unexpected error during the import - see the Error Log
+EXIT_INVALID_ARGUMENTS = 2  # bad options, or a folder outside the approved music folder
+EXIT_FILES_FAILED = 3  # import finished, but some files could not be imported - retry them with "resume"
+EXIT_CANCELLED = 130  # interrupted (Ctrl+C) - songs imported before the interrupt are kept
+
+CLI_PROGRESS_INTERVAL_SECONDS = 5  # minimum time between progress lines - keeps logs of long imports readable
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="cli.py", description="Echo Library - headless tools")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    import_parser = subparsers.add_parser("import", help="import every song within one or more folders")
+    import_parser.add_argument("folders", nargs="+",
+                               help=f"folders to import (within ~/{APPROVED_MUSIC_FOLDER}), searched recursively")
+    _add_import_options(import_parser)
+    import_parser.add_argument("--dry-run", action="store_true",
+                               help="parse and count the new songs without writing anything to the database")
+    import_parser.set_defaults(handler=run_import)
+
+    resume_parser = subparsers.add_parser("resume", help="continue the last import that didn't complete, skipping "
+                                                         "the files already imported")
+    _add_import_options(resume_parser)
+    resume_parser.set_defaults(handler=run_resume, dry_run=False)
+
+    sync_parser = subparsers.add_parser("sync", help=f"import the new songs within ~/{APPROVED_MUSIC_FOLDER} - only "
+                                                     f"folders changed since the last sync are searched")
+    _add_import_options(sync_parser)
+    sync_parser.add_argument("--full", action="store_true",
+                             help="search every folder again, e.g. to retry song files that failed")
+    sync_parser.add_argument("--watch", action="store_true",
+                             help="keep running, syncing whenever the music folder changes (Ctrl+C to stop)")
+    sync_parser.set_defaults(handler=run_sync, dry_run=False)
+
+    return parser
+
+
+def _add_import_options(parser):
+    parser.add_argument("--workers", type=_positive_int, default=METADATA_EXTRACTION_WORKERS,
+                        help=f"files parsed in parallel (default {METADATA_EXTRACTION_WORKERS})")
+    parser.add_argument("--batch-size", type=_positive_int, default=IMPORT_BATCH_SIZE,
+                        help=f"songs written to the database per transaction (default {IMPORT_BATCH_SIZE})")
+    parser.add_argument("--quiet", action="store_true", help="only print the summary")
+
+
+def run_import(args):
+    folder_paths = [os.path.abspath(os.path.expanduser(folder)) for folder in args.folders]
+
+    # Same rule as dropping folders into the GUI - only folders within the approved music folder (or the folder itself)
+    for folder_path in folder_paths:
+        if not os.path.isdir(folder_path) or not is_valid_folder(os.path.join(folder_path, "")):
+            err_msg = f"Error! Invalid folder: {folder_path}. Valid Location: {APPROVED_MUSIC_FOLDER}."
+            print(err_msg, file=sys.stderr)
+            insert_into_error_log(ErrorType.INVALID_FOLDER, err_msg)
+            return EXIT_INVALID_ARGUMENTS
+
+    return _run_in_worker(args, lambda on_progress, cancel_event, timings: import_folders(
+        folder_paths, on_progress=on_progress, cancel_event=cancel_event, workers=args.workers,
+        batch_size=args.batch_size, dry_run=args.dry_run, timings=timings))
+
+
+def run_resume(args):
+    return _run_in_worker(args, lambda on_progress, cancel_event, timings: resume_import(
+        on_progress=on_progress, cancel_event=cancel_event, workers=args.workers, batch_size=args.batch_size,
+        timings=timings))
+
+
+def run_sync(args):
+    def sync(full):
+        return lambda on_progress, cancel_event, timings: sync_library(on_progress=on_progress,
+                                                                       cancel_event=cancel_event, workers=args.workers,
+                                                                       batch_size=args.batch_size, full=full,
+                                                                       timings=timings)
+
+    exit_code = _run_in_worker(args, sync(args.full))
+    if not args.watch or exit_code == EXIT_CANCELLED:
+        return exit_code
+
+    changed = threading.Event()
+    start_library_watch(changed.set)
+    print(f"Watching {library_root()} for changes (Ctrl+C to stop)", file=sys.stderr, flush=True)
+
+    try:
+        while True:
+            if changed.wait(timeout=0.5):  # a timeout, so Ctrl+C is noticed straight away
+                changed.clear()
+                if _run_in_worker(args, sync(False), report_unchanged=False) == EXIT_CANCELLED:
+                    return EXIT_CANCELLED
+    except KeyboardInterrupt:
+        return EXIT_OK
+
+
+def _run_in_worker(args, run, report_unchanged=True):
+    # run(on_progress, cancel_event, timings) - returns the import stats (None if there was nothing to do)
+    #   -timings - see perf.py, only recorded when PERF_INSTRUMENTATION_ENABLED is set
+    # report_unchanged - False to skip the summary when no song files were found (e.g. a sync that found no changes)
+    last_progress = 0.0
+
+    def on_progress(stats):
+        nonlocal last_progress
+        now = time.perf_counter()
+        if not args.quiet and now - last_progress >= CLI_PROGRESS_INTERVAL_SECONDS:
+            last_progress = now
+            print(format_import_progress(stats), file=sys.stderr, flush=True)
+
+    # The import runs on a worker thread, so Ctrl+C can stop it cleanly at the next file boundary (see import_folders)
+    # rather than interrupting a database write
+    cancel_event = threading.Event()
+    timings = new_import_timings()
+    result = {}
+
+    def worker():
+        try:
+            result['stats'] = run(on_progress, cancel_event, timings)
+        except Exception as e:
+            result['error'] = e
+        finally:
+            close_thread_connection()
+
+    import_thread = threading.Thread(target=worker, name="cli-import")
+    import_thread.start()
+    try:
+        while import_thread.is_alive():
+            import_thread.join(timeout=0.5)
+    except KeyboardInterrupt:
+        print("Cancelling... waiting for the current file to finish", file=sys.stderr, flush=True)
+        cancel_event.set()
+        import_thread.join()
+
+    if 'error' in result:
+        err_msg = f"Error! {result['error']}. Import could not be completed; some folders may have been processed."
+        print(err_msg, file=sys.stderr)
+        insert_into_error_log(ErrorType.PROCESSING_ERROR, f"{result['error']}")
+        return EXIT_IMPORT_FAILED
+
+    stats = result['stats']
+    if stats is None:
+        print("No unfinished import to resume")
+        return EXIT_OK
+
+    if report_unchanged or stats['scanned'] or stats['cancelled']:
+        print(format_import_summary(stats, args.dry_run))
+
+    timings_summary = save_import_timings(f"cli {args.command}", timings, stats, args.dry_run)
+    if timings_summary is not None:
+        print(f"  timings     {format_timings_summary(timings_summary)}")
+
+    if stats['cancelled']:
+        return EXIT_CANCELLED
+    return EXIT_FILES_FAILED if stats['failed'] else EXIT_OK
+
+
+def format_import_summary(stats, dry_run=False):
+    # Throughput summary printed once the import has finished
+    elapsed = max(time.perf_counter() - stats['started'], 0.001)
+    cache_stats = metadata_cache_stats()
+
+    if stats['cancelled']:
+        outcome = "Import cancelled"
+    elif dry_run:
+        outcome = "Dry run complete (nothing written)"
+    else:
+        outcome = "Import complete"
+
+    return "\n".join([
+        f"{outcome} - {stats['folders']} folders in {elapsed:.1f}s" +
+        (f" ({stats['checked']} checked for changes)" if 'checked' in stats else ""),
+        f"  scanned     {stats['scanned']:>10} files ({stats['scanned'] / elapsed:.1f}/s)",
+        f"  parsed      {stats['parsed']:>10} files ({stats['parsed'] / elapsed:.1f}/s)",
+        f"  {'new' if dry_run else 'inserted':<11} {stats['inserted']:>10} songs ({stats['inserted'] / elapsed:.1f}/s)",
+        f"  duplicates  {stats['duplicates']:>10} songs",
+        f"  failed      {stats['failed']:>10} files" + (" (see the Error Log, retry with: cli.py resume)"
+                                                          if stats['failed'] else ""),
+        f"  cache hits  {cache_stats['hits']:>10} of {cache_stats['hits'] + cache_stats['misses']} parsed files "
+        f"({cache_stats['hit_rate']:.0%})"
+    ])
+
+
+def _positive_int(value):
+    number = int(value)
+    if number < 1:
+        raise argparse.ArgumentTypeError(f"must be at least 1, got {value}")
+    return number
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+
+    setup_database()  # ensure the database is ready and open the shared connection
+    try:
+        return args.handler(args)
+    finally:
+        shutdown_database()  # close the shared database connections
+
+
+if __name__ == "__main__":
+    sys.exit(main())
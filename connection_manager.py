@@ -0,0 +1,132 @@
+import sqlite3
+import threading
+import time
+from settings import (DATABASE_PERFORMANCE_PROFILE, DATABASE_PERFORMANCE_PROFILES, DATABASE_BUSY_RETRIES)
+
+# Each thread keeps one long-lived connection to the database, rather than opening and closing a new connection for
+# every query. Connections are also tracked in a registry so they can all be closed when the application exits.
+#   -A connection is only ever closed by the thread that owns it (or once that thread has finished) - closing it from
+#    another thread could pull it out from under a statement that thread is running
+_thread_local = threading.local()
+_open_connections = {}  # every connection opened by the manager (across all threads) -> the thread that owns it
+_open_connections_lock = threading.Lock()
+_generation = 0  # incremented by close_all_connections() - invalidates the per-thread cached connections
+_performance_profile = DATABASE_PERFORMANCE_PROFILE  # pragma profile applied to new connections (see settings.py)
+
+
+def get_connection(db_path):
+    # Return the cached connection for the current thread, creating it on first use
+    conn = getattr(_thread_local, "conn", None)
+    if (conn is not None and _thread_local.db_path == db_path
+            and _thread_local.generation == _generation):
+        return conn
+
+    # The path changed or the connections were closed - drop the old connection (if any) and open a new one
+    close_connection()
+
+    # check_same_thread=False - the connection is only used by the thread that created it, but it has to be closable
+    # from the main thread when the application shuts down (close_all_connections)
+    profile = DATABASE_PERFORMANCE_PROFILES[_performance_profile]
+    conn = sqlite3.connect(db_path, check_same_thread=False, timeout=profile["busy_timeout_ms"] / 1000)
+    apply_performance_profile(conn, profile)
+
+    with _open_connections_lock:
+        _open_connections[conn] = threading.current_thread()
+
+    _thread_local.conn = conn
+    _thread_local.db_path = db_path
+    _thread_local.generation = _generation
+
+    return conn
+
+
+def close_connection():
+    # Close the current thread's connection - called by background threads when they finish
+    conn = getattr(_thread_local, "conn", None)
+    if conn is None:
+        return
+
+    _thread_local.conn = None
+
+    with _open_connections_lock:
+        _open_connections.pop(conn, None)
+
+    conn.close()
+
+
+def close_all_connections():
+    # Close the connections of this thread and of threads that have finished - called when the application exits.
+    # Every other thread's connection is invalidated instead: its thread closes it and reconnects on its next query
+    # (see get_connection), or closes it when it finishes (close_connection).
+    global _generation
+
+    current_thread = threading.current_thread()
+    with _open_connections_lock:
+        _generation += 1
+        connections = [conn for conn, thread in _open_connections.items()
+                       if thread is current_thread or not thread.is_alive()]
+        for conn in connections:
+            del _open_connections[conn]
+
+    if getattr(_thread_local, "conn", None) in connections:
+        _thread_local.conn = None
+
+    for conn in connections:
+        try:
+            conn.close()
+        except sqlite3.Error:
+            pass  # connection already unusable - nothing more to clean up
+
+
+def apply_performance_profile(conn, profile):
+    # Apply a pragma profile (see DATABASE_PERFORMANCE_PROFILES in settings.py) to a newly opened connection
+    #   -journal_mode is stored in the database file itself, the other pragmas only last as long as the connection
+    #   -cache_size is negative - SQLite reads a negative value as KiB rather than a number of pages
+    cursor = conn.cursor()
+    cursor.execute(f"PRAGMA journal_mode = {profile['journal_mode']}")
+    cursor.execute(f"PRAGMA synchronous = {profile['synchronous']}")
+    cursor.execute(f"PRAGMA cache_size = {-int(profile['cache_size_kib'])}")
+    cursor.execute(f"PRAGMA mmap_size = {int(profile['mmap_size_mb']) * 1024 * 1024}")
+    cursor.execute(f"PRAGMA busy_timeout = {int(profile['busy_timeout_ms'])}")
+    cursor.execute(f"PRAGMA wal_autocheckpoint = {int(profile['wal_autocheckpoint_pages'])}")
+
+
+def set_performance_profile(profile_name):
+    # Switch the pragma profile - the open connections are invalidated, so every thread reconnects with the new profile
+    global _performance_profile
+
+    if profile_name not in DATABASE_PERFORMANCE_PROFILES:
+        raise ValueError(f"Error: Unknown database performance profile '{profile_name}'")
+
+    _performance_profile = profile_name
+    close_all_connections()
+
+
+def run_write_transaction(conn, write, retries=DATABASE_BUSY_RETRIES):
+    # Run write(cursor) and commit it as one transaction, retrying it if the database is still locked by another
+    # connection once the busy timeout has run out (e.g. a second window importing at the same time)
+    #   -BEGIN IMMEDIATE takes the write lock before write() runs, so everything it reads (e.g. the row delete_song
+    #    looks up before deleting it) is part of the transaction - no other connection can change it in between. The
+    #    default (deferred) transaction would only start at write()'s first INSERT/UPDATE/DELETE.
+    #   -The transaction is rolled back whatever write() raises, so a failed write never leaves changes pending on
+    #    the connection (to be committed by its next write). Only a locked database is retried, so write() must be
+    #    safe to run again.
+    # Returns whatever write() returns.
+    for attempt in range(retries + 1):
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            result = write(conn.cursor())
+            conn.commit()
+            return result
+        except Exception as e:
+            conn.rollback()
+            if attempt == retries or not _is_locked_error(e):
+                raise
+            time.sleep(0.05 * 2 ** attempt)  # back off - 50ms, 100ms, 200ms...
+
+
+def _is_locked_error(error):
+    if not isinstance(error, sqlite3.OperationalError):
+        return False
+    message = str(error).lower()
+    return "database is locked" in message or "database is busy" in message
@@ -1,4 +1,8 @@
-SONG_SEARCH_BAR_PLACEHOLDER = "Search song..."
+SONG_SEARCH_BAR_PLACEHOLDER = "Search song, album or artist..."
+
+# Columns of a perf log export - see database.get_perf_logs
+PERF_LOG_COLUMNS = ["Run ID", "Source", "Stage", "Files", "Total (ms)", "p50 per File (ms)", "p95 per File (ms)",
+                    "Files/s", "Created Date"]
 
 HELP_AND_INFORMATION_TEXT = (
         "--------Help & Information--------\n\n" +
@@ -27,7 +31,7 @@ HELP_AND_INFORMATION_TEXT = (
         "The app's design aligns with Apple Music's file storage structure on Mac, where songs are organised in a " +
         "nested folder format by artist and then album, with the song file (song.m4p) stored within " +
         "(artist/album/song.m4p). Note that individual `.m4p` files cannot be dragged into the interface; only " +
-        "folders are supported.\n\n"
+        "folders are supported. Hidden and system folders (e.g. `.Trashes`) within a folder are skipped.\n\n"
 
         "Once a folder is dragged into the interface, the app automatically extracts key metadata from each song " +
         "and displays it in a clean, tabular format. The main screen includes several useful features, such as the " +
@@ -45,60 +49,37 @@ HELP_AND_INFORMATION_TEXT = (
 
         "----Handling Errors within the Drag and Drop Window----\n"
         
-        "If an error occurs while using the drag-and-drop feature in Echo Library, it’s helpful to understand" +
-        " how the app handles folder imports. Unlike a typical import sequence, Echo Library imports folders in " +
-        "reverse order, starting from the top of your selected files rather than the bottom.\n\n"
-        
-        "This isn’t an issue unless an error disrupts the import. When that happens, it’s easy to lose track of " +
-        "your progress.\n\n"
-        
-        "For example, say you have five existing folders already imported and are now adding five more. " +
-        "In Finder/File Explorer, they might look like the following section (Finder/File Explorer Order).\n\n"
-        
-        "--Finder/File Explorer Order--\n"
-        "-Little Mix\n"
-        "-Skepta\n"
-        "-Giggs"
-        "-5SOS\n"
-        "-Luke Combs\n"
-        "-Stormzy\n"
-        "-Zayn\n"
-        "-Niall Horan\n"
-        "-Justin Bieber\n"
-        "-Harry Styles\n\n"
+        "If an error occurs while using the drag-and-drop feature in Echo Library, the rest of the import carries " +
+        "on. Each song file is imported on its own, so a file that can't be read is skipped and listed in the " +
+        "Error Log, rather than stopping every folder after it.\n\n"
         
-        "--Existing Folders (how they appear in Echo Library)--\n"
-        "-Harry Styles\n"
-        "-Justin Bieber\n"
-        "-Niall Horan\n"
-        "-Zayn\n"
-        "-Stormzy\n\n"
+        "For example, say you are importing five new folders and one song within 'Giggs' can't be read.\n\n"
         
-        "--New Import Folders (imported order)--\n"
+        "--New Import Folders--\n"
         "-Little Mix\n"
         "-Skepta\n"
-        "-Giggs                 <—ERROR\n"
+        "-Giggs                 <—ERROR (one song)\n"
         "-5SOS\n"
         "-Luke Combs\n\n"
         
-        "If the import encounters an error on the 'Giggs' folder, the app will import only 'Little Mix' and " +
-        "'Skepta', terminating at 'Giggs' due to the error. It won't even get to either '5SOS' or 'Luke Combs.'\n\n"
+        "Every song from 'Little Mix', 'Skepta', '5SOS' and 'Luke Combs' is imported, along with every other song " +
+        "within 'Giggs'. When the import finishes, the status message tells you how many files failed.\n\n"
         
-        "--New Folders (how the two imported folders will appear in the app)--\n"
-        "-Little Mix             <-- NEW\n"
-        "-Skepta                <-- NEW\n"
-        "-Harry Styles\n"
-        "-Justin Bieber\n"
-        "-Niall Horan\n"
-        "-Zayn\n"
-        "-Stormzy\n\n"
-        
-        "To avoid issues, remember the last imported folder before beginning your next batch. In this case, note " +
-        "that 'Harry Styles' was your last existing folder, and 'Luke Combs' is the final folder in your import " +
-        "batch.\n\n"
-        
-        "By following these steps, you’ll be able to track your imports accurately and resume smoothly if an error " +
-        "occurs.\n\n"
+        "Echo Library keeps a journal of every file in the import, so you never need to work out where an import " +
+        "stopped:\n"
+        "-Fix (or replace) the files listed in the Error Log, then press `Resume Last Import` to retry only the " +
+        "files that failed.\n"
+        "-If an import is cancelled, or the app is closed before it finishes, press `Resume Last Import` to carry " +
+        "on from where it stopped - files that were already imported are not processed again.\n\n"
+
+        "--------------------------------------------------------------------------------------------------------\n\n"
+
+        "----Library Sync----\n"
+
+        "Rather than dragging in new artist folders by hand, press `Sync Library` to import the songs within every " +
+        "folder of your Apple Music folder that is new or has changed since the last sync. Folders that haven't " +
+        "changed are skipped without looking at their songs, so a sync of an unchanged library only takes " +
+        "seconds. New songs are added to the table above.\n\n"
 
         "--------------------------------------------------------------------------------------------------------\n\n"
 
@@ -108,6 +89,11 @@ HELP_AND_INFORMATION_TEXT = (
         "some music folders may not upload successfully. However, the Error Log allows you to monitor all " +
         "unsuccessful uploads to the application, with the added ability to export all error logs for easier " +
         "tracking and troubleshooting.\n\n"
+
+        "If an import seems slow, set `PERF_INSTRUMENTATION_ENABLED` in `settings.py`. Each import then shows where " +
+        "its time went (finding the files, checking for duplicates, reading the metadata, saving and displaying " +
+        "the songs) once it finishes, and the timings are kept in a perf log - use `Export Perf Log` in the Error " +
+        "Log window to export them.\n\n"
         
         "--------------------------------------------------------------------------------------------------------\n\n"
 )
@@ -1,8 +1,15 @@
+import hashlib
+import json
 import os
-import sqlite3
+import threading
+from collections import OrderedDict
 from datetime import datetime
+from connection_manager import (get_connection, close_connection, close_all_connections, run_write_transaction)
 from enums import (ErrorType)
-from settings import (IS_TEST_MODE, APP_ROOT_FOLDER_TEST_MODE, APP_ROOT_FOLDER, DATABASE_FILE_NAME, DATABASE_FILE_TYPE)
+from song_key_cache import (ensure_song_key_cache_loaded, is_known_song, add_known_songs, remove_known_song)
+from settings import (IS_TEST_MODE, APP_ROOT_FOLDER_TEST_MODE, APP_ROOT_FOLDER, DATABASE_FILE_NAME, DATABASE_FILE_TYPE,
+                      IMPORT_BATCH_SIZE, SEARCH_RESULT_LIMIT, SEARCH_CACHE_SIZE, VIEWER_PAGE_SIZE, EXPORT_CHUNK_SIZE,
+                      PERF_LOG_KEEP_RUNS, METADATA_CACHE_MAX_ENTRIES)
 
 _database_path = None  # global variable to store the database path
 
@@ -38,11 +45,15 @@ def database_path():
 
 
 def setup_database():
-    database_path()  # initialise database path
-
-    conn = sqlite3.connect(_database_path)
+    # Initialise the database path and open the shared connection for the main thread
+    #   -An up-to-date database (user_version = SCHEMA_VERSION) needs no schema work, so only the connection is opened -
+    #    this runs before the window appears
+    conn = get_connection(database_path())
     cursor = conn.cursor()
 
+    if cursor.execute("PRAGMA user_version").fetchone()[0] == SCHEMA_VERSION:
+        return
+
     # Using "time" (with speech marks) as a column name instead of time, as 'time' is a keyword
     cursor.execute('''CREATE TABLE IF NOT EXISTS songs
                     (
@@ -65,182 +76,1045 @@ def setup_database():
                     )''')
 
     conn.commit()
-    conn.close()
+
+    run_migrations(conn)  # bring older databases up to the current schema version
+
+
+# ---- Migrations ----
+# Each migration upgrades the schema by one version. The current version is stored in the database itself
+# (PRAGMA user_version), so every migration runs exactly once per database file - including existing
+# echo_library.db files created before the migration was added.
+def _migration_1_unique_song_key(cursor):
+    # Compact hashed dedup key (see compute_song_key) - backfilled for the songs already in the database
+    cursor.execute("ALTER TABLE songs ADD COLUMN song_key INTEGER")
+
+    rows = cursor.execute("SELECT id, song, album, artist FROM songs").fetchall()
+    cursor.executemany("UPDATE songs SET song_key=? WHERE id=?",
+                       [(compute_song_key(song, album, artist), song_id) for song_id, song, album, artist in rows])
+
+    # Remove any duplicates that slipped in before the unique index existed (keeping the first import) - each removed
+    # row is recorded in the Error Log, so nothing disappears without a trace
+    cursor.execute('''SELECT id, song, album, artist, created_date 
+                      FROM songs 
+                      WHERE id NOT IN (SELECT MIN(id) FROM songs GROUP BY song, album, artist)''')
+    duplicate_rows = cursor.fetchall()
+    if duplicate_rows:
+        created_date = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        cursor.executemany('''INSERT INTO error_log 
+                              (error_type, error_message, created_date) 
+                              VALUES (?, ?, ?)''',
+                           [(ErrorType.DATABASE_ERROR.value,
+                             f"Database upgrade removed a duplicate song (id {song_id}, imported {imported_date}): "
+                             f"{song} - {album} - {artist}",
+                             created_date)
+                            for song_id, song, album, artist, imported_date in duplicate_rows])
+        cursor.executemany("DELETE FROM songs WHERE id=?", [(row[0],) for row in duplicate_rows])
+
+    cursor.execute("CREATE UNIQUE INDEX IF NOT EXISTS idx_songs_song_album_artist ON songs (song, album, artist)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_songs_song_key ON songs (song_key)")
+
+
+def _migration_2_metadata_cache(cursor):
+    # Persistent cache of the fields parsed from each song file, so re-importing a folder doesn't parse the files again
+    #   -file_size_bytes and mtime_ns identify the version of the file that was parsed
+    cursor.execute('''CREATE TABLE IF NOT EXISTS metadata_cache
+                    (
+                        file_path TEXT PRIMARY KEY,
+                        file_size_bytes INTEGER NOT NULL,
+                        mtime_ns INTEGER NOT NULL,
+                        approx_release_date DATE NOT NULL,
+                        "time" TEXT NOT NULL,
+                        file_size TEXT NOT NULL,
+                        cached_date DATETIME NOT NULL
+                    )''')
+
+
+def _migration_3_songs_full_text_search(cursor):
+    # Full-text index over song, album and artist for the database viewer search (rowid = songs.id)
+    #   -Trigram tokenizer - matches any part of a word (like LIKE '%...%'), not just whole words or prefixes
+    #   -Kept in step with songs by the triggers below
+    cursor.execute('''CREATE VIRTUAL TABLE IF NOT EXISTS songs_fts 
+                      USING fts5(song, album, artist, tokenize='trigram')''')
+    cursor.execute("INSERT INTO songs_fts (rowid, song, album, artist) SELECT id, song, album, artist FROM songs")
+
+    cursor.execute('''CREATE TRIGGER IF NOT EXISTS songs_fts_after_insert AFTER INSERT ON songs 
+                      BEGIN 
+                          INSERT INTO songs_fts (rowid, song, album, artist) 
+                          VALUES (new.id, new.song, new.album, new.artist); 
+                      END''')
+    cursor.execute('''CREATE TRIGGER IF NOT EXISTS songs_fts_after_delete AFTER DELETE ON songs 
+                      BEGIN 
+                          DELETE FROM songs_fts WHERE rowid = old.id; 
+                      END''')
+    cursor.execute('''CREATE TRIGGER IF NOT EXISTS songs_fts_after_update AFTER UPDATE OF song, album, artist ON songs 
+                      BEGIN 
+                          UPDATE songs_fts SET song = new.song, album = new.album, artist = new.artist 
+                          WHERE rowid = old.id; 
+                      END''')
+
+
+def _migration_4_songs_created_date_index(cursor):
+    # Serves the newest-first ordering used by the database viewer's pages (see get_songs_page) without sorting
+    #   -Sort keys only, not a covering index - each row's album and artist are looked up by primary key either way,
+    #    so covering the song columns too saved ~6% per page, for an index nearly the size of songs itself to write
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_songs_created_date_id ON songs (created_date, id)")
+
+
+def _migration_5_normalized_songs(cursor):
+    # Artist and album names are stored once (artists/albums tables) rather than on every song, and duration and file
+    # size are stored as numbers (milliseconds/bytes) rather than display text - the GUI formats them instead (see
+    # gui_components.format_duration/format_file_size).
+    #   -songs (and metadata_cache) are rebuilt in place - song ids are kept, so songs_fts (rowid = songs.id) is still
+    #    valid
+    conn = cursor.connection
+    conn.create_function("parse_duration_ms", 1, _parse_duration_ms, deterministic=True)
+    conn.create_function("parse_file_size_bytes", 1, _parse_file_size_bytes, deterministic=True)
+
+    cursor.execute('''CREATE TABLE IF NOT EXISTS artists
+                    (
+                        artist_id INTEGER PRIMARY KEY,
+                        name TEXT NOT NULL UNIQUE
+                    )''')
+
+    cursor.execute('''CREATE TABLE IF NOT EXISTS albums
+                    (
+                        album_id INTEGER PRIMARY KEY,
+                        artist_id INTEGER NOT NULL REFERENCES artists (artist_id),
+                        name TEXT NOT NULL,
+                        UNIQUE (artist_id, name)
+                    )''')
+
+    cursor.execute("INSERT OR IGNORE INTO artists (name) SELECT DISTINCT artist FROM songs")
+    cursor.execute('''INSERT OR IGNORE INTO albums (artist_id, name) 
+                      SELECT DISTINCT ar.artist_id, s.album 
+                      FROM songs s 
+                      JOIN artists ar ON ar.name = s.artist''')
+
+    cursor.execute('''CREATE TABLE songs_normalized
+                    (
+                        id INTEGER PRIMARY KEY AUTOINCREMENT,
+                        song TEXT NOT NULL,
+                        album_id INTEGER NOT NULL REFERENCES albums (album_id),
+                        approx_release_date DATE NOT NULL,
+                        duration_ms INTEGER,
+                        file_size_bytes INTEGER,
+                        created_date DATETIME NOT NULL,
+                        song_key INTEGER NOT NULL
+                    )''')
+
+    cursor.execute('''INSERT INTO songs_normalized 
+                      (id, song, album_id, approx_release_date, duration_ms, file_size_bytes, created_date, song_key) 
+                      SELECT 
+                          s.id
+                         ,s.song
+                         ,al.album_id
+                         ,s.approx_release_date
+                         ,parse_duration_ms(s."time")
+                         ,parse_file_size_bytes(s.file_size)
+                         ,s.created_date
+                         ,s.song_key 
+                      FROM songs s 
+                      JOIN artists ar ON ar.name = s.artist 
+                      JOIN albums al ON al.artist_id = ar.artist_id AND al.name = s.album''')
+
+    # Carry the AUTOINCREMENT counter over, so the ids of deleted songs are still never reused
+    sequence = cursor.execute("SELECT seq FROM sqlite_sequence WHERE name = 'songs'").fetchone()
+
+    for trigger in ("songs_fts_after_insert", "songs_fts_after_delete", "songs_fts_after_update"):
+        cursor.execute(f"DROP TRIGGER IF EXISTS {trigger}")
+    cursor.execute("DROP TABLE songs")  # also drops its indexes
+    cursor.execute("ALTER TABLE songs_normalized RENAME TO songs")
+
+    if sequence is not None:
+        cursor.execute("UPDATE sqlite_sequence SET seq = MAX(seq, ?) WHERE name = 'songs'", sequence)
+
+    cursor.execute("CREATE UNIQUE INDEX IF NOT EXISTS idx_songs_album_song ON songs (album_id, song)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_songs_song_key ON songs (song_key)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_songs_created_date_id ON songs (created_date, id)")
+
+    # Keep songs_fts in step - it still indexes the song, album and artist names
+    cursor.execute('''CREATE TRIGGER IF NOT EXISTS songs_fts_after_insert AFTER INSERT ON songs 
+                      BEGIN 
+                          INSERT INTO songs_fts (rowid, song, album, artist) 
+                          SELECT new.id, new.song, al.name, ar.name 
+                          FROM albums al 
+                          JOIN artists ar ON ar.artist_id = al.artist_id 
+                          WHERE al.album_id = new.album_id; 
+                      END''')
+    cursor.execute('''CREATE TRIGGER IF NOT EXISTS songs_fts_after_delete AFTER DELETE ON songs 
+                      BEGIN 
+                          DELETE FROM songs_fts WHERE rowid = old.id; 
+                      END''')
+    cursor.execute('''CREATE TRIGGER IF NOT EXISTS songs_fts_after_update AFTER UPDATE OF song, album_id ON songs 
+                      BEGIN 
+                          DELETE FROM songs_fts WHERE rowid = old.id; 
+                          INSERT INTO songs_fts (rowid, song, album, artist) 
+                          SELECT new.id, new.song, al.name, ar.name 
+                          FROM albums al 
+                          JOIN artists ar ON ar.artist_id = al.artist_id 
+                          WHERE al.album_id = new.album_id; 
+                      END''')
+    cursor.execute('''CREATE TRIGGER IF NOT EXISTS albums_fts_after_update AFTER UPDATE OF name ON albums 
+                      BEGIN 
+                          UPDATE songs_fts SET album = new.name 
+                          WHERE rowid IN (SELECT id FROM songs WHERE album_id = new.album_id); 
+                      END''')
+    cursor.execute('''CREATE TRIGGER IF NOT EXISTS artists_fts_after_update AFTER UPDATE OF name ON artists 
+                      BEGIN 
+                          UPDATE songs_fts SET artist = new.name 
+                          WHERE rowid IN (SELECT s.id 
+                                          FROM songs s 
+                                          JOIN albums al ON al.album_id = s.album_id 
+                                          WHERE al.artist_id = new.artist_id); 
+                      END''')
+
+    # The metadata cache holds the same fields - converted the same way
+    cursor.execute('''CREATE TABLE metadata_cache_normalized
+                    (
+                        file_path TEXT PRIMARY KEY,
+                        file_size_bytes INTEGER NOT NULL,
+                        mtime_ns INTEGER NOT NULL,
+                        approx_release_date DATE NOT NULL,
+                        duration_ms INTEGER,
+                        media_file_size_bytes INTEGER,
+                        cached_date DATETIME NOT NULL
+                    )''')
+    cursor.execute('''INSERT INTO metadata_cache_normalized 
+                      SELECT 
+                          file_path
+                         ,file_size_bytes
+                         ,mtime_ns
+                         ,approx_release_date
+                         ,parse_duration_ms("time")
+                         ,parse_file_size_bytes(file_size)
+                         ,cached_date 
+                      FROM metadata_cache''')
+    cursor.execute("DROP TABLE metadata_cache")
+    cursor.execute("ALTER TABLE metadata_cache_normalized RENAME TO metadata_cache")
+
+
+def _parse_duration_ms(time_text):
+    # Stored before migration 5, e.g. "3:45" -> 225000 - None if "Unknown"
+    try:
+        minutes, seconds = time_text.split(":")
+        return (int(minutes) * 60 + int(seconds)) * 1000
+    except (AttributeError, ValueError):
+        return None
+
+
+def _parse_file_size_bytes(file_size_text):
+    # Stored before migration 5, e.g. "4.21 MB" -> 4414505 - None if "Unknown"
+    try:
+        return round(float(file_size_text.removesuffix(" MB")) * 1024 ** 2)
+    except (AttributeError, ValueError):
+        return None
+
+
+def _migration_6_error_log_indexes(cursor):
+    # Serve the newest-first error log pages (see get_error_logs_page) without sorting - every error, and the errors of
+    # a single error_type (e.g. the processing errors)
+    #   -Sort keys only, not covering indexes - covering error_message would store every message a second time, only to
+    #    save a page's VIEWER_PAGE_SIZE primary key lookups
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_error_log_created_date_id ON error_log (created_date, error_id)")
+    cursor.execute('''CREATE INDEX IF NOT EXISTS idx_error_log_type_created_date_id 
+                      ON error_log (error_type, created_date, error_id)''')
+
+
+def _migration_7_import_journal(cursor):
+    # Import sessions (one per drop/CLI import) and the status of every file within them - lets an interrupted import
+    # be resumed without scanning or parsing the files that were already imported (see importer.resume_import)
+    #   -folder_paths - JSON list of the folders dropped, in drop order
+    #   -status - running, completed, or incomplete (cancelled, failed, or some files failed)
+    cursor.execute('''CREATE TABLE IF NOT EXISTS import_sessions
+                    (
+                        session_id INTEGER PRIMARY KEY AUTOINCREMENT,
+                        folder_paths TEXT NOT NULL,
+                        status TEXT NOT NULL,
+                        created_date DATETIME NOT NULL,
+                        finished_date DATETIME
+                    )''')
+
+    # status - done or failed, recorded as each batch of files is imported (files not reached have no row)
+    cursor.execute('''CREATE TABLE IF NOT EXISTS import_journal
+                    (
+                        session_id INTEGER NOT NULL REFERENCES import_sessions (session_id),
+                        folder_path TEXT NOT NULL,
+                        file_path TEXT NOT NULL,
+                        status TEXT NOT NULL,
+                        error_message TEXT,
+                        UNIQUE (session_id, file_path)
+                    )''')
+
+
+def _migration_8_library_snapshot(cursor):
+    # Every folder within the music folder as of the last library sync (see library_sync) - a folder whose mtime hasn't
+    # changed has the same entries, so it doesn't need to be listed or imported again
+    #   -subfolders - JSON list of the folder's subfolder names when it was last listed
+    cursor.execute('''CREATE TABLE IF NOT EXISTS library_snapshot
+                    (
+                        folder_path TEXT PRIMARY KEY,
+                        mtime_ns INTEGER NOT NULL,
+                        subfolders TEXT NOT NULL
+                    )''')
+
+
+def _migration_9_perf_log(cursor):
+    # Import timing summaries (see perf.py) - one row per stage of each import, plus a 'total' row, sharing a run_id
+    #   -source - what ran the import, e.g. drop, resume, sync or cli import
+    #   -p50_ms/p95_ms - per file time within the stage (NULL for the total row)
+    cursor.execute('''CREATE TABLE IF NOT EXISTS perf_log
+                    (
+                        perf_id INTEGER PRIMARY KEY AUTOINCREMENT,
+                        run_id INTEGER NOT NULL,
+                        source TEXT NOT NULL,
+                        stage TEXT NOT NULL,
+                        files INTEGER NOT NULL,
+                        total_ms REAL NOT NULL,
+                        p50_ms REAL,
+                        p95_ms REAL,
+                        files_per_second REAL,
+                        created_date DATETIME NOT NULL
+                    )''')
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_perf_log_run_id ON perf_log (run_id)")
 
 
-def insert_into_songs(is_duplicate, metadata):
-    if is_duplicate:
-        return  # duplicate found
+_MIGRATIONS = [
+    _migration_1_unique_song_key,
+    _migration_2_metadata_cache,
+    _migration_3_songs_full_text_search,
+    _migration_4_songs_created_date_index,
+    _migration_5_normalized_songs,
+    _migration_6_error_log_indexes,
+    _migration_7_import_journal,
+    _migration_8_library_snapshot,
+    _migration_9_perf_log
+]
+SCHEMA_VERSION = len(_MIGRATIONS)
 
-    conn = sqlite3.connect(_database_path)
+
+def run_migrations(conn):
     cursor = conn.cursor()
+    current_version = cursor.execute("PRAGMA user_version").fetchone()[0]
 
-    cursor.execute('''INSERT INTO songs 
-                            (
-                                 song
-                                ,album
-                                ,artist
-                                ,approx_release_date
-                                ,"time"
-                                ,file_size
-                                ,created_date
-                            ) 
-                            VALUES 
-                            (
-                                 ?
-                                ,?
-                                ,?
-                                ,?
-                                ,?
-                                ,?
-                                ,?
-                            )''',
-                   (metadata['song'], metadata['album'], metadata['artist'],
-                    metadata['approx_release_date'], metadata['time'], metadata['file_size'],
-                    metadata['created_date']))
+    for version in range(current_version + 1, SCHEMA_VERSION + 1):
+        # Each migration (and its version bump) runs in its own transaction - it's either fully applied or not at all
+        #   -IMMEDIATE, and the version read again once the write lock is held - if another process (e.g. the CLI) is
+        #    upgrading the same database, each migration still runs only once
+        cursor.execute("BEGIN IMMEDIATE")
+        try:
+            if cursor.execute("PRAGMA user_version").fetchone()[0] >= version:
+                conn.rollback()
+                continue
+            _MIGRATIONS[version - 1](cursor)
+            cursor.execute(f"PRAGMA user_version = {version}")
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+
+
+def compute_song_key(song, album, artist):
+    # 64-bit hash of the dedup key (song, album, artist) - signed, so it fits in an SQLite INTEGER
+    digest = hashlib.blake2b("\x1f".join((song, album, artist)).encode("utf-8"), digest_size=8).digest()
+    return int.from_bytes(digest, "big", signed=True)
+
+
+def shutdown_database():
+    # Fold the WAL back into the database file, then close every shared connection - called once when the
+    # application exits
+    checkpoint_database("TRUNCATE")
+    close_all_connections()
+
+
+def checkpoint_database(mode="PASSIVE"):
+    # Copy the pages in the WAL file back into the database file (only does anything in WAL journal mode)
+    #   -PASSIVE - copies what it can without waiting for other connections (safe to run from the GUI thread)
+    #   -TRUNCATE - waits for readers (up to the busy timeout), then empties the WAL file so it doesn't keep growing
+    # Returns (busy, wal_pages, pages_checkpointed) - busy is 1 if the checkpoint could not finish.
+    if mode not in ("PASSIVE", "FULL", "RESTART", "TRUNCATE"):
+        raise ValueError(f"Error: Unknown checkpoint mode '{mode}'")
+
+    conn = get_connection(database_path())
+    return conn.execute(f"PRAGMA wal_checkpoint({mode})").fetchone()
+
+
+def close_thread_connection():
+    # Close the current thread's shared connection - called by background threads when they finish
+    close_connection()
+
+
+# Only the uniqueness conflict of each table is ignored (ON CONFLICT ... DO NOTHING) - any other constraint violation
+# (e.g. a NULL release date) still raises, so the song is reported as failed rather than as a duplicate
+_INSERT_ARTIST_SQL = "INSERT INTO artists (name) VALUES (?) ON CONFLICT (name) DO NOTHING"
+
+_INSERT_ALBUM_SQL = '''INSERT INTO albums 
+                         (artist_id, name) 
+                         VALUES ((SELECT artist_id FROM artists WHERE name = ?), ?) 
+                         ON CONFLICT (artist_id, name) DO NOTHING'''
+
+_INSERT_SONG_SQL = '''INSERT INTO songs 
+                        (
+                             song
+                            ,album_id
+                            ,approx_release_date
+                            ,duration_ms
+                            ,file_size_bytes
+                            ,created_date
+                            ,song_key
+                        ) 
+                        VALUES 
+                        (
+                             ?
+                            ,(SELECT al.album_id 
+                              FROM albums al 
+                              JOIN artists ar ON ar.artist_id = al.artist_id 
+                              WHERE ar.name = ? AND al.name = ?)
+                            ,?
+                            ,?
+                            ,?
+                            ,?
+                            ,?
+                        ) 
+                        ON CONFLICT (album_id, song) DO NOTHING'''
+
+
+def _song_row(metadata):
+    # Parameters of _INSERT_SONG_SQL - song_key is always last
+    return (metadata['song'], metadata['artist'], metadata['album'],
+            metadata['approx_release_date'], metadata['duration_ms'], metadata['file_size_bytes'],
+            metadata['created_date'], compute_song_key(metadata['song'], metadata['album'], metadata['artist']))
 
-    conn.commit()
-    conn.close()
+
+def _insert_artists_and_albums(cursor, rows):
+    # Make sure the artist and album of every song row exist before the songs are inserted (existing ones are ignored)
+    artist_names = {row[1] for row in rows}
+    album_names = {(row[1], row[2]) for row in rows}
+    cursor.executemany(_INSERT_ARTIST_SQL, [(artist,) for artist in artist_names])
+    cursor.executemany(_INSERT_ALBUM_SQL, album_names)
+
+
+def insert_into_songs(metadata):
+    # Insert the song unless it already exists - a single atomic statement (only a conflict on the unique album, song
+    # index is ignored - any other constraint failure raises). Returns True if the song was new, otherwise False.
+    conn = get_connection(database_path())
+
+    row = _song_row(metadata)
+
+    def write(cursor):
+        _insert_artists_and_albums(cursor, [row])
+        cursor.execute(_INSERT_SONG_SQL, row)
+        return cursor.rowcount == 1
+
+    is_new = run_write_transaction(conn, write)
+
+    if is_new:
+        add_known_songs([row[-1]])  # keep the known songs cache in step
+        _invalidate_song_queries()
+
+    return is_new
+
+
+def insert_songs_batch(records, chunk_size=IMPORT_BATCH_SIZE):
+    # Insert a sequence of song metadata records, committing once per chunk rather than once per song.
+    # Returns a list of is_duplicate flags - one per record, in the same order as the records passed in.
+    #   -Each record is its own INSERT ... ON CONFLICT DO NOTHING (rather than a single executemany), as the per-row
+    #    rowcount is what reports whether that record was new - the statement is cached, and the commit is still once
+    #    per chunk
+    conn = get_connection(database_path())
+
+    def write_chunk(cursor, rows):
+        chunk_flags = []
+        chunk_song_keys = []
+        _insert_artists_and_albums(cursor, rows)
+        for row in rows:
+            cursor.execute(_INSERT_SONG_SQL, row)
+
+            is_duplicate = cursor.rowcount == 0  # conflict - song already exists (or earlier in the batch)
+            if not is_duplicate:
+                chunk_song_keys.append(row[-1])
+            chunk_flags.append(is_duplicate)
+        return chunk_flags, chunk_song_keys
+
+    duplicate_flags = []
+    for start in range(0, len(records), chunk_size):
+        rows = [_song_row(metadata) for metadata in records[start:start + chunk_size]]
+
+        # One transaction per chunk
+        chunk_flags, new_song_keys = run_write_transaction(conn, lambda cursor: write_chunk(cursor, rows))
+        duplicate_flags.extend(chunk_flags)
+
+        add_known_songs(new_song_keys)  # only once committed - keep the known songs cache in step
+        if new_song_keys:
+            _invalidate_song_queries()
+
+    return duplicate_flags
 
 
 def insert_into_error_log(error_type, error_message):
     if not isinstance(error_type, ErrorType):
         raise ValueError("Error: The 'error_type' passed in must be an instance of ErrorType")
 
-    conn = sqlite3.connect(_database_path)
-    cursor = conn.cursor()
+    conn = get_connection(database_path())
 
     created_date = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
 
-    cursor.execute('''INSERT INTO error_log 
-                      (error_type, error_message, created_date) 
-                      VALUES (?, ?, ?)''',
-                   (error_type.value, error_message, created_date))  # Use ErrorType.value for the TEXT
+    def write(cursor):
+        cursor.execute('''INSERT INTO error_log 
+                          (error_type, error_message, created_date) 
+                          VALUES (?, ?, ?)''',
+                       (error_type.value, error_message, created_date))  # Use ErrorType.value for the TEXT
 
-    error_id = cursor.lastrowid  # retrieve the ID of the newly inserted row
-    conn.commit()
-    conn.close()
+        return cursor.lastrowid  # retrieve the ID of the newly inserted row
+
+    error_id = run_write_transaction(conn, write)
 
     return error_id
 
 
-def get_all_songs():
-    conn = sqlite3.connect(_database_path)
-    cursor = conn.cursor()
+def _iter_pages(fetch_page):
+    # Stream every row by walking the keyset pages of fetch_page (e.g. get_songs_page), rather than loading every row
+    # into memory at once (fetchall)
+    #   -Each page is its own short query - a long export never holds a read open, which would stop the WAL file from
+    #    being checkpointed (see checkpoint_database) until the export finished
+    #   -Rows are id first and created_date last - the keyset of the next page
+    after = None
+    while True:
+        rows = fetch_page(after=after, limit=EXPORT_CHUNK_SIZE)
+        yield from rows
 
-    cursor.execute('''SELECT 
-                         song
-                        ,album
-                        ,artist
-                        ,approx_release_date
-                        ,"time"
-                        ,file_size
-                        ,created_date
-                    FROM songs
-                    ORDER BY created_date DESC'''
-                   )
-    songs = cursor.fetchall()
-
-    conn.close()
-
-    return songs
-
-
-def get_songs_by_name(song_name):
-    # Fetch songs from the database that match the provided song name.
-    conn = sqlite3.connect(_database_path)
+        if len(rows) < EXPORT_CHUNK_SIZE:
+            return
+        after = (rows[-1][-1], rows[-1][0])
+
+
+def iter_all_songs():
+    # Every song, newest first, streamed - (song, album, artist, approx_release_date, duration_ms, file_size_bytes,
+    # created_date)
+    return (row[1:] for row in _iter_pages(get_songs_page))
+
+
+def iter_error_logs(processing_only=False):
+    # Every error (or only the processing errors), newest first, streamed - rows as get_error_logs_page
+    return _iter_pages(lambda after, limit: get_error_logs_page(after=after, limit=limit,
+                                                                processing_only=processing_only))
+
+
+def get_songs_page(after=None, before=None, limit=VIEWER_PAGE_SIZE):
+    # Keyset pagination over the songs, newest first (created_date DESC, id DESC) - each page is a short index range
+    # scan (idx_songs_created_date_id), no matter how deep into the library it is.
+    #   -after - (created_date, id) of the last row of the previous page - returns the rows that follow it
+    #   -before - (created_date, id) of the first row of the next page - returns the rows that precede it
+    #   -Neither - returns the first page
+    # Rows are (id, song, album, artist, approx_release_date, duration_ms, file_size_bytes, created_date), always newest
+    # first.
+    conn = get_connection(database_path())
     cursor = conn.cursor()
 
-    cursor.execute('''SELECT 
-                                song
-                                ,album
-                                ,artist
-                                ,approx_release_date
-                                ,"time"
-                                ,file_size
-                                ,created_date 
-                            FROM songs 
-                            WHERE song LIKE ?
-                            ORDER BY created_date DESC''',
-                   ('%' + song_name + '%',))
+    select_columns = '''SELECT 
+                            s.id
+                           ,s.song
+                           ,al.name
+                           ,ar.name
+                           ,s.approx_release_date
+                           ,s.duration_ms
+                           ,s.file_size_bytes
+                           ,s.created_date
+                         FROM songs s 
+                         JOIN albums al ON al.album_id = s.album_id 
+                         JOIN artists ar ON ar.artist_id = al.artist_id '''
 
-    results = cursor.fetchall()
-    conn.close()
+    if before is not None:
+        # Walk the index in the opposite direction, then flip the page back to newest first
+        cursor.execute(select_columns + '''WHERE (s.created_date, s.id) > (?, ?) 
+                                           ORDER BY s.created_date ASC, s.id ASC 
+                                           LIMIT ?''',
+                       (*before, limit))
+        return cursor.fetchall()[::-1]
+
+    if after is not None:
+        cursor.execute(select_columns + '''WHERE (s.created_date, s.id) < (?, ?) 
+                                           ORDER BY s.created_date DESC, s.id DESC 
+                                           LIMIT ?''',
+                       (*after, limit))
+    else:
+        cursor.execute(select_columns + '''ORDER BY s.created_date DESC, s.id DESC 
+                                           LIMIT ?''',
+                       (limit,))
+
+    return cursor.fetchall()
+
+
+# LRU cache of recent search results - so typing and backspacing over the same text doesn't re-run the query.
+# Cleared whenever songs is written to (see _invalidate_song_queries).
+_search_cache = OrderedDict()
+_search_cache_lock = threading.Lock()
+_songs_write_generation = 0  # incremented on every write to songs - stops a query that overlapped a write being cached
+
+
+def _invalidate_song_queries():
+    global _songs_write_generation
+
+    with _search_cache_lock:
+        _songs_write_generation += 1
+        _search_cache.clear()
+
+
+def search_songs_cached(search_text, limit=SEARCH_RESULT_LIMIT):
+    cache_key = (search_text.strip().lower(), limit)
+
+    with _search_cache_lock:
+        if cache_key in _search_cache:
+            _search_cache.move_to_end(cache_key)  # most recently used
+            return _search_cache[cache_key]
+        write_generation = _songs_write_generation
+
+    results = search_songs(search_text, limit)
+
+    with _search_cache_lock:
+        if write_generation == _songs_write_generation:
+            _search_cache[cache_key] = results
+            if len(_search_cache) > SEARCH_CACHE_SIZE:
+                _search_cache.popitem(last=False)  # least recently used
 
     return results
 
 
-def get_all_error_logs():
-    conn = sqlite3.connect(_database_path)
+def search_songs(search_text, limit=SEARCH_RESULT_LIMIT):
+    # Fetch songs whose song, album or artist contains the search text (case-insensitive), best matches first.
+    #   -Uses the songs_fts full-text index (trigram tokenizer), so no full table scan is needed
+    #   -The trigram index needs at least 3 characters - shorter searches fall back to LIKE (still limited)
+    conn = get_connection(database_path())
     cursor = conn.cursor()
 
-    cursor.execute('''SELECT 
-                         error_id
-                        ,error_type
-                        ,error_message
-                        ,created_date 
-                    FROM error_log 
-                    ORDER BY created_date DESC'''
-                   )
-    song_error_logs = cursor.fetchall()
+    search_text = search_text.strip()
+    if len(search_text) >= 3:
+        # Quoted as a single phrase, so FTS5 syntax characters within the search text are treated literally
+        fts_query = '"' + search_text.replace('"', '""') + '"'
+        cursor.execute('''SELECT 
+                             s.song
+                            ,al.name
+                            ,ar.name
+                            ,s.approx_release_date
+                            ,s.duration_ms
+                            ,s.file_size_bytes
+                            ,s.created_date 
+                          FROM songs_fts 
+                          JOIN songs s ON s.id = songs_fts.rowid 
+                          JOIN albums al ON al.album_id = s.album_id 
+                          JOIN artists ar ON ar.artist_id = al.artist_id 
+                          WHERE songs_fts MATCH ? 
+                          ORDER BY songs_fts.rank, s.created_date DESC 
+                          LIMIT ?''',
+                       (fts_query, limit))
+    else:
+        like_text = '%' + search_text + '%'
+        cursor.execute('''SELECT 
+                             s.song
+                            ,al.name
+                            ,ar.name
+                            ,s.approx_release_date
+                            ,s.duration_ms
+                            ,s.file_size_bytes
+                            ,s.created_date 
+                          FROM songs s 
+                          JOIN albums al ON al.album_id = s.album_id 
+                          JOIN artists ar ON ar.artist_id = al.artist_id 
+                          WHERE s.song LIKE ? OR al.name LIKE ? OR ar.name LIKE ? 
+                          ORDER BY s.created_date DESC 
+                          LIMIT ?''',
+                       (like_text, like_text, like_text, limit))
 
-    conn.close()
+    results = cursor.fetchall()
 
-    return song_error_logs
+    return results
 
 
-def get_processing_error_logs():
-    conn = sqlite3.connect(_database_path)
+def get_error_logs_page(after=None, before=None, limit=VIEWER_PAGE_SIZE, processing_only=False):
+    # Keyset pagination over the error log, newest first (created_date DESC, error_id DESC) - as get_songs_page
+    #   -after/before - (created_date, error_id) of the last row of the previous page/first row of the next page
+    #   -processing_only - only the processing errors (idx_error_log_type_created_date_id, otherwise
+    #    idx_error_log_created_date_id)
+    # Rows are (error_id, error_type, error_message, created_date), always newest first.
+    conn = get_connection(database_path())
     cursor = conn.cursor()
 
-    cursor.execute('''SELECT 
-                         error_id
-                        ,error_type
-                        ,error_message
-                        ,created_date 
-                      FROM error_log 
-                      WHERE error_type=? 
-                      ORDER BY created_date DESC''',
-                   (ErrorType.PROCESSING_ERROR.value,)
-                   )
-    processing_error_logs = cursor.fetchall()
+    conditions = []
+    params = []
+    if processing_only:
+        conditions.append("error_type = ?")
+        params.append(ErrorType.PROCESSING_ERROR.value)
 
-    conn.close()
+    if before is not None:
+        # Walk the index in the opposite direction, then flip the page back to newest first
+        conditions.append("(created_date, error_id) > (?, ?)")
+        params.extend(before)
+        order_by = "created_date ASC, error_id ASC"
+    else:
+        if after is not None:
+            conditions.append("(created_date, error_id) < (?, ?)")
+            params.extend(after)
+        order_by = "created_date DESC, error_id DESC"
+
+    where = f"WHERE {' AND '.join(conditions)} " if conditions else ""
+    cursor.execute(f'''SELECT 
+                          error_id
+                         ,error_type
+                         ,error_message
+                         ,created_date 
+                       FROM error_log 
+                       {where}
+                       ORDER BY {order_by} 
+                       LIMIT ?''',
+                   (*params, limit))
+    rows = cursor.fetchall()
 
-    return processing_error_logs
+    return rows[::-1] if before is not None else rows
 
 
 def delete_song(song, album, artist):
-    conn = sqlite3.connect(_database_path)
-    cursor = conn.cursor()
+    conn = get_connection(database_path())
 
-    cursor.execute("DELETE FROM songs WHERE song=? AND album=? AND artist=?",
-                   (song, album, artist))
+    def write(cursor):
+        cursor.execute('''SELECT s.id, s.album_id, al.artist_id, s.song_key 
+                          FROM songs s 
+                          JOIN albums al ON al.album_id = s.album_id 
+                          JOIN artists ar ON ar.artist_id = al.artist_id 
+                          WHERE s.song=? AND al.name=? AND ar.name=?''',
+                       (song, album, artist))
+        row = cursor.fetchone()
+        if row is None:
+            return None
 
-    conn.commit()
-    conn.close()
+        song_id, album_id, artist_id, song_key = row
+        cursor.execute("DELETE FROM songs WHERE id=?", (song_id,))
+
+        # Remove the album/artist along with their last song
+        cursor.execute("DELETE FROM albums WHERE album_id=? AND NOT EXISTS (SELECT 1 FROM songs WHERE album_id=?)",
+                       (album_id, album_id))
+        cursor.execute("DELETE FROM artists WHERE artist_id=? AND NOT EXISTS (SELECT 1 FROM albums WHERE artist_id=?)",
+                       (artist_id, artist_id))
+        return song_key
+
+    # The stored key rather than one computed from the arguments - the database viewer's rows can hand back numeric
+    # looking names as ints
+    try:
+        song_key = run_write_transaction(conn, write)
+        if song_key is not None:
+            remove_known_song(song_key)  # keep the known songs cache in step
+    finally:
+        _invalidate_song_queries()
 
 
 def delete_error_log(error_id):
-    conn = sqlite3.connect(_database_path)
-    cursor = conn.cursor()
+    conn = get_connection(database_path())
 
     # Even if single param, SQLite expects a tuple '(item,)'
-    cursor.execute("DELETE FROM error_log WHERE error_id=?", (error_id,))
+    run_write_transaction(conn, lambda cursor: cursor.execute("DELETE FROM error_log WHERE error_id=?", (error_id,)))
+
+
+CACHED_MEDIA_FIELDS = ('approx_release_date', 'duration_ms', 'file_size_bytes')
+
+
+def get_cached_media_fields(file_paths):
+    # Returns {file_path: ((file_size_bytes, mtime_ns), media_fields)} for every file_path in the metadata cache
+    conn = get_connection(database_path())
+    cursor = conn.cursor()
+
+    cached_fields = {}
+    for start in range(0, len(file_paths), IMPORT_BATCH_SIZE):  # stay well within SQLite's bound parameter limit
+        chunk = file_paths[start:start + IMPORT_BATCH_SIZE]
+        cursor.execute(f'''SELECT 
+                              file_path
+                             ,file_size_bytes
+                             ,mtime_ns
+                             ,approx_release_date
+                             ,duration_ms
+                             ,media_file_size_bytes
+                          FROM metadata_cache 
+                          WHERE file_path IN ({", ".join("?" * len(chunk))})''',
+                       chunk)
+
+        for file_path, file_size_bytes, mtime_ns, *media_values in cursor.fetchall():
+            cached_fields[file_path] = ((file_size_bytes, mtime_ns), dict(zip(CACHED_MEDIA_FIELDS, media_values)))
+
+    return cached_fields
+
+
+def save_cached_media_fields(entries):
+    # entries - [(file_path, (file_size_bytes, mtime_ns), media_fields), ...] - replaces any outdated entry
+    #   -At most METADATA_CACHE_MAX_ENTRIES are kept - the entries cached longest ago are removed. A replaced entry is
+    #    given the next rowid, so rowid order is the order entries were cached in and pruning is an index range delete.
+    conn = get_connection(database_path())
+
+    cached_date = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    rows = [(file_path, file_size_bytes, mtime_ns, *(media_fields[field] for field in CACHED_MEDIA_FIELDS), cached_date)
+            for file_path, (file_size_bytes, mtime_ns), media_fields in entries]
+
+    def write(cursor):
+        cursor.executemany('''INSERT OR REPLACE INTO metadata_cache 
+                              (file_path, file_size_bytes, mtime_ns, approx_release_date, duration_ms, 
+                               media_file_size_bytes, cached_date) 
+                              VALUES (?, ?, ?, ?, ?, ?, ?)''',
+                           rows)
+        cursor.execute("DELETE FROM metadata_cache WHERE rowid <= (SELECT MAX(rowid) FROM metadata_cache) - ?",
+                       (METADATA_CACHE_MAX_ENTRIES,))
+
+    run_write_transaction(conn, write)
 
-    conn.commit()
-    conn.close()
+
+def get_songs_by_identity(identities):
+    # Fetch the stored metadata of already-imported songs, keyed by (song, album, artist)
+    #   -identities - list of dicts with 'song', 'album' and 'artist' (see metadata_extractor.derive_song_identity)
+    conn = get_connection(database_path())
+    cursor = conn.cursor()
+
+    song_keys = [compute_song_key(identity['song'], identity['album'], identity['artist']) for identity in identities]
+
+    stored_songs = {}
+    for start in range(0, len(song_keys), IMPORT_BATCH_SIZE):  # stay well within SQLite's bound parameter limit
+        chunk = song_keys[start:start + IMPORT_BATCH_SIZE]
+        cursor.execute(f'''SELECT 
+                              s.song
+                             ,al.name
+                             ,ar.name
+                             ,s.approx_release_date
+                             ,s.duration_ms
+                             ,s.file_size_bytes
+                             ,s.created_date
+                          FROM songs s 
+                          JOIN albums al ON al.album_id = s.album_id 
+                          JOIN artists ar ON ar.artist_id = al.artist_id 
+                          WHERE s.song_key IN ({", ".join("?" * len(chunk))})''',
+                       chunk)
+
+        for song, album, artist, approx_release_date, duration_ms, file_size_bytes, created_date in cursor.fetchall():
+            stored_songs[(song, album, artist)] = {
+                'song': song, 'album': album, 'artist': artist, 'approx_release_date': approx_release_date,
+                'duration_ms': duration_ms, 'file_size_bytes': file_size_bytes, 'created_date': created_date
+            }
+
+    return stored_songs
 
 
 def check_song_exists(song, album, artist):
-    # Check if a song already exists in the database.
-    conn = sqlite3.connect(_database_path)
+    # Check if a song already exists in the database
+    #   -A song the in-memory known songs cache hasn't seen is new (no database round trip) - loaded by the first check
+    #   -A song it has seen is confirmed with an index lookup via idx_songs_song_key - the cache only sees this
+    #    process's writes, so the song may since have been deleted by the CLI, another window or another tool. A song
+    #    added by one of those is missed by the cache, but still caught as a duplicate when it is inserted.
+    song_key = compute_song_key(song, album, artist)
+    ensure_song_key_cache_loaded(_read_song_keys)
+    if is_known_song(song_key) is False:
+        return False
+
+    conn = get_connection(database_path())
     cursor = conn.cursor()
 
-    cursor.execute("SELECT 1 FROM songs WHERE song=? AND album=? AND artist=?",
-                   (song, album, artist))
+    cursor.execute('''SELECT 1 
+                      FROM songs s 
+                      JOIN albums al ON al.album_id = s.album_id 
+                      JOIN artists ar ON ar.artist_id = al.artist_id 
+                      WHERE s.song_key=? AND s.song=? AND al.name=? AND ar.name=?''',
+                   (song_key, song, album, artist))
 
     result = cursor.fetchone()
-    conn.close()
+    if result is None:
+        remove_known_song(song_key)  # deleted elsewhere - correct the cache
 
     return bool(result)  # returns True if a record is found, otherwise False
+
+
+def _read_song_keys():
+    # (song count, every song_key) - for loading the known songs cache (see song_key_cache.py)
+    cursor = get_connection(database_path()).cursor()
+    song_count = cursor.execute("SELECT COUNT(*) FROM songs").fetchone()[0]
+    return song_count, (row[0] for row in cursor.execute("SELECT song_key FROM songs"))
+
+
+# ---- Import Journal ----
+IMPORT_FILE_DONE = "done"
+IMPORT_FILE_FAILED = "failed"
+
+IMPORT_SESSION_RUNNING = "running"
+IMPORT_SESSION_COMPLETED = "completed"
+IMPORT_SESSION_INCOMPLETE = "incomplete"
+
+
+def create_import_session(folder_paths):
+    # Start a new import session - returns its session_id
+    conn = get_connection(database_path())
+
+    created_date = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+
+    def write(cursor):
+        cursor.execute('''INSERT INTO import_sessions 
+                          (folder_paths, status, created_date) 
+                          VALUES (?, ?, ?)''',
+                       (json.dumps(list(folder_paths)), IMPORT_SESSION_RUNNING, created_date))
+        return cursor.lastrowid
+
+    return run_write_transaction(conn, write)
+
+
+def update_import_journal(session_id, folder_path, file_results):
+    # Record the outcome of a batch of files from a folder - file_results = [(file_path, status, error_message), ...]
+    #   -A single transaction. A file retried by a resumed import replaces its earlier outcome.
+    conn = get_connection(database_path())
+
+    run_write_transaction(conn, lambda cursor: cursor.executemany(
+        '''INSERT INTO import_journal 
+           (session_id, folder_path, file_path, status, error_message) 
+           VALUES (?, ?, ?, ?, ?) 
+           ON CONFLICT (session_id, file_path) DO UPDATE SET 
+               status=excluded.status 
+              ,error_message=excluded.error_message''',
+        [(session_id, folder_path, file_path, status, error_message)
+         for file_path, status, error_message in file_results]))
+
+
+def finish_import_session(session_id, status):
+    # Mark the session completed or incomplete. A completed session's journal is no longer needed, so it is removed
+    # (the session itself is kept as a record of the import).
+    conn = get_connection(database_path())
+
+    finished_date = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+
+    def write(cursor):
+        cursor.execute("UPDATE import_sessions SET status=?, finished_date=? WHERE session_id=?",
+                       (status, finished_date, session_id))
+        if status == IMPORT_SESSION_COMPLETED:
+            cursor.execute("DELETE FROM import_journal WHERE session_id=?", (session_id,))
+
+    run_write_transaction(conn, write)
+
+
+def get_last_unfinished_import_session():
+    # The newest import session that did not complete (cancelled, failed files, or the app closed mid-import)
+    # Returns (session_id, folder_paths, created_date), or None if the last import completed.
+    conn = get_connection(database_path())
+    cursor = conn.cursor()
+
+    cursor.execute('''SELECT 
+                         session_id
+                        ,folder_paths
+                        ,status
+                        ,created_date 
+                      FROM import_sessions 
+                      ORDER BY session_id DESC 
+                      LIMIT 1''')
+    row = cursor.fetchone()
+
+    if row is None or row[2] == IMPORT_SESSION_COMPLETED:
+        return None
+
+    session_id, folder_paths, _, created_date = row
+    return session_id, json.loads(folder_paths), created_date
+
+
+def get_imported_journal_files(session_id):
+    # The files a session has already imported - {file_path, ...}. A resumed import skips these; every other file
+    # (failed, or never reached) is imported again.
+    conn = get_connection(database_path())
+    cursor = conn.cursor()
+
+    cursor.execute('''SELECT 
+                         file_path 
+                      FROM import_journal 
+                      WHERE session_id=? AND status=?''',
+                   (session_id, IMPORT_FILE_DONE))
+
+    return {row[0] for row in cursor.fetchall()}
+
+
+# ---- Library Snapshot ----
+def get_library_snapshot():
+    # Returns {folder_path: (mtime_ns, [subfolder name, ...])} for every folder seen by the last library sync
+    conn = get_connection(database_path())
+    cursor = conn.cursor()
+
+    cursor.execute('''SELECT 
+                         folder_path
+                        ,mtime_ns
+                        ,subfolders 
+                      FROM library_snapshot''')
+
+    return {folder_path: (mtime_ns, json.loads(subfolders)) for folder_path, mtime_ns, subfolders in cursor.fetchall()}
+
+
+def save_library_snapshot(entries):
+    # entries - [(folder_path, mtime_ns, [subfolder name, ...]), ...] - replaces any earlier entry, a single transaction
+    conn = get_connection(database_path())
+
+    run_write_transaction(conn, lambda cursor: cursor.executemany(
+        '''INSERT OR REPLACE INTO library_snapshot 
+           (folder_path, mtime_ns, subfolders) 
+           VALUES (?, ?, ?)''',
+        [(folder_path, mtime_ns, json.dumps(subfolders)) for folder_path, mtime_ns, subfolders in entries]))
+
+
+def delete_library_snapshot(folder_paths=None):
+    # Forget the passed in folders (e.g. removed from the music folder) - or every folder if None, so the next library
+    # sync lists and imports the whole music folder again
+    conn = get_connection(database_path())
+
+    if folder_paths is None:
+        run_write_transaction(conn, lambda cursor: cursor.execute("DELETE FROM library_snapshot"))
+    else:
+        run_write_transaction(conn, lambda cursor: cursor.executemany(
+            "DELETE FROM library_snapshot WHERE folder_path=?", [(folder_path,) for folder_path in folder_paths]))
+
+
+# ---- Perf Log ----
+PERF_LOG_TOTAL_STAGE = "total"  # stage of the row holding an import's overall time and throughput
+
+
+def insert_perf_log(source, summary):
+    # Save an import timing summary (see perf.ImportTimings.summary) - a single transaction. Only the newest
+    # PERF_LOG_KEEP_RUNS imports are kept. Returns the run_id.
+    conn = get_connection(database_path())
+
+    created_date = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+
+    def write(cursor):
+        # Read under the write lock (run_write_transaction begins IMMEDIATE) - an import finishing in another process at
+        # the same moment waits, then gets the next run_id
+        run_id = cursor.execute("SELECT COALESCE(MAX(run_id), 0) + 1 FROM perf_log").fetchone()[0]
+
+        rows = [(run_id, source, PERF_LOG_TOTAL_STAGE, summary['files'], summary['elapsed_seconds'] * 1000, None, None,
+                 summary['files_per_second'], created_date)]
+        for stage in summary['stages']:
+            seconds = stage['total_seconds']
+            rows.append((run_id, source, stage['stage'], stage['files'], seconds * 1000, stage['p50_ms'],
+                         stage['p95_ms'], stage['files'] / seconds if seconds and stage['files'] else None,
+                         created_date))
+
+        cursor.executemany('''INSERT INTO perf_log 
+                              (run_id, source, stage, files, total_ms, p50_ms, p95_ms, files_per_second, created_date) 
+                              VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)''',
+                           rows)
+        cursor.execute("DELETE FROM perf_log WHERE run_id <= ?", (run_id - PERF_LOG_KEEP_RUNS,))
+        return run_id
+
+    return run_write_transaction(conn, write)
+
+
+def get_perf_logs():
+    # Every saved import timing summary, newest import first - each import's total row, then its stages in order
+    # Rows are (run_id, source, stage, files, total_ms, p50_ms, p95_ms, files_per_second, created_date)
+    conn = get_connection(database_path())
+    cursor = conn.cursor()
+
+    cursor.execute('''SELECT 
+                         run_id
+                        ,source
+                        ,stage
+                        ,files
+                        ,ROUND(total_ms, 3)
+                        ,ROUND(p50_ms, 3)
+                        ,ROUND(p95_ms, 3)
+                        ,ROUND(files_per_second, 1)
+                        ,created_date 
+                      FROM perf_log 
+                      ORDER BY run_id DESC, perf_id ASC''')
+
+    return cursor.fetchall()
@@ -0,0 +1,251 @@
+import csv
+import json
+import os
+import re
+from datetime import datetime
+from settings import (IS_TEST_MODE, APP_ROOT_FOLDER_TEST_MODE, APP_ROOT_FOLDER, EXPORT_CHUNK_SIZE, EXCEL_MAX_ROWS)
+
+
+def export_directory():
+    # Save the exported files to the path defined within the save_directory variable
+    root_directory = os.path.expanduser("~")  # e.g. '/Users/nicholaspackham'
+
+    # Using two different directories for testing and prod
+    if IS_TEST_MODE:
+        save_directory = os.path.join(root_directory, APP_ROOT_FOLDER_TEST_MODE)
+    else:
+        save_directory = os.path.join(root_directory, APP_ROOT_FOLDER)
+
+    # Append 'Excel Exports' on to APP_ROOT_FOLDER*
+    save_directory = os.path.join(save_directory, "Excel Exports")
+
+    # Create the directory - if it does not exist
+    os.makedirs(save_directory, exist_ok=True)
+
+    return save_directory
+
+
+def export_file_path(doc_prefix, file_extension):
+    # Generate the file name - which will provide the full file_path
+    current_datetime = datetime.now().strftime("%Y%m%d_%H%M%S")
+    return os.path.join(export_directory(), f"{doc_prefix}_{current_datetime}{file_extension}")
+
+
+def write_excel(file_path, col_headers, rows, hide_column_b, on_progress=None, sheet_title="Songs"):
+    # Stream rows into an Excel file using openpyxl's write-only mode - rows are written straight to disk, so memory use
+    # stays flat no matter how many rows are exported.
+    #   -Column widths are worked out as the rows are written (no second pass over the sheet). A write-only sheet needs
+    #    its widths before its first row, so the first chunk of rows is held back to size the first sheet
+    #   -Sheets roll over to "<sheet_title> (2)", "(3)"... past Excel's row limit
+    # Returns the number of rows written.
+    # openpyxl is imported on the first Excel export rather than at startup - it takes longer to import than the rest of
+    # the application
+    from openpyxl import Workbook
+    from openpyxl.cell import WriteOnlyCell
+    from openpyxl.styles import (Font, Alignment, Border, Side, PatternFill)
+    from openpyxl.utils import get_column_letter
+
+    workbook = Workbook(write_only=True)
+    column_widths = [len(str(header)) + 2 for header in col_headers]
+
+    # Define styling for headers (excel)
+    header_font = Font(bold=True, color="FFFFFF")
+    header_fill = PatternFill(start_color="4F81BD", end_color="4F81BD", fill_type="solid")
+    alignment = Alignment(horizontal="center", vertical="center")
+    thin_border = Border(left=Side(style='thin'), right=Side(style='thin'), top=Side(style='thin'),
+                         bottom=Side(style='thin'))
+
+    def track_widths(row):
+        for index, value in enumerate(row):
+            value_width = len(str(value) if value is not None else "") + 2
+            if index < len(column_widths) and value_width > column_widths[index]:
+                column_widths[index] = value_width
+
+    def new_sheet(sheet_number):
+        sheet = workbook.create_sheet(sheet_title if sheet_number == 1 else f"{sheet_title} ({sheet_number})")
+
+        # Auto-fit columns - must be set before the first row is written
+        for index, width in enumerate(column_widths, start=1):
+            sheet.column_dimensions[get_column_letter(index)].width = width
+
+        # ***Only relevant to Song trees (new and database) - not error log tree
+        #   -Hide column "B" for the Song trees - Album column
+        #   -Album column not really required, and gets in the way when using Apple Music and the Excel export together
+        if hide_column_b:
+            sheet.column_dimensions["B"].hidden = True
+
+        # Add headers with styling (excel)
+        header_cells = []
+        for header in col_headers:
+            cell = WriteOnlyCell(sheet, value=header)
+            cell.font = header_font
+            cell.fill = header_fill
+            cell.alignment = alignment
+            cell.border = thin_border
+            header_cells.append(cell)
+        sheet.append(header_cells)
+
+        return sheet
+
+    def finish_sheet(sheet, sheet_rows):
+        # Add filters to the header row (excel)
+        sheet.auto_filter.ref = f"A1:{get_column_letter(len(col_headers))}{sheet_rows + 1}"
+
+    rows = iter(rows)
+
+    # Hold back the first chunk, so the first sheet's column widths reflect the data
+    first_chunk = []
+    for row in rows:
+        first_chunk.append(row)
+        track_widths(row)
+        if len(first_chunk) >= EXPORT_CHUNK_SIZE:
+            break
+
+    rows_per_sheet = EXCEL_MAX_ROWS - 1  # header row
+    sheet_number = 1
+    sheet = new_sheet(sheet_number)
+    sheet_rows = 0
+    total_rows = 0
+
+    def all_rows():
+        yield from first_chunk
+        for remaining_row in rows:
+            track_widths(remaining_row)
+            yield remaining_row
+
+    for row in all_rows():
+        if sheet_rows == rows_per_sheet:
+            finish_sheet(sheet, sheet_rows)
+            sheet_number += 1
+            sheet = new_sheet(sheet_number)
+            sheet_rows = 0
+
+        sheet.append(list(row))
+        sheet_rows += 1
+        total_rows += 1
+
+        if on_progress and total_rows % EXPORT_CHUNK_SIZE == 0:
+            on_progress(total_rows)
+
+    finish_sheet(sheet, sheet_rows)
+
+    # Save the workbook
+    workbook.save(file_path)
+
+    return total_rows
+
+
+def write_csv(file_path, col_headers, rows, hide_column_b, on_progress=None):
+    # Stream rows into a CSV file (UTF-8, header row first). hide_column_b only applies to Excel.
+    total_rows = 0
+    with open(file_path, "w", newline="", encoding="utf-8") as csv_file:
+        writer = csv.writer(csv_file)
+        writer.writerow(col_headers)
+
+        for row in rows:
+            writer.writerow(row)
+            total_rows += 1
+
+            if on_progress and total_rows % EXPORT_CHUNK_SIZE == 0:
+                on_progress(total_rows)
+
+    return total_rows
+
+
+def write_jsonl(file_path, col_headers, rows, hide_column_b, on_progress=None):
+    # Stream rows into a JSON Lines file - one JSON object per row, keyed by field_name(header)
+    field_names = [field_name(header) for header in col_headers]
+
+    total_rows = 0
+    with open(file_path, "w", encoding="utf-8") as jsonl_file:
+        for row in rows:
+            jsonl_file.write(json.dumps(dict(zip(field_names, row)), ensure_ascii=False, default=str))
+            jsonl_file.write("\n")
+            total_rows += 1
+
+            if on_progress and total_rows % EXPORT_CHUNK_SIZE == 0:
+                on_progress(total_rows)
+
+    return total_rows
+
+
+# Parquet column types of the numeric export columns (by field_name) - every other column is written as a string
+PARQUET_NUMERIC_FIELDS = {
+    "error_id": "int64",  # error log
+    "run_id": "int64",  # perf log (see constants.PERF_LOG_COLUMNS)
+    "files": "int64",
+    "total_ms": "float64",
+    "p50_per_file_ms": "float64",
+    "p95_per_file_ms": "float64",
+    "files_s": "float64"
+}
+
+
+def write_parquet(file_path, col_headers, rows, hide_column_b, on_progress=None):
+    # Stream rows into a Parquet file, one row group per chunk - requires the optional pyarrow package
+    #   -The schema is declared up front from the column headers (see PARQUET_NUMERIC_FIELDS), rather than inferred
+    #    from the first chunk - a column with no values in the first chunk (e.g. p50 per File) still gets its type
+    #   -String columns take any value as text - a Treeview row can hold a numeric looking song name as an int
+    import pyarrow
+    import pyarrow.parquet
+
+    field_names = [field_name(header) for header in col_headers]
+    schema = pyarrow.schema([(name, PARQUET_NUMERIC_FIELDS.get(name, "string")) for name in field_names])
+    string_columns = {name for name in field_names if name not in PARQUET_NUMERIC_FIELDS}
+
+    total_rows = 0
+    with pyarrow.parquet.ParquetWriter(file_path, schema) as writer:  # no rows - still a valid (empty) file
+        for chunk in _chunks(rows, EXPORT_CHUNK_SIZE):
+            columns = {}
+            for index, name in enumerate(field_names):
+                values = [row[index] for row in chunk]
+                if name in string_columns:
+                    values = [str(value) if value is not None else None for value in values]
+                columns[name] = values
+
+            writer.write_table(pyarrow.Table.from_pydict(columns, schema=schema))
+            total_rows += len(chunk)
+
+            if on_progress:
+                on_progress(total_rows)
+
+    return total_rows
+
+
+def is_parquet_available():
+    try:
+        import pyarrow.parquet  # noqa: F401 - optional dependency
+        return True
+    except ImportError:
+        return False
+
+
+# Export format -> (file extension, writer). Every writer streams rows and returns the number of rows written.
+EXPORT_FORMATS = {
+    "Excel": (".xlsx", write_excel),
+    "CSV": (".csv", write_csv),
+    "JSON Lines": (".jsonl", write_jsonl),
+    "Parquet": (".parquet", write_parquet)
+}
+
+
+def available_export_formats():
+    # Parquet is only offered when pyarrow is installed
+    return [export_format for export_format in EXPORT_FORMATS
+            if export_format != "Parquet" or is_parquet_available()]
+
+
+def field_name(header):
+    # Column header -> field name for JSON Lines/Parquet, e.g. "Approx. Release Date" -> "approx_release_date"
+    return re.sub(r"[^a-z0-9]+", "_", str(header).lower()).strip("_")
+
+
+def _chunks(rows, chunk_size):
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) >= chunk_size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
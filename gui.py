@@ -1,11 +1,13 @@
-import shutil
 import tkinter as tk
 from tkinter import (ttk, Toplevel, filedialog, messagebox)
 from tkinterdnd2 import (TkinterDnD, DND_FILES)
 from gui_components import (create_custom_style, create_button, set_search_bar_placeholder, on_focus_in, on_focus_out,
                             setup_treeview, on_drop, load_all_songs, load_all_error_logs, load_processing_error_logs,
-                            refresh_db_data, refresh_err_data, search_song, delete_selected_songs,
-                            delete_selected_error_log, export_to_excel, save_database_backup)
+                            refresh_db_data, refresh_err_data, search_song, on_search_key_release,
+                            delete_selected_songs, delete_selected_error_log, export_data, save_database_backup,
+                            cancel_import, resume_last_import, start_library_sync, get_song_export_source,
+                            get_error_log_export_source, create_export_format_picker, schedule_auto_backup,
+                            schedule_wal_checkpoint, schedule_library_sync, export_perf_log)
 from constants import HELP_AND_INFORMATION_TEXT
 
 
@@ -15,7 +17,7 @@ def setup_gui(icon_path):
     root = TkinterDnD.Tk()
 
     # Set the initial window size
-    root.geometry("1220x325")
+    root.geometry("1340x325")
     root.title("Echo Library")
     root.configure(bg="#333333")
 
@@ -28,14 +30,21 @@ def setup_gui(icon_path):
 
     # Setup main drag-and-drop area and table for the main window
     main_frame = ttk.Frame(root)
-    mf_tree = setup_mf_table(main_frame)
+    mf_tree, mf_status_label = setup_mf_table(main_frame)
 
     # Setup button frame
-    setup_button_frame_mf(root, mf_tree)
+    setup_button_frame_mf(root, mf_tree, mf_status_label)
 
     # Complete main_frame
     main_frame.pack(fill='both', expand=True, pady=(0, 0))
 
+    # Periodic background backups (off unless AUTO_BACKUP_INTERVAL_MINUTES is set)
+    schedule_auto_backup(root)
+    schedule_wal_checkpoint(root)
+
+    # Import new songs from the music folder as they appear (off unless LIBRARY_SYNC_ENABLED is set)
+    schedule_library_sync(root, mf_tree, mf_status_label)
+
     return root
 
 
@@ -71,10 +80,13 @@ def open_database_window():
     tree_frame.grid(row=1, column=0, sticky="nsew")
     db_tree = setup_dbw_table(tree_frame, column_properties)
 
+    # Status label below the Treeview (e.g. export progress)
+    status_label = setup_status_label(db_window)
+
     # Set up the button frame above the Treeview, passing db_tree to it
     button_frame = tk.Frame(db_window)
     button_frame.grid(row=0, column=0, sticky="ew", pady=5)
-    setup_button_frame_dbw(button_frame, db_tree, columns)
+    setup_button_frame_dbw(button_frame, db_tree, columns, status_label)
 
     # Load all songs into the db_tree after setup
     load_all_songs(db_tree)
@@ -129,17 +141,27 @@ def open_error_log_window():
     tree_frame.grid(row=1, column=0, sticky="nsew")
     err_tree = setup_err_table(tree_frame, column_properties)
 
+    # Status label below the Treeview (e.g. export progress)
+    status_label = setup_status_label(err_window)
+
     # Set up the button frame above the Treeview, passing err_tree to it
     button_frame = tk.Frame(err_window)
     button_frame.grid(row=0, column=0, sticky="ew", pady=0)
-    setup_button_frame_err(button_frame, err_tree, columns)
+    setup_button_frame_err(button_frame, err_tree, columns, status_label)
 
     # Load all errors by default
     load_all_error_logs(err_tree)
 
 
+def setup_status_label(window):
+    # Small, left aligned label below the Treeview (row 2) - empty until there is something to report
+    status_label = tk.Label(window, text="", font=("Arial", 8))
+    status_label.grid(row=2, column=0, sticky="w", padx=8, pady=(0, 5))
+    return status_label
+
+
 # ---- Main Frame (Contents) ----
-def setup_button_frame_mf(main_frame, tree):
+def setup_button_frame_mf(main_frame, tree, status_label):
     # Set up the frame holding all buttons and their commands.
     button_frame = tk.Frame(main_frame, bg="#333333")
     button_frame.pack(anchor="w", pady=(10, 0), padx=5)
@@ -156,12 +178,21 @@ def setup_button_frame_mf(main_frame, tree):
 
     export_button = create_button(button_frame,
                                   "Export to Excel",
-                                  lambda: export_to_excel("new-songs",
-                                                          ["Song", "Album", "Artist",
-                                                           "Approx. Release Date", "Status"], tree,
-                                                          True))
+                                  lambda: export_data("new-songs",
+                                                      ["Song", "Album", "Artist",
+                                                       "Approx. Release Date", "Status"], tree,
+                                                      True))
     export_button.pack(side="left", padx=5)
 
+    cancel_button = create_button(button_frame, "Cancel Import", cancel_import)
+    cancel_button.pack(side="left", padx=5)
+
+    resume_button = create_button(button_frame, "Resume Last Import", lambda: resume_last_import(tree, status_label))
+    resume_button.pack(side="left", padx=5)
+
+    sync_button = create_button(button_frame, "Sync Library", lambda: start_library_sync(tree, status_label))
+    sync_button.pack(side="left", padx=5)
+
     err_button = create_button(button_frame, "Error Log", open_error_log_window)
     err_button.pack(side="left", padx=5)
 
@@ -188,11 +219,11 @@ def setup_mf_table(frame):
     frame.drop_target_register(DND_FILES)
     frame.dnd_bind('<<Drop>>', lambda event: on_drop(event, tree, status_font))
 
-    return tree
+    return tree, status_font
 
 
 # ---- Database Window (Contents) ----
-def setup_button_frame_dbw(db_window, db_tree, columns):
+def setup_button_frame_dbw(db_window, db_tree, columns, status_label):
     # Set up the frame holding all buttons and their commands.
     button_frame = tk.Frame(db_window, bg="#333333")
     button_frame.pack(anchor="w", pady=(10, 0), padx=5)
@@ -213,9 +244,11 @@ def setup_button_frame_dbw(db_window, db_tree, columns):
     set_search_bar_placeholder(search_bar)
 
     # Bind focus in and out events for placeholder behavior
-    # Bind 'Enter' key - run search_song func when the 'enter' key is pressed
+    # Bind key release - search as the user types (once they pause typing)
+    # Bind 'Enter' key - run search_song func straight away when the 'enter' key is pressed
     search_bar.bind("<FocusIn>", lambda event: on_focus_in(event))
     search_bar.bind("<FocusOut>", lambda event: on_focus_out(event))
+    search_bar.bind("<KeyRelease>", lambda event: on_search_key_release(db_tree, search_bar))
     search_bar.bind("<Return>", lambda event: search_song(db_tree, search_bar.get(), search_bar))
 
     # ---- Action buttons ----
@@ -236,10 +269,14 @@ def setup_button_frame_dbw(db_window, db_tree, columns):
 
     doc_prefix = "database-songs"
     col_headers = columns
+    export_format_picker = create_export_format_picker(action_frame)
+    export_format_picker.pack(side="left", padx=5)
+
     export_button = create_button(action_frame,
-                                  "Export to Excel",
-                                  command=lambda: export_to_excel(doc_prefix, col_headers, db_tree,
-                                                                  True)
+                                  "Export",
+                                  command=lambda: export_data(doc_prefix, col_headers, db_tree,
+                                                              True, get_song_export_source(db_tree),
+                                                              status_label, export_format_picker.get())
                                   )
     export_button.pack(side="left", padx=5)
 
@@ -252,7 +289,7 @@ def setup_dbw_table(db_window, column_properties):
 
 
 # ---- Error Log Window (Contents) ----
-def setup_button_frame_err(err_window, err_tree, columns):
+def setup_button_frame_err(err_window, err_tree, columns, status_label):
     # Set up the frame holding all buttons and their commands.
     button_frame = tk.Frame(err_window, bg="#333333")
     button_frame.pack(anchor="w", pady=(10, 0), padx=5)
@@ -292,13 +329,24 @@ def setup_button_frame_err(err_window, err_tree, columns):
 
     doc_prefix = "error-log"
     col_headers = columns
+    export_format_picker = create_export_format_picker(button_frame)
+    export_format_picker.pack(side="left", padx=5)
+
     export_button = create_button(button_frame,
-                                  "Export to Excel",
-                                  command=lambda: export_to_excel(doc_prefix, col_headers, err_tree,
-                                                                  False)
+                                  "Export",
+                                  command=lambda: export_data(doc_prefix, col_headers, err_tree,
+                                                              False, get_error_log_export_source(view_all),
+                                                              status_label, export_format_picker.get())
                                   )
     export_button.pack(side="left", padx=5)
 
+    perf_log_button = create_button(button_frame,
+                                    "Export Perf Log",
+                                    command=lambda: export_perf_log(err_tree, status_label,
+                                                                    export_format_picker.get())
+                                    )
+    perf_log_button.pack(side="left", padx=5)
+
     help_button = create_button(button_frame, "Help", open_help_and_info_window)
     help_button.pack(side="left", padx=5)
 
@@ -1,19 +1,22 @@
+import functools
 import os
-import shutil
-import subprocess
+import queue
+import threading
 import tkinter as tk
-from datetime import datetime
 from tkinter import (ttk, messagebox, filedialog)
-from openpyxl import Workbook
-from openpyxl.styles import Font, Alignment, Border, Side, PatternFill
-from openpyxl.utils import get_column_letter
-from database import (check_song_exists, insert_into_songs, insert_into_error_log, get_all_songs,
-                      get_songs_by_name, get_all_error_logs, get_processing_error_logs, delete_song, delete_error_log,
-                      database_path)
-from metadata_extractor import (extract_metadata, is_valid_folder)
-from constants import (SONG_SEARCH_BAR_PLACEHOLDER)
-from settings import (IS_TEST_MODE, APP_ROOT_FOLDER_TEST_MODE, APP_ROOT_FOLDER, APPROVED_MUSIC_FOLDER,
-                      DATABASE_FILE_NAME, DATABASE_FILE_TYPE)
+from database import (insert_into_error_log, iter_all_songs, iter_error_logs, get_songs_page, get_error_logs_page,
+                      search_songs, search_songs_cached, delete_song, delete_error_log, close_thread_connection,
+                      checkpoint_database, get_perf_logs)
+from backup import (start_backup, backup_directory)
+from exporters import (EXPORT_FORMATS, export_file_path, available_export_formats)
+from importer import (import_folders, resume_import, format_import_progress, save_import_timings)
+from library_sync import (sync_library, start_library_watch)
+from metadata_extractor import is_valid_folder
+from perf import (new_import_timings, format_timings_summary, DISABLED_TIMINGS)
+from constants import (SONG_SEARCH_BAR_PLACEHOLDER, PERF_LOG_COLUMNS)
+from settings import (APPROVED_MUSIC_FOLDER, AUTO_BACKUP_INTERVAL_MINUTES, BACKGROUND_POLL_INTERVAL_MS,
+                      BACKGROUND_QUEUE_BATCH, VIEWER_PAGE_SIZE, VIEWER_WINDOW_PAGES, SEARCH_DEBOUNCE_MS,
+                      WAL_CHECKPOINT_INTERVAL_MINUTES, LIBRARY_SYNC_ENABLED)
 from enums import (ErrorType)
 
 
@@ -89,6 +92,13 @@ def create_button(parent, text, command):
                              )
 
 
+def create_export_format_picker(parent):
+    # Read-only drop-down of the available export formats (see exporters.EXPORT_FORMATS) - defaults to Excel
+    export_format_picker = ttk.Combobox(parent, values=available_export_formats(), state="readonly", width=11)
+    export_format_picker.set("Excel")
+    return export_format_picker
+
+
 # ---- Search Bar (Database Window) ----
 def set_search_bar_placeholder(search_bar):
     try:
@@ -144,11 +154,101 @@ def on_focus_out(event):
                              )
 
 
+# ---- Background Tasks ----
+_background_threads = {}  # cancel_event -> thread, of each run_in_background task still running
+
+
+def run_in_background(widget, task, on_message):
+    # Run task(post, cancel_event) on a background thread, so long-running work doesn't freeze the Tk main loop.
+    #   -The task reports back by calling post(kind, payload) - messages are queued and handed to
+    #    on_message(kind, payload) on the UI thread (Tk widgets must only be touched from the UI thread)
+    #   -When the task finishes, on_message receives ("done", return value) - or ("error", exception) if it failed
+    # Returns the cancel_event, which the task should check to stop early (see also wait_for_background_task).
+    message_queue = queue.Queue()
+    cancel_event = threading.Event()
+
+    def worker():
+        try:
+            result = task(lambda kind, payload=None: message_queue.put((kind, payload)), cancel_event)
+            message_queue.put(("done", result))
+        except Exception as e:
+            message_queue.put(("error", e))
+        finally:
+            close_thread_connection()  # release this thread's database connection
+            _background_threads.pop(cancel_event, None)
+
+    def drain_queue():
+        # Handle a bounded number of messages per tick, so the window stays responsive during large imports
+        for _ in range(BACKGROUND_QUEUE_BATCH):
+            try:
+                kind, payload = message_queue.get_nowait()
+            except queue.Empty:
+                break
+
+            on_message(kind, payload)
+            if kind in ("done", "error"):
+                return  # task finished - stop polling
+
+        widget.after(BACKGROUND_POLL_INTERVAL_MS, drain_queue)
+
+    thread = threading.Thread(target=worker, daemon=True)
+    _background_threads[cancel_event] = thread
+    thread.start()
+    widget.after(BACKGROUND_POLL_INTERVAL_MS, drain_queue)
+
+    return cancel_event
+
+
+def wait_for_background_task(cancel_event):
+    # Cancel a task started by run_in_background and wait for its thread to finish (e.g. before the app closes, so
+    # the task's database connection isn't closed in the middle of a write)
+    cancel_event.set()
+    thread = _background_threads.get(cancel_event)
+    if thread is not None:
+        thread.join()
+
+
+# ---- Formatting ----
+# Durations and file sizes are stored as numbers (milliseconds/bytes) and only formatted for display
+def format_duration(duration_ms):
+    # e.g. 225000 -> "3:45"
+    if not duration_ms:
+        return "Unknown"
+
+    minutes, remainder_ms = divmod(int(duration_ms), 60000)
+    return f"{minutes}:{remainder_ms // 1000:02d}"
+
+
+def format_file_size(file_size_bytes):
+    # e.g. 4414505 -> "4.21 MB" (rounded to 2 decimal places)
+    if not file_size_bytes:
+        return "Unknown"
+
+    return f"{round(file_size_bytes / (1024 ** 2), 2)} MB"
+
+
+def format_song_row(row):
+    # (song, album, artist, approx_release_date, duration_ms, file_size_bytes, created_date) as shown in the database
+    # viewer and its exports
+    song, album, artist, approx_release_date, duration_ms, file_size_bytes, created_date = row
+    return (song, album, artist, approx_release_date, format_duration(duration_ms), format_file_size(file_size_bytes),
+            created_date)
+
+
 # ---- Data Processing ----
+_active_import = None  # cancel_event of the import currently running (None when no import is running)
+
+
 def on_drop(event, tree, status_font):
+    global _active_import
+
     try:
+        if _active_import is not None:
+            status_font.config(text="An import is already running. Wait for it to finish or cancel it before "
+                                    "dropping more folders.", fg="red")
+            return
+
         file_paths = event.widget.tk.splitlist(event.data)
-        folder_count = 0
         for file_path in file_paths:
             if not is_valid_folder(file_path):
                 err_msg = ("Error! The last drop includes a folder from an invalid location. " +
@@ -157,31 +257,187 @@ def on_drop(event, tree, status_font):
                 insert_into_error_log(ErrorType.INVALID_FOLDER, err_msg)  # not using the error_id returned
                 return
 
-            if os.path.isdir(file_path):
-                process_folder(file_path, tree)
-                folder_count += 1
+        status_font.config(text="Importing... scanning folders", fg="white")
+        timings = new_import_timings()
+
+        # Import on a background worker - results are passed back to the UI thread via on_import_message
+        _active_import = run_in_background(
+            tree,
+            lambda post, cancel_event: import_folders(file_paths,
+                                                      on_songs=lambda rows: post("songs", rows),
+                                                      on_progress=lambda stats: post("progress", stats),
+                                                      cancel_event=cancel_event,
+                                                      timings=timings),
+            lambda kind, payload: on_import_message(kind, payload, tree, status_font, timings, "drop")
+        )
+    except Exception as e:
+        # Catch any unhandled errors, update label and log error
+        status_font.config(text=f"Error! {e}. Operation could not be completed.", fg="red")
+        insert_into_error_log(ErrorType.PROCESSING_ERROR, f"{e}")
+
+
+def resume_last_import(tree, status_font):
+    # Continue the last import that didn't complete - only the files not yet imported are scanned and parsed
+    global _active_import
 
-        # Update the label with the folder count
-        status_font.config(text=f"Folders processed in the last drop: {folder_count}", fg="white")
+    try:
+        if _active_import is not None:
+            status_font.config(text="An import is already running. Wait for it to finish or cancel it before "
+                                    "resuming.", fg="red")
+            return
+
+        status_font.config(text="Resuming the last import...", fg="white")
+        timings = new_import_timings()
+
+        _active_import = run_in_background(
+            tree,
+            lambda post, cancel_event: resume_import(on_songs=lambda rows: post("songs", rows),
+                                                     on_progress=lambda stats: post("progress", stats),
+                                                     cancel_event=cancel_event,
+                                                     timings=timings),
+            lambda kind, payload: on_import_message(kind, payload, tree, status_font, timings, "resume")
+        )
     except Exception as e:
         # Catch any unhandled errors, update label and log error
-        status_font.config(text=f"Error! {e}. Operation could not be completed; " +
-                                "some folders may have been processed prior to the error.",
-                           fg="red"
-                           )
+        status_font.config(text=f"Error! {e}. Operation could not be completed.", fg="red")
         insert_into_error_log(ErrorType.PROCESSING_ERROR, f"{e}")
 
 
-def process_folder(folder_path, tree):
-    # No exception handling as this will be done within on_drop()
-    m4p_files = [os.path.join(root, file) for root, _, files in os.walk(folder_path) for file in files if
-                 file.endswith('.m4p')]
-    for m4p_file in m4p_files:
-        song_metadata = extract_metadata(m4p_file)
-        is_duplicate = check_song_exists(song_metadata['song'], song_metadata['album'],
-                                         song_metadata['artist'])
-        insert_into_songs(is_duplicate, song_metadata)
-        display_metadata(tree, song_metadata, is_duplicate)
+def start_library_sync(tree, status_font, quiet=False):
+    # Import the new songs within the music folder - only the folders changed since the last sync are searched (see
+    # library_sync.sync_library). The new songs are added to the table; duplicates aren't shown.
+    #   -quiet - a background sync: the status label is left alone unless new songs are found
+    global _active_import
+
+    try:
+        if _active_import is not None:
+            if not quiet:
+                status_font.config(text="An import is already running. Wait for it to finish or cancel it before "
+                                        "syncing.", fg="red")
+            return
+
+        if not quiet:
+            status_font.config(text="Syncing library... checking for changed folders", fg="white")
+        timings = new_import_timings()
+
+        _active_import = run_in_background(
+            tree,
+            lambda post, cancel_event: sync_library(
+                on_songs=lambda rows: post("songs", [row for row in rows if not row[1]]),
+                on_progress=lambda stats: post("progress", stats),
+                cancel_event=cancel_event,
+                timings=timings),
+            lambda kind, payload: on_sync_message(kind, payload, tree, status_font, quiet, timings)
+        )
+    except Exception as e:
+        # Catch any unhandled errors, update label and log error
+        status_font.config(text=f"Error! {e}. Operation could not be completed.", fg="red")
+        insert_into_error_log(ErrorType.PROCESSING_ERROR, f"{e}")
+
+
+def on_sync_message(kind, payload, tree, status_font, quiet, timings=DISABLED_TIMINGS):
+    global _active_import
+
+    try:
+        if kind == "songs":
+            on_import_message(kind, payload, tree, status_font, timings)
+
+        elif kind == "progress":
+            if not quiet or payload['parsed'] or payload['failed']:  # a quiet sync only shows progress for new songs
+                on_import_message(kind, payload, tree, status_font)
+
+        elif kind == "done":
+            _active_import = None
+            if payload['cancelled']:
+                status_font.config(text=f"Library sync cancelled. {format_import_progress(payload)}. The rest of the "
+                                        f"changed folders are imported by the next sync.", fg="white")
+            elif payload['failed']:
+                status_font.config(text=f"Library sync: {payload['inserted']} new song(s). {payload['failed']} song "
+                                        f"file(s) could not be imported - see the Error Log.", fg="red")
+            elif payload['inserted']:
+                status_font.config(text=f"Library sync: {payload['inserted']} new song(s) from {payload['folders']} "
+                                        f"changed folder(s)", fg="white")
+            elif not quiet:
+                status_font.config(text=f"Library is up to date - {payload['checked']} folders checked", fg="white")
+
+            show_import_timings(status_font, "sync", timings, payload)
+
+        elif kind == "error":
+            _active_import = None
+            status_font.config(text=f"Error! {payload}. Library sync could not be completed.", fg="red")
+            insert_into_error_log(ErrorType.PROCESSING_ERROR, f"{payload}")
+
+    except Exception as e:
+        # Log the unexpected error
+        insert_into_error_log(ErrorType.DISPLAY_ERROR, f"Unexpected error in on_sync_message: {e}")
+
+
+def on_import_message(kind, payload, tree, status_font, timings=DISABLED_TIMINGS, source="drop"):
+    # timings - the import's stage timings (see perf.py) - the display stage is recorded here, and the summary shown
+    # once the import is done
+    # source - what ran the import, saved with the timings in the perf log
+    global _active_import
+
+    try:
+        if kind == "songs":
+            with timings.stage("display", len(payload)):
+                for song_metadata, is_duplicate in payload:
+                    display_metadata(tree, song_metadata, is_duplicate)
+
+        elif kind == "progress":
+            status_font.config(text=format_import_progress(payload), fg="white")
+
+        elif kind == "done":
+            _active_import = None
+            if payload is None:
+                status_font.config(text="No unfinished import to resume.", fg="white")
+            elif payload['cancelled']:
+                status_font.config(text=f"Import cancelled. Folders fully processed before cancelling: "
+                                        f"{payload['folders']}. {format_import_progress(payload)}. "
+                                        f"Use 'Resume Last Import' to continue.", fg="white")
+            elif payload['failed']:
+                status_font.config(text=f"Folders processed in the last drop: {payload['folders']}. "
+                                        f"{payload['failed']} song file(s) could not be imported - see the Error Log. "
+                                        f"Use 'Resume Last Import' to retry them.", fg="red")
+            else:
+                status_font.config(text=f"Folders processed in the last drop: {payload['folders']}", fg="white")
+
+            show_import_timings(status_font, source, timings, payload)
+
+        elif kind == "error":
+            # Unhandled error on the worker thread - update label and log error
+            _active_import = None
+            status_font.config(text=f"Error! {payload}. Operation could not be completed; " +
+                                    "some folders may have been processed prior to the error. " +
+                                    "Use 'Resume Last Import' to continue.",
+                               fg="red"
+                               )
+            insert_into_error_log(ErrorType.PROCESSING_ERROR, f"{payload}")
+
+    except Exception as e:
+        # Log the unexpected error
+        insert_into_error_log(ErrorType.DISPLAY_ERROR, f"Unexpected error in on_import_message: {e}")
+
+
+def show_import_timings(status_font, source, timings, stats):
+    # Save the finished import's timings to the perf log and add the summary to the status label (only when
+    # PERF_INSTRUMENTATION_ENABLED is set)
+    timings_summary = save_import_timings(source, timings, stats)
+    if timings_summary is not None:
+        status_font.config(text=f"{status_font.cget('text')} | Timings: {format_timings_summary(timings_summary)}")
+
+
+def cancel_import():
+    # Stop the running import at the next file boundary - songs parsed up to that point are still saved
+    if _active_import is not None:
+        _active_import.set()
+
+
+def stop_active_import():
+    # Cancel the running import (or sync) and wait for it to stop - called before the app closes its database
+    # connections
+    if _active_import is not None:
+        wait_for_background_task(_active_import)
 
 
 def display_metadata(tree, metadata, is_duplicate):
@@ -205,22 +461,38 @@ def display_metadata(tree, metadata, is_duplicate):
 
 
 # ---- Data Manipulation ----
-def load_all_songs(tree):
-    try:
-        # Clear existing entries in the Treeview
-        for row in tree.get_children():
-            tree.delete(row)
+# The database viewer and error log only hold a window of rows at a time (VIEWER_WINDOW_PAGES pages of
+# VIEWER_PAGE_SIZE rows), fetched from the database as the user scrolls - so opening them costs the same however large
+# the library (or error log) is.
+_pagers = {}  # paging state of each paged Treeview, keyed by the Treeview's widget name
+
+
+def _start_paging(tree, fetch_page, format_row):
+    # Page a Treeview through the database, newest first
+    #   -fetch_page(after=None, before=None) - returns a page of rows, id first and created_date last (e.g.
+    #    database.get_songs_page)
+    #   -format_row(row) - the Treeview values for a row
+    for row in tree.get_children():
+        tree.delete(row)
+
+    pager = {
+        'fetch_page': fetch_page,
+        'format_row': format_row,
+        'created_dates': {},  # Treeview item id (= row id) -> created_date, the keyset for the next/previous page
+        'has_more_after': True,
+        'has_more_before': False,
+        'is_loading': False
+    }
+    _pagers[str(tree)] = pager
+    tree.configure(yscrollcommand=lambda first, last: on_paged_tree_scroll(tree, float(first), float(last)))
+
+    load_next_page(tree, pager)
 
-        # Fetch all songs from the database
-        songs = get_all_songs()
 
-        # Insert each song into the Treeview
-        for (song, album, artist, approx_release_date, time, file_size, created_date) in songs:
-            tree.insert(
-                "",
-                "end",
-                values=(song, album, artist, approx_release_date, time, file_size, created_date)
-            )
+def load_all_songs(tree):
+    try:
+        # Start paging from the newest song
+        _start_paging(tree, get_songs_page, lambda row: format_song_row(row[1:]))
 
     except Exception as e:
         # Log the unexpected error and get the error ID
@@ -233,21 +505,116 @@ def load_all_songs(tree):
                              )
 
 
-def load_processing_error_logs(tree):
+def on_paged_tree_scroll(tree, first, last):
+    # Fetch the next/previous page once the user scrolls close to the end/start of the loaded window
+    pager = _pagers.get(str(tree))
+    if pager is None or pager['is_loading']:
+        return
+
+    if last >= 0.9 and pager['has_more_after']:
+        pager['is_loading'] = True
+        tree.after_idle(lambda: load_next_page(tree, pager))
+    elif first <= 0.1 and pager['has_more_before']:
+        pager['is_loading'] = True
+        tree.after_idle(lambda: load_previous_page(tree, pager))
+
+
+def _page_key(pager, item_id):
+    return pager['created_dates'][item_id], int(item_id)
+
+
+def _first_visible_row(tree):
+    children = tree.get_children()
+    return round(tree.yview()[0] * len(children)) if children else 0
+
+
+def load_next_page(tree, pager):
+    try:
+        children = tree.get_children()
+        after = _page_key(pager, children[-1]) if children else None
+        first_visible = _first_visible_row(tree)
+
+        rows = pager['fetch_page'](after=after)
+        for row in rows:
+            tree.insert("", "end", iid=str(row[0]), values=pager['format_row'](row))
+            pager['created_dates'][str(row[0])] = row[-1]
+        pager['has_more_after'] = len(rows) == VIEWER_PAGE_SIZE
+
+        # Window full - drop the page furthest above the view, keeping the same rows on screen
+        children = tree.get_children()
+        overflow = len(children) - VIEWER_PAGE_SIZE * VIEWER_WINDOW_PAGES
+        if overflow > 0:
+            for item_id in children[:overflow]:
+                tree.delete(item_id)
+                del pager['created_dates'][item_id]
+            pager['has_more_before'] = True
+            tree.yview_moveto(max(first_visible - overflow, 0) / (len(children) - overflow))
+
+    except Exception as e:
+        # Log the unexpected error and get the error ID
+        error_id = insert_into_error_log(ErrorType.DATABASE_ERROR,
+                                         f"Unexpected error in load_next_page: {e}"
+                                         )
+        messagebox.showerror("Error",
+                             "An unexpected error occurred while loading the next page of rows. "
+                             f"See Error Log - Error ID {error_id}."
+                             )
+
+    finally:
+        pager['is_loading'] = False
+
+
+def load_previous_page(tree, pager):
     try:
-        for row in tree.get_children():
-            tree.delete(row)
+        children = tree.get_children()
+        if not children:
+            return
+
+        first_visible = _first_visible_row(tree)
+
+        rows = pager['fetch_page'](before=_page_key(pager, children[0]))
+        for index, row in enumerate(rows):
+            tree.insert("", index, iid=str(row[0]), values=pager['format_row'](row))
+            pager['created_dates'][str(row[0])] = row[-1]
+        pager['has_more_before'] = len(rows) == VIEWER_PAGE_SIZE
+
+        # Window full - drop the page furthest below the view, keeping the same rows on screen
+        children = tree.get_children()
+        overflow = len(children) - VIEWER_PAGE_SIZE * VIEWER_WINDOW_PAGES
+        if overflow > 0:
+            for item_id in children[-overflow:]:
+                tree.delete(item_id)
+                del pager['created_dates'][item_id]
+            pager['has_more_after'] = True
 
-        # Fetch all songs from the database
-        processing_error_logs = get_processing_error_logs()
+        tree.yview_moveto((first_visible + len(rows)) / (len(children) - max(overflow, 0)))
 
-        # Insert each song into the Treeview
-        for (err_id, error_type, error_message, created_date) in processing_error_logs:
-            tree.insert(
-                "",
-                "end",
-                values=(err_id, error_type, error_message, created_date)
-            )
+    except Exception as e:
+        # Log the unexpected error and get the error ID
+        error_id = insert_into_error_log(ErrorType.DATABASE_ERROR,
+                                         f"Unexpected error in load_previous_page: {e}"
+                                         )
+        messagebox.showerror("Error",
+                             "An unexpected error occurred while loading the previous page of rows. "
+                             f"See Error Log - Error ID {error_id}."
+                             )
+
+    finally:
+        pager['is_loading'] = False
+
+
+def _delete_tree_row(tree, item_id):
+    # Remove a row from a Treeview, along with its paging keyset (if the Treeview is paged)
+    tree.delete(item_id)
+    pager = _pagers.get(str(tree))
+    if pager is not None:
+        pager['created_dates'].pop(item_id, None)
+
+
+def load_processing_error_logs(tree):
+    try:
+        # Page through the processing errors, newest first
+        _start_paging(tree, functools.partial(get_error_logs_page, processing_only=True), tuple)
 
     except Exception as e:
         # Log the unexpected error and get the error ID
@@ -262,19 +629,8 @@ def load_processing_error_logs(tree):
 
 def load_all_error_logs(tree):
     try:
-        for row in tree.get_children():
-            tree.delete(row)
-
-        # Fetch all songs from the database
-        error_logs = get_all_error_logs()
-
-        # Insert each song into the Treeview
-        for (error_id, error_type, error_message, created_date) in error_logs:
-            tree.insert(
-                "",
-                "end",
-                values=(error_id, error_type, error_message, created_date)
-            )
+        # Page through every error, newest first
+        _start_paging(tree, get_error_logs_page, tuple)
 
     except Exception as e:
         # Log the unexpected error and get the error ID
@@ -290,6 +646,8 @@ def load_all_error_logs(tree):
 def refresh_db_data(search_bar, tree):
     try:
         search_bar.delete(0, tk.END)  # clear search box
+        _start_new_search_generation(tree)  # ignore any search still running
+        _search_state(tree)['last_text'] = None
         load_all_songs(tree)  # reload all songs
         tree.focus_set()  # change focus to tree - so cursor not flashing in search box
         set_search_bar_placeholder(search_bar)  # reset the search bar placeholder
@@ -322,18 +680,142 @@ def refresh_err_data(tree, view_all):
                              )
 
 
+# Search runs as the user types - once they pause for SEARCH_DEBOUNCE_MS - with the query on one long-lived search
+# thread, rather than a new thread per search. Each search gets a new generation number - a queued search is skipped
+# once a newer one has started, and results from an older (stale) search are ignored when they arrive.
+_search_states = {}  # search state of each database viewer, keyed by the Treeview's widget name
+_search_requests = queue.Queue()  # (tree name, tree, generation, search text) - taken by the search thread
+_search_results = queue.Queue()  # (tree, generation, kind, payload) - one per request, handled on the UI thread
+_search_thread = None  # started by the first search
+_searches_outstanding = 0  # requests without a result yet - the UI thread polls _search_results while there are any
+
+
+def _search_state(tree):
+    return _search_states.setdefault(str(tree), {'after_id': None, 'generation': 0, 'last_text': None})
+
+
+def _start_new_search_generation(tree):
+    # Cancel any search waiting on the debounce, and make any search still running stale
+    state = _search_state(tree)
+    if state['after_id'] is not None:
+        tree.after_cancel(state['after_id'])
+        state['after_id'] = None
+    state['generation'] += 1
+    return state['generation']
+
+
+def on_search_key_release(tree, search_bar):
+    try:
+        state = _search_state(tree)
+        if search_bar.get() == state['last_text']:
+            return  # e.g. arrow keys - the search text hasn't changed
+
+        if state['after_id'] is not None:
+            tree.after_cancel(state['after_id'])
+        state['after_id'] = tree.after(SEARCH_DEBOUNCE_MS, lambda: search_song(tree, search_bar.get(), search_bar))
+
+    except Exception as e:
+        # Log the unexpected error
+        insert_into_error_log(ErrorType.EVENT_ERROR, f"Unexpected error in on_search_key_release: {e}")
+
+
 def search_song(tree, song_name, search_bar):
     try:
-        # Clear current Treeview contents
-        for row in tree.get_children():
-            tree.delete(row)
+        generation = _start_new_search_generation(tree)
+        _search_state(tree)['last_text'] = song_name
 
-        # Fetch songs that match the search query
-        results = get_songs_by_name(song_name)
+        # No search text - show every song (paged)
+        if song_name.strip() == "" or song_name == SONG_SEARCH_BAR_PLACEHOLDER:
+            load_all_songs(tree)
+            return
 
-        # Insert matching songs into the Treeview
-        for song in results:
-            tree.insert("", "end", values=song)
+        # Fetch songs that match the search query (song, album or artist) on the search thread
+        _request_search(tree, generation, song_name)
+
+    except Exception as e:
+        # Log the unexpected error and get the error ID
+        error_id = insert_into_error_log(ErrorType.DATABASE_ERROR,
+                                         f"Unexpected error in search_song: {e}"
+                                         )
+        messagebox.showerror("Error",
+                             "An unexpected error occurred while searching for songs. "
+                             f"See Error Log - Error ID {error_id}."
+                             )
+
+
+def _request_search(tree, generation, search_text):
+    global _search_thread, _searches_outstanding
+
+    if _search_thread is None:
+        _search_thread = threading.Thread(target=_search_worker, daemon=True)
+        _search_thread.start()
+
+    _search_requests.put((str(tree), tree, generation, search_text))
+    _searches_outstanding += 1
+    if _searches_outstanding == 1:
+        # Polled from the root window - the viewer may be closed before its results arrive
+        root = tree.nametowidget(".")
+        root.after(BACKGROUND_POLL_INTERVAL_MS, lambda: _drain_search_results(root))
+
+
+def _search_worker():
+    # Runs for the life of the app - takes everything queued and searches only the newest request of each viewer
+    while True:
+        requests = [_search_requests.get()]
+        while True:
+            try:
+                requests.append(_search_requests.get_nowait())
+            except queue.Empty:
+                break
+
+        newest = {tree_name: generation for tree_name, _, generation, _ in requests}
+        for tree_name, tree, generation, search_text in requests:
+            current_generation = _search_states.get(tree_name, {}).get('generation')
+            if generation != newest[tree_name] or generation != current_generation:
+                _search_results.put((tree, generation, "superseded", None))  # typed over, cleared or refreshed
+                continue
+
+            try:
+                _search_results.put((tree, generation, "done", search_songs_cached(search_text)))
+            except Exception as e:
+                _search_results.put((tree, generation, "error", e))
+
+
+def _drain_search_results(root):
+    global _searches_outstanding
+
+    for _ in range(BACKGROUND_QUEUE_BATCH):
+        try:
+            tree, generation, kind, payload = _search_results.get_nowait()
+        except queue.Empty:
+            break
+
+        _searches_outstanding -= 1
+        if kind != "superseded" and tree.winfo_exists():
+            on_search_results(kind, payload, tree, generation)
+
+    if _searches_outstanding:
+        root.after(BACKGROUND_POLL_INTERVAL_MS, lambda: _drain_search_results(root))
+
+
+def on_search_results(kind, payload, tree, generation):
+    try:
+        if _search_state(tree)['generation'] != generation:
+            return  # a newer search has started since - ignore these results
+
+        if kind == "error":
+            raise payload
+
+        if kind == "done":
+            _pagers.pop(str(tree), None)  # search results are a single (limited) list - no paging
+
+            # Clear current Treeview contents
+            for row in tree.get_children():
+                tree.delete(row)
+
+            # Insert matching songs into the Treeview
+            for song in payload:
+                tree.insert("", "end", values=format_song_row(song))
 
     except Exception as e:
         # Log the unexpected error and get the error ID
@@ -370,7 +852,7 @@ def delete_selected_songs(full_delete, tree):
                 delete_song(song, album, artist)  # delete from database
 
             # Remove from Treeview
-            tree.delete(selected_item)
+            _delete_tree_row(tree, selected_item)
 
     except Exception as e:
         # Log the unexpected error and get the error ID
@@ -405,7 +887,7 @@ def delete_selected_error_log(tree):
             delete_error_log(error_id)  # delete from database
 
             # Remove from Treeview
-            tree.delete(selected_item)
+            _delete_tree_row(tree, selected_item)
 
     except Exception as e:
         # Log the unexpected error and get the error ID
@@ -419,128 +901,207 @@ def delete_selected_error_log(tree):
 
 
 # ---- Exporting ----
-def export_to_excel(doc_prefix, col_headers, tree, hide_column_b):
+def export_data(doc_prefix, col_headers, tree, hide_column_b, row_source=None, status_label=None,
+                export_format="Excel"):
+    # row_source - optional function returning the rows to export, run on the background thread (e.g. a database
+    #              cursor - see get_song_export_source). Defaults to the rows shown in the Treeview.
+    # status_label - optional label to show the export progress in
+    # export_format - one of exporters.EXPORT_FORMATS (Excel, CSV, JSON Lines or Parquet)
     try:
         # Check if the Treeview is empty
         if not tree.get_children():
             messagebox.showwarning("Export Failed", "Error: No data to export.")
             return
 
-        # Confirmation to export to Excel
-        if not messagebox.askyesno("Confirm Excel Export", "Are you sure you to export this data to Excel?"):
+        # Confirmation to export
+        if not messagebox.askyesno(f"Confirm {export_format} Export",
+                                   f"Are you sure you to export this data to {export_format}?"):
             return
 
-        # Save the exported Excel file to the path defined within the save_directory variable
-        root_directory = os.path.expanduser("~")  # e.g. '/Users/nicholaspackham'
+        # Treeview rows must be read on the UI thread - database rows are read by the background thread
+        if row_source is None:
+            tree_rows = [tree.item(row_id)['values'] for row_id in tree.get_children()]
+            row_source = lambda: tree_rows
 
-        # Using two different directories for testing and prod
-        if IS_TEST_MODE:
-            save_directory = os.path.join(root_directory, APP_ROOT_FOLDER_TEST_MODE)
-        else:
-            save_directory = os.path.join(root_directory, APP_ROOT_FOLDER)
-
-        # Append 'Excel Exports' on to APP_ROOT_FOLDER*
-        save_directory = os.path.join(save_directory, "Excel Exports")
-
-        # Create the directory - if it does not exist
-        if not os.path.exists(save_directory):
-            os.makedirs(save_directory)
-
-        # Generate the file name - which will provide the full file_path
-        current_datetime = datetime.now().strftime("%Y%m%d_%H%M%S")
-        file_path = os.path.join(save_directory, f"{doc_prefix}_{current_datetime}.xlsx")
-
-        # Create a new Excel workbook and sheet
-        workbook = Workbook()
-        sheet = workbook.active
-        sheet.title = "Songs"
-
-        # Define styling for headers (excel)
-        header_font = Font(bold=True, color="FFFFFF")
-        header_fill = PatternFill(start_color="4F81BD", end_color="4F81BD", fill_type="solid")
-        alignment = Alignment(horizontal="center", vertical="center")
-        thin_border = Border(left=Side(style='thin'), right=Side(style='thin'), top=Side(style='thin'),
-                             bottom=Side(style='thin'))
-
-        # Add headers with styling (excel)
-        sheet.append(col_headers)
-        for col in sheet.iter_cols(min_row=1, max_row=1, min_col=1, max_col=len(col_headers)):
-            for cell in col:
-                cell.font = header_font
-                cell.fill = header_fill
-                cell.alignment = alignment
-                cell.border = thin_border
-
-        # Add Treeview data to the Excel sheet
-        for row_id in tree.get_children():
-            row = tree.item(row_id)['values']
-            sheet.append(row)
-
-        # Add filters to the header row (excel)
-        sheet.auto_filter.ref = sheet.dimensions
-
-        # Auto-fit columns
-        for col in sheet.columns:
-            max_length = max(len(str(cell.value) or "") for cell in col)
-            adjusted_width = max_length + 2
-            sheet.column_dimensions[get_column_letter(col[0].column)].width = adjusted_width
-
-        # ***Only relevant to Song trees (new and database) - not error log tree
-        #   -Hide column "B" for the Song trees - Album column
-        #   -Album column not really required, and gets in the way when using Apple Music and the Excel export together
-        if hide_column_b:
-            sheet.column_dimensions["B"].hidden = True
-
-        # Save the workbook
-        workbook.save(file_path)
-        messagebox.showinfo(
-            "Export Successful",
-            "Success! Data has been exported to Excel.\n\n" +
-            "Excel Export Location:\n" +
-            f"{file_path}"
-        )
+        _start_export(tree, doc_prefix, col_headers, row_source, hide_column_b, status_label, export_format)
 
-        # Automatically open the file
-        try:
-            if os.name == 'nt':  # Windows
-                os.startfile(file_path)
-            elif os.name == 'posix':  # macOS and Linux
-                subprocess.Popen(['open', file_path] if os.uname().sysname == 'Darwin' else ['xdg-open', file_path])
-        except Exception as e:
-            messagebox.showerror(
-                "Error",
-                "Error: Could not open file.\n\n" +
-                "File Location:\n" +
-                f"{e}"
-            )
+    except Exception as e:
+        # Log the unexpected error and get the error ID
+        error_id = insert_into_error_log(ErrorType.EXPORT_ERROR,
+                                         f"Unexpected error in export_data: {e}"
+                                         )
+        messagebox.showerror("Error",
+                             f"An unexpected error occurred during the {export_format} export process. "
+                             f"See Error Log - Error ID {error_id}."
+                             )
+
+
+def export_perf_log(widget, status_label=None, export_format="Excel"):
+    # Export the import timings saved in the perf log (see perf.py) - one row per stage of each import
+    try:
+        perf_log_rows = get_perf_logs()
+        if not perf_log_rows:
+            messagebox.showwarning("Export Failed", "Error: No import timings to export. Set "
+                                                    "PERF_INSTRUMENTATION_ENABLED in settings.py to record them.")
+            return
+
+        if not messagebox.askyesno(f"Confirm {export_format} Export",
+                                   f"Are you sure you to export the import timings to {export_format}?"):
+            return
+
+        _start_export(widget, "perf-log", PERF_LOG_COLUMNS, lambda: perf_log_rows, False, status_label,
+                      export_format)
 
     except Exception as e:
         # Log the unexpected error and get the error ID
         error_id = insert_into_error_log(ErrorType.EXPORT_ERROR,
-                                         f"Unexpected error in export_to_excel: {e}"
+                                         f"Unexpected error in export_perf_log: {e}"
                                          )
         messagebox.showerror("Error",
-                             "An unexpected error occurred during the Excel export process. "
+                             f"An unexpected error occurred during the {export_format} export process. "
                              f"See Error Log - Error ID {error_id}."
                              )
 
 
+def _start_export(widget, doc_prefix, col_headers, row_source, hide_column_b, status_label, export_format):
+    # Write row_source() to a new export file on a background thread - the window stays responsive while large exports
+    # are written
+    file_extension, write_rows = EXPORT_FORMATS[export_format]
+    file_path = export_file_path(doc_prefix, file_extension)
+
+    run_in_background(
+        widget,
+        lambda post, cancel_event: write_rows(file_path, col_headers, row_source(), hide_column_b,
+                                              on_progress=lambda row_count: post("progress", row_count)),
+        lambda kind, payload: on_export_message(kind, payload, file_path, status_label, export_format)
+    )
+
+    if status_label is not None:
+        status_label.config(text="Exporting...")
+
+
+def on_export_message(kind, payload, file_path, status_label, export_format):
+    if kind == "progress":
+        if status_label is not None:
+            status_label.config(text=f"Exporting... {payload} rows written")
+        return
+
+    if status_label is not None:
+        status_label.config(text="")
+
+    if kind == "error":
+        # Log the unexpected error and get the error ID
+        error_id = insert_into_error_log(ErrorType.EXPORT_ERROR,
+                                         f"Unexpected error in export_data: {payload}"
+                                         )
+        messagebox.showerror("Error",
+                             f"An unexpected error occurred during the {export_format} export process. "
+                             f"See Error Log - Error ID {error_id}."
+                             )
+        return
+
+    messagebox.showinfo(
+        "Export Successful",
+        f"Success! {payload} rows have been exported to {export_format}.\n\n" +
+        f"{export_format} Export Location:\n" +
+        f"{file_path}"
+    )
+
+    # Automatically open the file
+    try:
+        if os.name == 'nt':  # Windows
+            os.startfile(file_path)
+        elif os.name == 'posix':  # macOS and Linux
+            import subprocess  # only needed to open an export - not imported at startup
+
+            subprocess.Popen(['open', file_path] if os.uname().sysname == 'Darwin' else ['xdg-open', file_path])
+    except Exception as e:
+        messagebox.showerror(
+            "Error",
+            "Error: Could not open file.\n\n" +
+            "File Location:\n" +
+            f"{e}"
+        )
+
+
+def get_song_export_source(tree):
+    # Rows for a database viewer export, read straight from the database (not the Treeview) - respecting the search
+    #   -No search - every song
+    #   -Search - every song matching the text of the latest search (not limited to the rows shown), even if its results
+    #    haven't arrived yet
+    search_text = _search_state(tree)['last_text'] or ""
+    if search_text.strip() == "" or search_text == SONG_SEARCH_BAR_PLACEHOLDER:
+        return lambda: map(format_song_row, iter_all_songs())
+
+    return lambda: map(format_song_row, search_songs(search_text, limit=-1))
+
+
+def get_error_log_export_source(view_all):
+    # Rows for an error log export, read straight from the database - respecting the current view
+    processing_only = not view_all.get()
+    return lambda: iter_error_logs(processing_only)
+
+
 # ---- Backups ----
 def save_database_backup():
-    db_path = database_path()  # Ensure this returns the database path
-
     folder_path = filedialog.askdirectory()  # let the user select a directory
 
     if folder_path:  # if a folder was selected
-        current_datetime = datetime.now().strftime("%Y%m%d_%H%M%S")
-        db_file_name = DATABASE_FILE_NAME + "_" + current_datetime + DATABASE_FILE_TYPE
+        # The backup runs in the background (see backup.start_backup) - the app closes straight away, and finishes
+        # writing the backup before it exits. Any failure is recorded in the Error Log.
+        start_backup(folder_path)
+    else:
+        messagebox.showinfo("Cancelled", "No folder selected. Backup cancelled.")
+
+
+def schedule_auto_backup(root):
+    # Back up the database to the 'Database Backups' folder every AUTO_BACKUP_INTERVAL_MINUTES, applying the
+    # retention policy (see backup.prune_backups)
+    if AUTO_BACKUP_INTERVAL_MINUTES <= 0:
+        return
 
-        file_path = os.path.join(folder_path, db_file_name)  # combine folder and database filename
+    interval_ms = AUTO_BACKUP_INTERVAL_MINUTES * 60 * 1000
 
+    def run_auto_backup():
+        start_backup(backup_directory(), apply_retention=True)
+        root.after(interval_ms, run_auto_backup)
+
+    root.after(interval_ms, run_auto_backup)
+
+
+def schedule_wal_checkpoint(root):
+    # Every WAL_CHECKPOINT_INTERVAL_MINUTES, copy what has been written to the WAL file back into the database file
+    #   -PASSIVE - never waits on a running import or another window, so it doesn't hold up the UI thread
+    if WAL_CHECKPOINT_INTERVAL_MINUTES <= 0:
+        return
+
+    interval_ms = WAL_CHECKPOINT_INTERVAL_MINUTES * 60 * 1000
+
+    def run_checkpoint():
         try:
-            shutil.copy(db_path, file_path)  # copy the database to the chosen location
-            messagebox.showinfo("Success", f"Database backed up to: {file_path}")
+            checkpoint_database("PASSIVE")
         except Exception as e:
-            messagebox.showerror("Error", f"Failed to back up the database:\n{e}")
-    else:
-        messagebox.showinfo("Cancelled", "No folder selected. Backup cancelled.")
+            insert_into_error_log(ErrorType.DATABASE_ERROR, f"WAL checkpoint failed: {e}")
+        root.after(interval_ms, run_checkpoint)
+
+    root.after(interval_ms, run_checkpoint)
+
+
+def schedule_library_sync(root, tree, status_font):
+    # While the app is open, import new songs as they appear in the music folder (LIBRARY_SYNC_ENABLED)
+    #   -The folder is watched on a background thread (see library_sync.start_library_watch), which only flags a
+    #    change - the sync itself runs like any other import, once no other import is running
+    if not LIBRARY_SYNC_ENABLED:
+        return
+
+    changed = threading.Event()
+    changed.set()  # sync once when the app opens
+    start_library_watch(changed.set)
+
+    def check_for_changes():
+        if changed.is_set() and _active_import is None:
+            changed.clear()
+            start_library_sync(tree, status_font, quiet=True)
+        root.after(BACKGROUND_POLL_INTERVAL_MS, check_for_changes)
+
+    root.after(BACKGROUND_POLL_INTERVAL_MS, check_for_changes)
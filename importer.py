@@ -0,0 +1,289 @@
+import os
+import time
+from contextlib import closing
+from itertools import islice
+from database import (insert_songs_batch, insert_into_songs, insert_into_error_log, check_song_exists,
+                      get_songs_by_identity, checkpoint_database, create_import_session, update_import_journal,
+                      finish_import_session, get_last_unfinished_import_session, get_imported_journal_files,
+                      insert_perf_log, IMPORT_FILE_DONE, IMPORT_FILE_FAILED, IMPORT_SESSION_COMPLETED,
+                      IMPORT_SESSION_INCOMPLETE)
+from enums import (ErrorType)
+from library_walker import (iter_song_files)
+from metadata_extractor import (iter_extract_metadata, derive_song_identity)
+from perf import (DISABLED_TIMINGS)
+from settings import (IMPORT_BATCH_SIZE, METADATA_EXTRACTION_WORKERS)
+
+PROGRESS_INTERVAL_SECONDS = 0.25  # minimum time between progress reports - avoids flooding the UI with updates
+
+
+def new_import_stats():
+    return {
+        'folders': 0,  # folders fully processed
+        'scanned': 0,  # song files found
+        'parsed': 0,  # song files with metadata extracted (duplicates are recognised from their path instead)
+        'inserted': 0,  # new songs written to the database
+        'duplicates': 0,  # songs already in the database
+        'failed': 0,  # song files that could not be imported (see the Error Log) - can be retried with resume_import
+        'cancelled': False,
+        'session_id': None,  # import session the progress is recorded against (see resume_import)
+        'started': time.perf_counter()
+    }
+
+
+def format_import_progress(stats):
+    # e.g. "Importing... 1200 scanned | 850 parsed (42.5/s) | 600 inserted (30.0/s) | 250 duplicates"
+    elapsed = max(time.perf_counter() - stats['started'], 0.001)
+    return (f"Importing... {stats['scanned']} scanned | "
+            f"{stats['parsed']} parsed ({stats['parsed'] / elapsed:.1f}/s) | "
+            f"{stats['inserted']} inserted ({stats['inserted'] / elapsed:.1f}/s) | "
+            f"{stats['duplicates']} duplicates" +
+            (f" | {stats['failed']} failed" if stats['failed'] else ""))
+
+
+def save_import_timings(source, timings, stats, dry_run=False):
+    # Summarise the stage timings of a finished (or cancelled) import and save them to the perf log
+    #   -source - what ran the import, e.g. 'drop' or 'cli import'
+    #   -dry_run - summarise only, nothing is written to the database
+    # Returns the summary (see perf.ImportTimings.summary), or None if the import wasn't timed or found no song files.
+    if not timings.enabled or stats is None or not stats['scanned']:
+        return None
+
+    summary = timings.summary(stats['scanned'])
+    if not dry_run:
+        insert_perf_log(source, summary)
+    return summary
+
+
+def import_song_files(song_files, stats, report_progress, cancel_event, workers=METADATA_EXTRACTION_WORKERS,
+                      dry_run=False, timings=DISABLED_TIMINGS):
+    # Import a batch of song files - returns (rows, file_results)
+    #   -rows - [(metadata, is_duplicate), ...] in file order, for the files imported
+    #   -file_results - [(file_path, status, error_message), ...] for every file handled (for the import journal) -
+    #    files not reached before a cancel are left out, so they are still pending
+    # Songs already in the database are recognised from their path alone (see derive_song_identity), so only
+    # genuinely new songs are opened and parsed with MediaInfo.
+    # A file that can't be imported is logged to the Error Log and skipped - it doesn't stop the rest of the batch.
+    #   -dry_run - the new songs are parsed and counted, but nothing is written to the database (not even the
+    #    metadata cache)
+    #   -timings - records the time spent in each stage (see perf.py)
+    with timings.stage("duplicate_check", len(song_files)):
+        identities = [derive_song_identity(song_file) for song_file in song_files]
+        is_known = [check_song_exists(identity['song'], identity['album'], identity['artist'])
+                    for identity in identities]
+
+        known_identities = [identity for identity, known in zip(identities, is_known) if known]
+        stored_songs = get_songs_by_identity(known_identities) if known_identities else {}
+
+        # A song only counts as known if its row was found - one deleted since the check (e.g. by another process) is
+        # parsed and imported like any new song
+        is_known = [known and (identity['song'], identity['album'], identity['artist']) in stored_songs
+                    for identity, known in zip(identities, is_known)]
+    new_song_files = [song_file for song_file, known in zip(song_files, is_known) if not known]
+
+    failures = {}  # file_path -> error message
+
+    def on_parse_error(file_path, error):
+        failures[file_path] = f"Could not read the song file: {error}"
+
+    batch_metadata = []  # (file_path, metadata, is_known) in file order
+    with closing(iter_extract_metadata(new_song_files, workers, save_to_cache=not dry_run, on_error=on_parse_error,
+                                       timings=timings)) as extracted:
+        for song_file, identity, known in zip(song_files, identities, is_known):
+            if known:
+                # Duplicate - show the metadata saved when the song was first imported
+                song_key = (identity['song'], identity['album'], identity['artist'])
+                batch_metadata.append((song_file, stored_songs[song_key], True))
+            else:
+                metadata = next(extracted)
+                if metadata is not None:
+                    batch_metadata.append((song_file, metadata, False))
+                    stats['parsed'] += 1
+
+            report_progress()
+            if cancel_event is not None and cancel_event.is_set():
+                stats['cancelled'] = True
+                break
+
+    # Write the new songs - the database still has the final say on duplicates (e.g. the same song twice in a drop)
+    new_files = [song_file for song_file, _, known in batch_metadata if not known]
+    new_metadata = [metadata for _, metadata, known in batch_metadata if not known]
+    if dry_run:
+        new_duplicate_flags = _dry_run_duplicate_flags(new_metadata)
+    else:
+        with timings.stage("insert", len(new_files)):
+            new_duplicate_flags = _insert_songs_isolated(new_files, new_metadata, failures)
+    new_duplicate_flags = dict(zip(new_files, new_duplicate_flags))
+
+    batch_rows = []
+    file_results = []
+    for song_file, metadata, known in batch_metadata:
+        if song_file in failures:
+            continue
+        batch_rows.append((metadata, True if known else new_duplicate_flags[song_file]))
+        file_results.append((song_file, IMPORT_FILE_DONE, None))
+
+    with timings.stage("insert", 0):
+        for song_file, error_message in failures.items():
+            file_results.append((song_file, IMPORT_FILE_FAILED, error_message))
+            if not dry_run:
+                insert_into_error_log(ErrorType.PROCESSING_ERROR, f"{song_file}: {error_message}")
+
+    duplicate_count = sum(is_duplicate for _, is_duplicate in batch_rows)
+    stats['duplicates'] += duplicate_count
+    stats['inserted'] += len(batch_rows) - duplicate_count
+    stats['failed'] += len(failures)
+
+    return batch_rows, file_results
+
+
+def _insert_songs_isolated(song_files, records, failures):
+    # insert_songs_batch - if the batch can't be written, retry the songs one at a time, so only the songs that fail
+    # are skipped (added to failures, with a None placeholder flag)
+    try:
+        return insert_songs_batch(records, chunk_size=max(len(records), 1))  # the whole batch in one transaction
+    except Exception:
+        # run_write_transaction rolled the whole batch back, whatever the error - none of it was written, so every song
+        # is retried below, and the songs before the one responsible are still reported as new
+        pass
+
+    duplicate_flags = []
+    for song_file, metadata in zip(song_files, records):
+        try:
+            duplicate_flags.append(not insert_into_songs(metadata))
+        except Exception as e:
+            failures[song_file] = f"Could not save the song: {e}"
+            duplicate_flags.append(None)
+    return duplicate_flags
+
+
+def _iter_batches(items, batch_size):
+    # Lists of up to batch_size items, taken from any iterable (e.g. a generator) as they are needed
+    items = iter(items)
+    batch = list(islice(items, batch_size))
+    while batch:
+        yield batch
+        batch = list(islice(items, batch_size))
+
+
+def _dry_run_duplicate_flags(records):
+    # What insert_songs_batch would report, without writing - only repeats within the records themselves are duplicates
+    seen = set()
+    duplicate_flags = []
+    for metadata in records:
+        song_key = (metadata['song'], metadata['album'], metadata['artist'])
+        duplicate_flags.append(song_key in seen)
+        seen.add(song_key)
+    return duplicate_flags
+
+
+def import_folders(folder_paths, on_songs=None, on_progress=None, cancel_event=None,
+                   workers=METADATA_EXTRACTION_WORKERS, batch_size=IMPORT_BATCH_SIZE, dry_run=False,
+                   timings=DISABLED_TIMINGS):
+    # Import every song within the passed in folders. Can be run on a background thread - results are reported via
+    # the callbacks rather than by touching the GUI:
+    #   -on_songs(rows) - called after each batch is written, rows = [(metadata, is_duplicate), ...] in file order
+    #   -on_progress(stats) - called periodically with the running totals (see new_import_stats)
+    # If cancel_event is set the import stops at the next file boundary - songs parsed before that point are still
+    # written to the database, so nothing is half-imported.
+    #   -workers - files parsed in parallel, batch_size - songs written per transaction (see settings.py)
+    #   -dry_run - report what would be imported without writing anything (see import_song_files)
+    #   -timings - records the time spent in each stage, e.g. perf.new_import_timings()
+    # Every file's progress is recorded in the import journal, so an import that doesn't complete can be picked up
+    # where it stopped with resume_import.
+    session_id = None if dry_run else create_import_session(folder_paths)
+    return _run_import(folder_paths, session_id, set(), on_songs, on_progress, cancel_event, workers, batch_size,
+                       dry_run, timings)
+
+
+def resume_import(on_songs=None, on_progress=None, cancel_event=None, workers=METADATA_EXTRACTION_WORKERS,
+                  batch_size=IMPORT_BATCH_SIZE, timings=DISABLED_TIMINGS):
+    # Continue the last import that didn't complete (cancelled, the app closed mid-import, or some files failed)
+    #   -The folders are searched again, but files already imported are skipped without being checked or parsed - only
+    #    the files that failed or were never reached are imported (plus any songs added to the folders since)
+    # Same callbacks as import_folders. Returns the stats, or None if there is no import to resume.
+    session = get_last_unfinished_import_session()
+    if session is None:
+        return None
+
+    session_id, folder_paths, _ = session
+    return _run_import(folder_paths, session_id, get_imported_journal_files(session_id), on_songs, on_progress,
+                       cancel_event, workers, batch_size, False, timings)
+
+
+def import_folder_files(folder_paths, on_folder_done=None, on_songs=None, on_progress=None, cancel_event=None,
+                        workers=METADATA_EXTRACTION_WORKERS, batch_size=IMPORT_BATCH_SIZE, timings=DISABLED_TIMINGS):
+    # Import the song files directly within each folder - subfolders aren't searched. Used by library_sync, which has
+    # already worked out which folders changed.
+    #   -on_folder_done(folder_path) - called once every file within a folder has been imported (not if any of them
+    #    failed, or the import was cancelled first)
+    # Same callbacks as import_folders. Not journaled - the library snapshot records which folders are up to date.
+    return _run_import(folder_paths, None, set(), on_songs, on_progress, cancel_event, workers, batch_size, False,
+                       timings, recursive=False, on_folder_done=on_folder_done)
+
+
+def _run_import(folder_paths, session_id, imported_files, on_songs, on_progress, cancel_event, workers, batch_size,
+                dry_run, timings, recursive=True, on_folder_done=None):
+    # session_id - import session to record progress against (None for a dry run)
+    # imported_files - files already imported by this session, which are skipped {file_path, ...}
+    # recursive - also import the files within each folder's subfolders
+    # on_folder_done(folder_path) - called once a folder has been fully imported, with no files failed
+    # Files are imported batch by batch as the folders are searched (see iter_song_files), rather than after listing
+    # every folder - the first songs appear straight away, and the file list is never held in memory.
+    stats = new_import_stats()
+    stats['session_id'] = session_id
+    last_progress = 0.0
+    is_finished = False
+
+    def report_progress(force=False):
+        nonlocal last_progress
+        now = time.perf_counter()
+        if on_progress and (force or now - last_progress >= PROGRESS_INTERVAL_SECONDS):
+            last_progress = now
+            on_progress(dict(stats))
+
+    try:
+        for folder_path in folder_paths:
+            if cancel_event is not None and cancel_event.is_set():
+                stats['cancelled'] = True
+                break
+
+            if not os.path.isdir(folder_path):
+                continue
+
+            failed_before_folder = stats['failed']
+            song_files = (song_file for song_file in iter_song_files(folder_path, recursive=recursive)
+                          if song_file not in imported_files)
+            for batch in timings.iter_timed(_iter_batches(song_files, batch_size), "walk"):
+                stats['scanned'] += len(batch)
+                report_progress()
+
+                batch_rows, file_results = import_song_files(batch, stats, report_progress, cancel_event, workers,
+                                                             dry_run, timings)
+
+                if session_id is not None and file_results:
+                    with timings.stage("insert", 0):
+                        update_import_journal(session_id, folder_path, file_results)
+
+                if on_songs:
+                    on_songs(batch_rows)
+
+                if stats['cancelled']:
+                    report_progress(force=True)
+                    return stats
+
+            stats['folders'] += 1
+            if on_folder_done and stats['failed'] == failed_before_folder:
+                on_folder_done(folder_path)
+
+        is_finished = True
+        report_progress(force=True)
+        return stats
+    finally:
+        if session_id is not None:
+            # Anything short of every file imported can be resumed
+            is_complete = is_finished and not stats['cancelled'] and not stats['failed']
+            finish_import_session(session_id, IMPORT_SESSION_COMPLETED if is_complete else IMPORT_SESSION_INCOMPLETE)
+
+        if stats['inserted'] and not dry_run:
+            # Fold the songs just written back into the database file, so the WAL doesn't keep growing
+            checkpoint_database("TRUNCATE")
@@ -0,0 +1,177 @@
+import os
+import threading
+from database import (get_library_snapshot, save_library_snapshot, delete_library_snapshot)
+from importer import (import_folder_files, new_import_stats)
+from library_walker import (list_subfolders)
+from perf import (DISABLED_TIMINGS)
+from settings import (APPROVED_MUSIC_FOLDER, IMPORT_BATCH_SIZE, METADATA_EXTRACTION_WORKERS,
+                      LIBRARY_SYNC_POLL_INTERVAL_SECONDS, LIBRARY_SYNC_DEBOUNCE_SECONDS)
+
+SNAPSHOT_SAVE_BATCH = 500  # folders written to the library snapshot per transaction during a sync
+
+
+def library_root():
+    # The music folder kept in sync - e.g. '/Users/nicholaspackham/Music/Music/Media.localized/Apple Music'
+    return os.path.normpath(os.path.join(os.path.expanduser("~"), APPROVED_MUSIC_FOLDER))
+
+
+def scan_library_changes(root_folder, snapshot):
+    # Find the folders within root_folder (and root_folder itself) that are new or have changed since the snapshot
+    #   -A folder's mtime changes whenever an entry is added, removed or renamed within it - a folder with the same
+    #    mtime as in the snapshot still has the same song files and subfolders, so it is only stat'ed, never listed
+    #   -A change deep in the tree doesn't change the mtime of the folders above it, so every folder is still checked
+    # Returns (changed_folders, folder_states):
+    #   -changed_folders - [folder_path, ...] in walk order, a folder before its subfolders
+    #   -folder_states - {folder_path: (mtime_ns, [subfolder name, ...])} for every folder found
+    changed_folders = []
+    folder_states = {}
+    pending_folders = [root_folder]
+
+    while pending_folders:
+        folder_path = pending_folders.pop()
+        try:
+            mtime_ns = os.stat(folder_path, follow_symlinks=False).st_mtime_ns  # read before listing - see below
+            previous_state = snapshot.get(folder_path)
+            if previous_state is not None and previous_state[0] == mtime_ns:
+                subfolders = previous_state[1]
+            else:
+                # Anything added after the mtime was read changes it again, so is picked up by the next sync
+                subfolders = list_subfolders(folder_path)
+                changed_folders.append(folder_path)
+        except OSError:
+            continue  # removed since its parent was listed, or unreadable
+
+        folder_states[folder_path] = (mtime_ns, subfolders)
+        pending_folders.extend(os.path.join(folder_path, name) for name in reversed(subfolders))
+
+    return changed_folders, folder_states
+
+
+def sync_library(on_songs=None, on_progress=None, cancel_event=None, workers=METADATA_EXTRACTION_WORKERS,
+                 batch_size=IMPORT_BATCH_SIZE, full=False, root_folder=None, timings=DISABLED_TIMINGS):
+    # Import the songs within the folders of the music folder that are new or have changed since the last sync - an
+    # unchanged library costs one stat per folder, rather than a walk of every file
+    #   -Same callbacks and timings as importer.import_folders. A folder is recorded in the snapshot once its files have
+    #    been imported, so a cancelled sync picks up where it stopped next time - and a folder with a song file that
+    #    failed is left out, so the next sync tries it again.
+    #   -full - ignore the snapshot and import every folder again, e.g. after song files were replaced in place (which
+    #    doesn't change their folder's mtime). Songs already imported are recognised from their path, so aren't parsed
+    #    again.
+    # Returns the import stats (see importer.new_import_stats), plus 'checked' - the number of folders checked.
+    root_folder = root_folder or library_root()
+
+    if full:
+        delete_library_snapshot()
+        snapshot = {}
+    else:
+        snapshot = get_library_snapshot()
+
+    with timings.stage("walk", 0):
+        changed_folders, folder_states = scan_library_changes(root_folder, snapshot)
+
+    removed_folders = [folder_path for folder_path in snapshot if folder_path not in folder_states]
+    if removed_folders:
+        delete_library_snapshot(removed_folders)  # songs imported from them are kept, as with any import
+
+    done_folders = []
+
+    def on_folder_done(folder_path):
+        mtime_ns, subfolders = folder_states[folder_path]
+        done_folders.append((folder_path, mtime_ns, subfolders))
+        if len(done_folders) >= SNAPSHOT_SAVE_BATCH:
+            save_library_snapshot(done_folders)
+            done_folders.clear()
+
+    if changed_folders:
+        try:
+            stats = import_folder_files(changed_folders, on_folder_done, on_songs=on_songs, on_progress=on_progress,
+                                        cancel_event=cancel_event, workers=workers, batch_size=batch_size,
+                                        timings=timings)
+        finally:
+            if done_folders:
+                save_library_snapshot(done_folders)
+    else:
+        stats = new_import_stats()
+
+    stats['checked'] = len(folder_states)
+    return stats
+
+
+def start_library_watch(on_change, stop_event=None, root_folder=None):
+    # Call on_change() whenever the music folder may have changed, until stop_event is set - from a daemon thread
+    #   -With the optional inotify_simple package (Linux) - once changes to the folder tree have settled for
+    #    LIBRARY_SYNC_DEBOUNCE_SECONDS (e.g. an album has finished copying)
+    #   -Otherwise every LIBRARY_SYNC_POLL_INTERVAL_SECONDS - cheap, as syncing an unchanged library only stats folders
+    # Returns the watch thread.
+    root_folder = root_folder or library_root()
+    stop_event = stop_event or threading.Event()
+
+    watch = _watch_with_inotify if _is_inotify_available() else _watch_by_polling
+    watch_thread = threading.Thread(target=watch, args=(root_folder, on_change, stop_event), name="library-watch",
+                                    daemon=True)
+    watch_thread.start()
+    return watch_thread
+
+
+def _watch_by_polling(root_folder, on_change, stop_event):
+    while not stop_event.wait(LIBRARY_SYNC_POLL_INTERVAL_SECONDS):
+        on_change()
+
+
+def _watch_with_inotify(root_folder, on_change, stop_event):
+    from inotify_simple import (INotify, flags)
+
+    # Entries added, removed or renamed - plus writes, so a folder still being copied into isn't synced until it's done
+    watch_flags = (flags.CREATE | flags.DELETE | flags.MOVED_FROM | flags.MOVED_TO | flags.MODIFY |
+                   flags.CLOSE_WRITE | flags.DELETE_SELF)
+    debounce_ms = LIBRARY_SYNC_DEBOUNCE_SECONDS * 1000
+
+    with INotify() as inotify:
+        watched_folders = {}  # watch descriptor -> folder_path
+
+        def watch_tree(folder_path):
+            # inotify watches a single folder, not the folders within it
+            for tree_folder in _iter_folders(folder_path):
+                try:
+                    watched_folders[inotify.add_watch(tree_folder, watch_flags)] = tree_folder
+                except OSError:
+                    pass  # removed already, or the watch limit has been reached - still found by the next sync
+
+        watch_tree(root_folder)
+
+        while not stop_event.is_set():
+            events = inotify.read(timeout=1000)  # wake up every second to check stop_event
+            if not events:
+                continue
+
+            # Keep reading until nothing has changed for the debounce period
+            while events:
+                for event in events:
+                    if event.mask & flags.IGNORED:
+                        watched_folders.pop(event.wd, None)
+                    elif event.mask & flags.ISDIR and event.mask & (flags.CREATE | flags.MOVED_TO):
+                        watch_tree(os.path.join(watched_folders.get(event.wd, root_folder), event.name))
+                events = inotify.read(timeout=debounce_ms)
+
+            if not stop_event.is_set():
+                on_change()
+
+
+def _iter_folders(folder_path):
+    # folder_path and every folder within it that a sync checks (see library_walker.list_subfolders)
+    pending_folders = [folder_path]
+    while pending_folders:
+        folder_path = pending_folders.pop()
+        yield folder_path
+        try:
+            pending_folders.extend(os.path.join(folder_path, name) for name in list_subfolders(folder_path))
+        except OSError:
+            continue
+
+
+def _is_inotify_available():
+    try:
+        import inotify_simple  # noqa: F401 - optional dependency
+        return True
+    except ImportError:
+        return False
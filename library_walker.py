@@ -0,0 +1,57 @@
+import os
+from settings import (SUPPORTED_AUDIO_EXTENSIONS)
+
+# Folders never searched for songs, on top of hidden folders (names starting with ".", e.g. .Trashes, .Spotlight-V100)
+SYSTEM_FOLDER_NAMES = frozenset({"$RECYCLE.BIN", "System Volume Information", "__MACOSX"})
+
+
+def iter_song_files(folder_path, extensions=SUPPORTED_AUDIO_EXTENSIONS, recursive=True):
+    # Yield the path of every song file within the passed in folder (searched recursively) as soon as it is found, so
+    # an import can start parsing the first songs straight away rather than waiting for the whole tree to be listed
+    #   -extensions - song file types to yield, matched case-insensitively (e.g. '.m4p' also matches '01 Song.M4P')
+    #   -Hidden and system folders and files are skipped (e.g. macOS '._01 Song.m4p' resource forks aren't songs)
+    #   -Same order as os.walk - a folder's files, then each of its subfolders in turn. Symlinked folders are skipped.
+    #   -Uses os.scandir, so file types come from the directory listing itself rather than a stat call per file
+    #   -recursive - False for only the files directly within the folder (see library_sync)
+    extensions = tuple(extension.lower() for extension in extensions)
+    pending_folders = [folder_path]
+
+    while pending_folders:
+        subfolders = []
+        try:
+            with os.scandir(pending_folders.pop()) as entries:
+                for entry in entries:
+                    if _is_hidden_or_system(entry.name):
+                        continue
+
+                    try:
+                        if entry.is_dir(follow_symlinks=False):
+                            if recursive:
+                                subfolders.append(entry.path)
+                        elif entry.name.lower().endswith(extensions) and entry.is_file():
+                            yield entry.path
+                    except OSError:
+                        continue  # e.g. the entry was removed while the folder was being read
+        except OSError:
+            pass  # unreadable folder (e.g. permissions) - skipped, as os.walk does, and the rest is still searched
+
+        pending_folders.extend(reversed(subfolders))  # popped from the end, so the first subfolder is searched first
+
+
+def list_subfolders(folder_path):
+    # Names of the folders directly within the passed in folder that iter_song_files would search, in listing order
+    #   -Raises OSError if the folder can't be read
+    with os.scandir(folder_path) as entries:
+        return [entry.name for entry in entries
+                if not _is_hidden_or_system(entry.name) and _is_folder(entry)]
+
+
+def _is_folder(entry):
+    try:
+        return entry.is_dir(follow_symlinks=False)
+    except OSError:
+        return False
+
+
+def _is_hidden_or_system(name):
+    return name.startswith(".") or name in SYSTEM_FOLDER_NAMES
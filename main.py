@@ -1,7 +1,8 @@
 import os
 import sys
 from gui import setup_gui, backup_database
-from database import setup_database
+from gui_components import (stop_active_import)
+from database import (setup_database, shutdown_database)
 
 
 def resource_path(relative_path):
@@ -11,12 +12,14 @@ def resource_path(relative_path):
 
 
 def on_close():
-    backup_database()
+    backup_database()  # runs in the background - the window closes straight away, the backup finishes before exit
+    stop_active_import()  # cancel any import still running, so it stops before its connection is closed
+    shutdown_database()  # close the shared database connections
     root.destroy()  # close the tkinter application
 
 
 if __name__ == "__main__":
-    setup_database()  # ensure the database is ready
+    setup_database()  # ensure the database is ready and open the shared connection
     icon_path = resource_path("images/echo-library-icon.png")  # Get absolute path for icon
     root = setup_gui(icon_path)  # Pass icon_path to setup_gui
     root.protocol("WM_DELETE_WINDOW", on_close)  # set up the close protocol
@@ -1,31 +1,82 @@
 import os
 import re
 from datetime import datetime
-from pymediainfo import MediaInfo
-from settings import APPROVED_MUSIC_FOLDER
+from database import (get_cached_media_fields, save_cached_media_fields, CACHED_MEDIA_FIELDS)
+from mp4_atoms import (read_movie_header, MP4_FILE_EXTENSIONS)
+from perf import (DISABLED_TIMINGS)
+from settings import (APPROVED_MUSIC_FOLDER, METADATA_EXTRACTION_WORKERS, MP4_FAST_PATH_ENABLED)
 
+# Metadata cache counters (see iter_extract_metadata) - since the application started, or since last reset
+_metadata_cache_hits = 0
+_metadata_cache_misses = 0
 
-def extract_metadata(file_path):
-    media_info = MediaInfo.parse(file_path)
-    metadata = {}
 
+def derive_song_identity(file_path):
     # Using the folder structure (Artist > Album > Song) extract the song, album and artist
     #   -Can be extracted using MediaInfo package - although not all tracks have this info and this can cause an error
+    #   -Only uses the path, so the file isn't opened - lets imports spot duplicates before parsing the file
+    identity = {}
     folder_path = os.path.dirname(file_path)
     song_name = os.path.basename(file_path)
 
     # Assuming the folder structure is Artist > Album > Song (default folder structure for Apple Music)
     path_parts = folder_path.split(os.sep)
     if len(path_parts) >= 2:
-        metadata['artist'] = path_parts[-2]
-        metadata['album'] = path_parts[-1]
+        identity['artist'] = path_parts[-2]
+        identity['album'] = path_parts[-1]
     else:
-        metadata['artist'] = "Unknown"
-        metadata['album'] = "Unknown"
+        identity['artist'] = "Unknown"
+        identity['album'] = "Unknown"
 
     # Remove track number from song name if it exists (e.g., "01 Song Name" becomes "Song Name")
     song_name = re.sub(r"^\d+\s*", "", song_name)
-    metadata['song'] = os.path.splitext(song_name)[0]
+    identity['song'] = os.path.splitext(song_name)[0]
+
+    return identity
+
+
+def extract_metadata(file_path, media_fields=None):
+    # media_fields - approx_release_date, duration_ms and file_size_bytes if already known (e.g. from the metadata
+    # cache), otherwise the file is parsed with MediaInfo
+    metadata = derive_song_identity(file_path)
+    metadata.update(media_fields if media_fields is not None else parse_media_fields(file_path))
+
+    # Created Date - Getting today's date and time and formatting it to YY-MM-DD HH:MM:ss
+    metadata['created_date'] = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+
+    return metadata
+
+
+def parse_media_fields(file_path):
+    # MP4 files (.m4a/.m4p) are read straight from their movie header (see mp4_atoms) - far quicker than a full
+    # MediaInfo parse, with the same result. Any other file, or an MP4 file the header can't be read from, is parsed
+    # with MediaInfo.
+    if MP4_FAST_PATH_ENABLED and file_path.lower().endswith(MP4_FILE_EXTENSIONS):
+        try:
+            return parse_mp4_media_fields(file_path)
+        except (OSError, ValueError):
+            pass
+
+    return parse_media_fields_with_mediainfo(file_path)
+
+
+def parse_mp4_media_fields(file_path):
+    # Same fields as parse_media_fields_with_mediainfo - the encoded date and duration MediaInfo reports for an MP4 file
+    # come from its movie header, and the file size from the file system
+    creation_date, duration_ms = read_movie_header(file_path)
+
+    return {
+        'approx_release_date': creation_date.strftime("%Y-%m-%d") if creation_date else format_date(None),
+        'duration_ms': duration_ms,
+        'file_size_bytes': os.path.getsize(file_path) or None
+    }
+
+
+def parse_media_fields_with_mediainfo(file_path):
+    from pymediainfo import MediaInfo  # imported on the first parse (loads libmediainfo), not at startup
+
+    media_info = MediaInfo.parse(file_path)
+    media_fields = {}
 
     # Get metadata for the passed in track via the MediaInfo package
     for track in media_info.tracks:
@@ -33,32 +84,118 @@ def extract_metadata(file_path):
             # Approx Release Date - Format to DD/MM/YYYY
             approx_release_date = format_date(track.encoded_date)
 
-            # Time - Convert duration to minutes:seconds format
-            time = track.duration
-            if time:
-                minutes = int(time // 60000)
-                seconds = int((time % 60000) / 1000)
-                time_min = f"{minutes}:{seconds:02d}"
-            else:
-                time_min = "Unknown"
+            # Duration in milliseconds and file size in bytes - None if unknown
+            #   -Stored as numbers, formatted for display by the GUI (see gui_components.format_duration)
+            duration_ms = int(track.duration) if track.duration else None
+            file_size_bytes = int(track.file_size) if track.file_size else None
+
+            media_fields['approx_release_date'] = approx_release_date
+            media_fields['duration_ms'] = duration_ms
+            media_fields['file_size_bytes'] = file_size_bytes
+
+    return media_fields
+
+
+def iter_extract_metadata(file_paths, workers=METADATA_EXTRACTION_WORKERS, save_to_cache=True, on_error=None,
+                          timings=DISABLED_TIMINGS):
+    # Extract the metadata for several files in parallel, yielding each file's metadata as soon as it is ready
+    #   -Files already in the metadata cache (same path, size and modified time) aren't parsed again
+    #   -A thread pool is used rather than a process pool - libmediainfo releases the GIL while parsing, and threads
+    #    avoid pickling the results and re-launching the (PyInstaller) executable for every worker process
+    #   -Results are yielded in the same order as file_paths, so the output matches a serial run
+    #   -save_to_cache=False - read the metadata cache, but don't add the files parsed to it (e.g. a dry run)
+    #   -on_error(file_path, error) - if passed, a file that can't be parsed doesn't stop the others - on_error is
+    #    called and None is yielded in its place. Otherwise the error is raised.
+    #   -timings - records the metadata cache and parse stages (see perf.py)
+    global _metadata_cache_hits, _metadata_cache_misses
+
+    with timings.stage("metadata_cache", len(file_paths)):
+        absolute_paths = [os.path.abspath(file_path) for file_path in file_paths]
+        file_stats = [_file_stat(file_path) for file_path in absolute_paths]
+        cached_fields = get_cached_media_fields(absolute_paths)
+
+    # Cached entries are only valid if the file hasn't changed since it was cached
+    hits = []
+    for file_path, file_stat in zip(absolute_paths, file_stats):
+        cache_entry = cached_fields.get(file_path)
+        is_valid = cache_entry is not None and file_stat is not None and cache_entry[0] == file_stat
+        hits.append(cache_entry[1] if is_valid else None)
+
+    miss_paths = [file_path for file_path, hit in zip(absolute_paths, hits) if hit is None]
+
+    parse = timings.timed(parse_media_fields if on_error is None else _parse_media_fields_or_error, "parse")
+
+    executor = None
+    if workers > 1 and len(miss_paths) > 1:
+        from concurrent.futures import ThreadPoolExecutor  # imported on the first import, not at startup
+
+        executor = ThreadPoolExecutor(max_workers=workers)
+        parsed_fields = executor.map(parse, miss_paths)
+    else:
+        parsed_fields = map(parse, miss_paths)
 
-            # File Size - Convert file size to MB
-            file_size_bytes = track.file_size
-            if file_size_bytes:
-                file_size = round(file_size_bytes / (1024 ** 2), 2)  # convert to MB and round to 2 decimal places
-                file_size_mb = f"{file_size} MB"
+    new_cache_entries = []
+    try:
+        for file_path, original_path, file_stat, hit in zip(absolute_paths, file_paths, file_stats, hits):
+            if hit is not None:
+                _metadata_cache_hits += 1
+                media_fields = hit
             else:
-                file_size_mb = "Unknown"
+                _metadata_cache_misses += 1
+                media_fields = next(parsed_fields)
+                if isinstance(media_fields, Exception):
+                    on_error(original_path, media_fields)
+                    yield None
+                    continue
+                if file_stat is not None and all(field in media_fields for field in CACHED_MEDIA_FIELDS):
+                    new_cache_entries.append((file_path, file_stat, media_fields))
+
+            yield extract_metadata(original_path, media_fields)
+    finally:
+        # If the caller stops early (e.g. the import was cancelled), don't parse the remaining files
+        if executor is not None:
+            executor.shutdown(wait=True, cancel_futures=True)
+
+        # Save everything parsed in this batch to the cache - a single transaction
+        if new_cache_entries and save_to_cache:
+            with timings.stage("metadata_cache", 0):
+                save_cached_media_fields(new_cache_entries)
+
+
+def _parse_media_fields_or_error(file_path):
+    # parse_media_fields, returning the error rather than raising it - so one bad file doesn't fail the whole batch
+    try:
+        media_fields = parse_media_fields(file_path)
+    except Exception as e:
+        return e
 
-            # Created Date - Getting today's date and time and formatting it to YY-MM-DD HH:MM:ss
-            created_date = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    if not all(field in media_fields for field in CACHED_MEDIA_FIELDS):
+        return ValueError("No general track found - the file may be damaged or not an audio file")
+    return media_fields
 
-            metadata['approx_release_date'] = approx_release_date
-            metadata['time'] = time_min
-            metadata['file_size'] = file_size_mb
-            metadata['created_date'] = created_date
 
-    return metadata
+def _file_stat(file_path):
+    # (size in bytes, modified time in nanoseconds) - the metadata cache entry is invalidated when either changes
+    try:
+        stat_result = os.stat(file_path)
+        return stat_result.st_size, stat_result.st_mtime_ns
+    except OSError:
+        return None
+
+
+def metadata_cache_stats():
+    total = _metadata_cache_hits + _metadata_cache_misses
+    return {
+        'hits': _metadata_cache_hits,
+        'misses': _metadata_cache_misses,
+        'hit_rate': _metadata_cache_hits / total if total else 0.0
+    }
+
+
+def reset_metadata_cache_stats():
+    global _metadata_cache_hits, _metadata_cache_misses
+    _metadata_cache_hits = 0
+    _metadata_cache_misses = 0
 
 
 def format_date(date_str):
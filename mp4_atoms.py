@@ -0,0 +1,94 @@
+import mmap
+import struct
+from datetime import (datetime, timedelta)
+
+MP4_FILE_EXTENSIONS = (".m4a", ".m4p", ".m4b", ".mp4")  # files read by read_movie_header (matched case-insensitively)
+
+_MP4_EPOCH = datetime(1904, 1, 1)  # MP4 times are seconds since midnight, 1 January 1904 (UTC)
+_BOX_HEADER = struct.Struct(">I4s")  # size, type
+_LARGE_BOX_SIZE = struct.Struct(">Q")
+_MVHD_V0 = struct.Struct(">IIII")  # creation time, modification time, timescale, duration
+_MVHD_V1 = struct.Struct(">QQIQ")
+
+
+def read_movie_header(file_path):
+    # Read the creation time and duration of an MP4 file (e.g. .m4a/.m4p) straight from its movie header (moov/mvhd),
+    # the same fields MediaInfo reports as the encoded date and duration of the general track
+    #   -Only the box headers are read - the file is memory-mapped and the audio data (mdat) is skipped over, wherever
+    #    moov is in the file
+    # Returns (creation datetime in UTC or None, duration in milliseconds or None).
+    # Raises ValueError if the file isn't an MP4 file or has no readable movie header, OSError if it can't be read.
+    with open(file_path, "rb") as file:
+        try:
+            data = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            raise ValueError("Empty file") from None
+
+        with data:
+            file_type = _find_box(data, 0, len(data), b"ftyp", first_only=True)
+            if file_type is None:
+                raise ValueError("Not an MP4 file (no ftyp box)")
+
+            movie = _find_box(data, 0, len(data), b"moov")
+            if movie is None:
+                raise ValueError("No movie box (moov)")
+
+            movie_header = _find_box(data, *movie, b"mvhd")
+            if movie_header is None:
+                raise ValueError("No movie header box (mvhd)")
+
+            return _decode_movie_header(data, *movie_header)
+
+
+def _find_box(data, start, end, box_type, first_only=False):
+    # Returns (content start, content end) of the first box of box_type between start and end, or None
+    #   -first_only - only look at the first box (e.g. ftyp, which must come first)
+    position = start
+    while position + _BOX_HEADER.size <= end:
+        size, current_type = _BOX_HEADER.unpack_from(data, position)
+        header_size = _BOX_HEADER.size
+
+        if size == 1:  # 64-bit size follows the type
+            if position + header_size + _LARGE_BOX_SIZE.size > end:
+                return None
+            size = _LARGE_BOX_SIZE.unpack_from(data, position + header_size)[0]
+            header_size += _LARGE_BOX_SIZE.size
+        elif size == 0:  # box runs to the end of its parent (or the file)
+            size = end - position
+
+        if size < header_size or position + size > end:
+            raise ValueError(f"Damaged MP4 box '{current_type.decode('latin-1')}' at byte {position}")
+
+        if current_type == box_type:
+            return position + header_size, position + size
+        if first_only:
+            return None
+
+        position += size
+
+    return None
+
+
+def _decode_movie_header(data, start, end):
+    version = data[start]
+    fields = _MVHD_V1 if version == 1 else _MVHD_V0
+    fields_start = start + 4  # version (1 byte) and flags (3 bytes)
+
+    if fields_start + fields.size > end:
+        raise ValueError("Movie header box (mvhd) is too short")
+
+    creation_time, _, timescale, duration = fields.unpack_from(data, fields_start)
+
+    # 0 - creation time not set (MediaInfo reports no encoded date)
+    try:
+        creation_date = _MP4_EPOCH + timedelta(seconds=creation_time) if creation_time else None
+    except OverflowError:
+        raise ValueError(f"Invalid creation time in the movie header (mvhd): {creation_time}") from None
+
+    # All bits set - duration unknown
+    if timescale == 0 or duration in (0, 0xFFFFFFFF, 0xFFFFFFFFFFFFFFFF):
+        duration_ms = None
+    else:
+        duration_ms = duration * 1000 // timescale  # whole milliseconds, truncated as int(track.duration) does
+
+    return creation_date, duration_ms
@@ -0,0 +1,168 @@
+import threading
+import time
+from settings import (PERF_INSTRUMENTATION_ENABLED)
+
+# Stages of an import, in pipeline order - where the time of a slow import goes
+IMPORT_STAGES = ("walk", "duplicate_check", "metadata_cache", "parse", "insert", "display")
+STAGE_LABELS = {
+    "walk": "walk",  # finding the song files (library_walker.iter_song_files)
+    "duplicate_check": "duplicate check",  # songs already imported, recognised from their path
+    "metadata_cache": "metadata cache",  # looking up (and saving) the metadata of files parsed before
+    "parse": "parse",  # MP4 movie header or MediaInfo, per file - summed across the parallel workers
+    "insert": "insert",  # writing the songs, import journal and error log
+    "display": "display"  # adding the rows to the main window's table
+}
+
+
+def new_import_timings():
+    # Timers for one import - a no-op recorder unless PERF_INSTRUMENTATION_ENABLED is set, so an import that isn't
+    # being measured pays nothing more than a few empty method calls per batch
+    return ImportTimings() if PERF_INSTRUMENTATION_ENABLED else DISABLED_TIMINGS
+
+
+class ImportTimings:
+    # Time spent in each import stage and the number of files it handled. Can be recorded from any thread (e.g. the
+    # parse workers and the UI thread's display) at once.
+    #   -Stages timed a batch at a time share the batch's time evenly between its files for the per file percentiles
+    enabled = True
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self._lock = threading.Lock()
+        self._seconds = {}  # stage -> total seconds
+        self._files = {}  # stage -> files handled
+        self._file_seconds = {}  # stage -> [seconds per file, ...]
+        self._per_file_stages = set()  # stages timed a file at a time (see timed)
+
+    def add(self, stage, seconds, files=1):
+        with self._lock:
+            self._seconds[stage] = self._seconds.get(stage, 0.0) + seconds
+            self._files[stage] = self._files.get(stage, 0) + files
+            if files:
+                self._file_seconds.setdefault(stage, []).extend([seconds / files] * files)
+
+    def stage(self, stage, files=1):
+        # with timings.stage("insert", len(records)): ...
+        return _StageTimer(self, stage, files)
+
+    def timed(self, func, stage):
+        # func, timed as one file of the stage per call (e.g. parse_media_fields)
+        self._per_file_stages.add(stage)
+
+        def timed_func(*args):
+            start = time.perf_counter()
+            try:
+                return func(*args)
+            finally:
+                self.add(stage, time.perf_counter() - start)
+
+        return timed_func
+
+    def iter_timed(self, batches, stage):
+        # Yield each batch of files from batches (e.g. a generator walking the folders), timing how long each took to
+        # produce as the stage
+        batches = iter(batches)
+        while True:
+            start = time.perf_counter()
+            batch = next(batches, None)
+            self.add(stage, time.perf_counter() - start, len(batch) if batch else 0)
+            if batch is None:
+                return
+            yield batch
+
+    def summary(self, files):
+        # Totals for the import so far - files is the number of song files found (stats['scanned'])
+        # Returns {'files', 'elapsed_seconds', 'files_per_second', 'stages': [{'stage', 'files', 'total_seconds',
+        # 'p50_ms', 'p95_ms', 'per_file'}, ...]} - stages in IMPORT_STAGES order, only those recorded
+        #   -per_file - True if each file was timed on its own, rather than its share of a batch
+        elapsed = max(time.perf_counter() - self.started, 0.001)
+
+        with self._lock:
+            stages = []
+            for stage in sorted(self._seconds, key=_stage_order):
+                file_seconds = sorted(self._file_seconds.get(stage, ()))
+                stages.append({
+                    'stage': stage,
+                    'files': self._files[stage],
+                    'total_seconds': self._seconds[stage],
+                    'p50_ms': _percentile(file_seconds, 0.50) * 1000 if file_seconds else None,
+                    'p95_ms': _percentile(file_seconds, 0.95) * 1000 if file_seconds else None,
+                    'per_file': stage in self._per_file_stages
+                })
+
+        return {'files': files, 'elapsed_seconds': elapsed, 'files_per_second': files / elapsed, 'stages': stages}
+
+
+class _DisabledTimings:
+    enabled = False
+
+    def add(self, stage, seconds, files=1):
+        pass
+
+    def stage(self, stage, files=1):
+        return _NO_STAGE_TIMER
+
+    def timed(self, func, stage):
+        return func
+
+    def iter_timed(self, batches, stage):
+        return batches
+
+    def summary(self, files):
+        return None
+
+
+class _StageTimer:
+    __slots__ = ("_timings", "_stage", "_files", "_start")
+
+    def __init__(self, timings, stage, files):
+        self._timings = timings
+        self._stage = stage
+        self._files = files
+
+    def __enter__(self):
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._timings.add(self._stage, time.perf_counter() - self._start, self._files)
+        return False
+
+
+class _NoStageTimer:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+
+DISABLED_TIMINGS = _DisabledTimings()
+_NO_STAGE_TIMER = _NoStageTimer()
+
+
+def format_timings_summary(summary):
+    # e.g. "1200 files in 4.2s (285.7/s) | walk 35ms | duplicate check 12ms | parse 3.1s (p50 2.1ms, p95 6.3ms) | ..."
+    #   -Percentiles are shown for the stages timed a file at a time - the perf log has them for every stage
+    parts = [f"{summary['files']} files in {summary['elapsed_seconds']:.1f}s ({summary['files_per_second']:.1f}/s)"]
+    for stage in summary['stages']:
+        part = f"{STAGE_LABELS.get(stage['stage'], stage['stage'])} {_format_seconds(stage['total_seconds'])}"
+        if stage['per_file'] and stage['p50_ms'] is not None:
+            part += f" (p50 {stage['p50_ms']:.3g}ms, p95 {stage['p95_ms']:.3g}ms)"
+        parts.append(part)
+    return " | ".join(parts)
+
+
+def _format_seconds(seconds):
+    return f"{seconds:.1f}s" if seconds >= 1 else f"{seconds * 1000:.0f}ms"
+
+
+def _percentile(sorted_values, fraction):
+    # Nearest-rank percentile of an already sorted list
+    return sorted_values[min(int(fraction * len(sorted_values)), len(sorted_values) - 1)]
+
+
+def _stage_order(stage):
+    return IMPORT_STAGES.index(stage) if stage in IMPORT_STAGES else len(IMPORT_STAGES)
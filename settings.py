@@ -5,3 +5,44 @@ APP_ROOT_FOLDER = "Applications/Echo Library/"
 APPROVED_MUSIC_FOLDER = "Music/Music/Media.localized/Apple Music/"
 DATABASE_FILE_NAME = "echo_library"
 DATABASE_FILE_TYPE = ".db"
+
+SUPPORTED_AUDIO_EXTENSIONS = (".m4p",)  # song file types imported (any case) - opt in to others, e.g. ".m4a", ".mp3"
+IMPORT_BATCH_SIZE = 500  # number of songs written to the database per transaction during an import
+METADATA_EXTRACTION_WORKERS = 4  # number of files parsed in parallel during an import (1 = serial)
+METADATA_CACHE_MAX_ENTRIES = 200_000  # song files whose parsed metadata is kept - the oldest cached are removed first
+MP4_FAST_PATH_ENABLED = True  # read .m4a/.m4p metadata from the MP4 header rather than with MediaInfo (see mp4_atoms)
+BACKGROUND_POLL_INTERVAL_MS = 100  # how often the GUI checks for results from background tasks (e.g. imports)
+BACKGROUND_QUEUE_BATCH = 500  # maximum number of background task messages handled per check
+SONG_KEY_CACHE_MAX_ENTRIES = 1_000_000  # songs held in the in-memory duplicate check cache (~80 bytes per song)
+SEARCH_RESULT_LIMIT = 500  # maximum number of songs shown for a database viewer search
+VIEWER_PAGE_SIZE = 200  # songs fetched from the database at a time as the database viewer is scrolled
+VIEWER_WINDOW_PAGES = 5  # pages kept in the database viewer at once - pages scrolled well out of view are dropped
+SEARCH_CACHE_SIZE = 50  # recent database viewer searches kept in memory (cleared when songs change)
+SEARCH_DEBOUNCE_MS = 250  # pause in typing before the database viewer search runs
+EXPORT_CHUNK_SIZE = 5000  # rows read from the database at a time while exporting
+EXCEL_MAX_ROWS = 1_048_576  # Excel's row limit per sheet - larger exports continue on another sheet
+BACKUP_COMPRESSION = "gzip"  # "gzip", "zstd" (requires the zstandard package) or None
+BACKUP_PAGES_PER_STEP = 256  # database pages copied per step of a backup - the database stays usable between steps
+BACKUP_KEEP_LAST = 5  # automatic backups - always keep the newest N...
+BACKUP_KEEP_DAILY = 7  # ...plus the newest backup of each of the last N days...
+BACKUP_KEEP_WEEKLY = 4  # ...plus the newest backup of each of the last N weeks
+AUTO_BACKUP_INTERVAL_MINUTES = 0  # back up automatically while the app is open (0 = off)
+DATABASE_PERFORMANCE_PROFILE = "balanced"  # one of DATABASE_PERFORMANCE_PROFILES - applied to every database connection
+DATABASE_PERFORMANCE_PROFILES = {
+    # "safe" - SQLite's defaults (rollback journal, full sync). Readers are blocked while an import writes.
+    "safe": {"journal_mode": "DELETE", "synchronous": "FULL", "cache_size_kib": 2000, "mmap_size_mb": 0,
+             "busy_timeout_ms": 5000, "wal_autocheckpoint_pages": 1000},
+    # "balanced" - WAL (readers never block the writer, or vice versa), synced at checkpoints rather than every commit
+    "balanced": {"journal_mode": "WAL", "synchronous": "NORMAL", "cache_size_kib": 16384, "mmap_size_mb": 64,
+                 "busy_timeout_ms": 5000, "wal_autocheckpoint_pages": 1000},
+    # "fast" - as balanced, with a larger page cache and memory map for very large libraries
+    "fast": {"journal_mode": "WAL", "synchronous": "NORMAL", "cache_size_kib": 65536, "mmap_size_mb": 256,
+             "busy_timeout_ms": 5000, "wal_autocheckpoint_pages": 4000}
+}
+DATABASE_BUSY_RETRIES = 3  # times a write is retried if the database is still locked once the busy timeout runs out
+WAL_CHECKPOINT_INTERVAL_MINUTES = 10  # how often the app folds the WAL file back into the database (0 = SQLite only)
+LIBRARY_SYNC_ENABLED = False  # watch APPROVED_MUSIC_FOLDER while the app is open and import new songs automatically
+LIBRARY_SYNC_POLL_INTERVAL_SECONDS = 60  # how often the music folder is checked when it can't be watched (no inotify)
+LIBRARY_SYNC_DEBOUNCE_SECONDS = 5  # quiet period after a change before syncing - lets a folder finish being copied
+PERF_INSTRUMENTATION_ENABLED = False  # time each stage of every import - summary shown once it finishes (see perf.py)
+PERF_LOG_KEEP_RUNS = 500  # import timing summaries kept in the perf log - older ones are removed as new ones are added
@@ -0,0 +1,77 @@
+import sys
+import threading
+from settings import SONG_KEY_CACHE_MAX_ENTRIES
+
+# In-memory set of the song_key (see database.compute_song_key) of every song in the database, so duplicate checks
+# during an import don't need a database round trip. Loaded on the first duplicate check (not at startup, so the window
+# isn't held up reading every song) and kept in step by database.py every time a song is inserted or deleted.
+#   -Only this process's writes are seen - a song another process deletes stays in the cache, so a hit is only a hint
+#    (database.check_song_exists confirms it), while a miss can be trusted
+#   -Memory is bounded by SONG_KEY_CACHE_MAX_ENTRIES - if the library is larger, the cache is switched off and
+#    duplicate checks fall back to the database (index lookup)
+_known_song_keys = set()
+_is_enabled = False  # False until loaded (or if the library is too large to cache)
+_is_loaded = False  # True once a load has been attempted - even if the library turned out too large to cache
+_lock = threading.Lock()
+
+
+def ensure_song_key_cache_loaded(read_song_keys):
+    # Load the cache the first time it is needed - read_song_keys() returns (song_count, iterable of every song_key)
+    #   -Songs added or deleted while the cache is loading wait for the load to finish (add_known_songs and
+    #    remove_known_song take the same lock), so none are missed
+    global _known_song_keys, _is_enabled, _is_loaded
+
+    if _is_loaded:
+        return
+
+    with _lock:
+        if _is_loaded:
+            return  # loaded by another thread while this one waited
+
+        song_count, song_keys = read_song_keys()
+        _is_loaded = True
+        if song_count > SONG_KEY_CACHE_MAX_ENTRIES:
+            return
+
+        _known_song_keys = set(song_keys)
+        _is_enabled = True
+
+
+def is_known_song(song_key):
+    # Returns True/False if the cache can answer, or None if it is disabled (caller should check the database)
+    if not _is_enabled:
+        return None
+    return song_key in _known_song_keys
+
+
+def add_known_songs(song_keys):
+    global _is_enabled
+
+    with _lock:
+        if not _is_enabled:
+            return
+
+        _known_song_keys.update(song_keys)
+
+        # Library has outgrown the cache - free the memory and fall back to the database
+        if len(_known_song_keys) > SONG_KEY_CACHE_MAX_ENTRIES:
+            _known_song_keys.clear()
+            _is_enabled = False
+
+
+def remove_known_song(song_key):
+    with _lock:
+        _known_song_keys.discard(song_key)
+
+
+def song_key_cache_stats():
+    # Approximate memory use - the set's hash table plus one int object per key
+    with _lock:
+        entries = len(_known_song_keys)
+        key_bytes = sum(sys.getsizeof(song_key) for song_key in _known_song_keys)
+        return {
+            'enabled': _is_enabled,
+            'entries': entries,
+            'max_entries': SONG_KEY_CACHE_MAX_ENTRIES,
+            'bytes': sys.getsizeof(_known_song_keys) + key_bytes
+        }